@@ -15,7 +15,12 @@ CREATE TABLE customers (
     First_Name VARCHAR(50),
     Last_Name VARCHAR(50),
     Phone_No VARCHAR(15) UNIQUE,
-    Email VARCHAR(100)
+    Email VARCHAR(100),
+    Deleted_At DATETIME NULL DEFAULT NULL,
+    INDEX idx_customers_email (Email),
+    INDEX idx_customers_first_name (First_Name),
+    INDEX idx_customers_last_name (Last_Name),
+    FULLTEXT INDEX ft_customers_name (First_Name, Last_Name)
 );
 
 -- RESTAURANTS
@@ -23,7 +28,8 @@ CREATE TABLE restaurants (
     Restaurant_ID INT AUTO_INCREMENT PRIMARY KEY,
     Name VARCHAR(100),
     Address VARCHAR(255),
-    Phone_No VARCHAR(15)
+    Phone_No VARCHAR(15),
+    INDEX idx_restaurants_name (Name)
 );
 
 -- MENU (1:1 with RESTAURANTS)
@@ -33,29 +39,36 @@ CREATE TABLE menu (
     Name VARCHAR(100),
     Description TEXT,
     Price DECIMAL(10,2),
+    INDEX idx_menu_name (Name),
     FOREIGN KEY (Restaurant_ID) REFERENCES restaurants(Restaurant_ID)
 );
 
 -- ORDERS (Weak entity: depends on Customers and Restaurants)
 CREATE TABLE orders (
-    Order_ID INT AUTO_INCREMENT PRIMARY KEY,
+    Order_ID INT AUTO_INCREMENT,
     Customer_ID INT,
     Restaurant_ID INT,
-    Order_Date DATE,
+    Order_Date DATE NOT NULL,
     Total_Amount DECIMAL(10,2),
-    FOREIGN KEY (Customer_ID) REFERENCES customers(Customer_ID),
-    FOREIGN KEY (Restaurant_ID) REFERENCES restaurants(Restaurant_ID)
+    Deleted_At DATETIME NULL DEFAULT NULL,
+    PRIMARY KEY (Order_ID, Order_Date),
+    INDEX idx_orders_restaurant_date (Restaurant_ID, Order_Date, Total_Amount),
+    INDEX idx_orders_restaurant_total (Restaurant_ID, Total_Amount),
+    INDEX idx_orders_customer (Customer_ID, Total_Amount),
+    INDEX idx_orders_date (Order_Date)
 );
 
 -- ORDER ITEMS (M:N between ORDERS and MENU)
 CREATE TABLE order_items (
-    Order_Item_ID INT AUTO_INCREMENT PRIMARY KEY,
+    Order_Item_ID INT AUTO_INCREMENT,
     Order_ID INT,
     Menu_Item_ID INT,
     Quantity INT,
     Price DECIMAL(10,2),
-    FOREIGN KEY (Order_ID) REFERENCES orders(Order_ID),
-    FOREIGN KEY (Menu_Item_ID) REFERENCES menu(Menu_Item_ID)
+    Order_Date DATE NOT NULL,
+    PRIMARY KEY (Order_Item_ID, Order_Date),
+    INDEX idx_order_items_order (Order_ID, Menu_Item_ID, Price),
+    INDEX idx_order_items_menu (Menu_Item_ID)
 );
 
 -- DELIVERY DRIVERS
@@ -64,21 +77,24 @@ CREATE TABLE delivery_drivers (
     First_Name VARCHAR(50),
     Last_Name VARCHAR(50),
     Pickup VARCHAR(100),
-    Destination VARCHAR(100)
+    Destination VARCHAR(100),
+    INDEX idx_drivers_first_name (First_Name)
 );
 
 -- DELIVERIES (Weak entity: depends on Orders, Restaurants, Drivers)
 CREATE TABLE deliveries (
-    Delivery_ID INT AUTO_INCREMENT PRIMARY KEY,
+    Delivery_ID INT AUTO_INCREMENT,
     Order_ID INT,
     Restaurant_ID INT,
     Driver_ID INT,
-    Pickup_Time DATETIME,
+    Pickup_Time DATETIME NOT NULL,
     Location VARCHAR(255),
     Delivery_Fee DECIMAL(10,2),
-    FOREIGN KEY (Order_ID) REFERENCES orders(Order_ID),
-    FOREIGN KEY (Restaurant_ID) REFERENCES restaurants(Restaurant_ID),
-    FOREIGN KEY (Driver_ID) REFERENCES delivery_drivers(Driver_ID)
+    PRIMARY KEY (Delivery_ID, Pickup_Time),
+    INDEX idx_deliveries_order (Order_ID, Driver_ID, Delivery_Fee),
+    INDEX idx_deliveries_driver (Driver_ID, Delivery_Fee),
+    INDEX idx_deliveries_driver_pickup (Driver_ID, Pickup_Time),
+    INDEX idx_deliveries_restaurant (Restaurant_ID)
 );
 
 -- MULTIVALUED ATTRIBUTE: CUSTOMER CURRENT ORDERS
@@ -86,9 +102,173 @@ CREATE TABLE customer_current_orders (
     Customer_ID INT,
     Order_ID INT,
     PRIMARY KEY (Customer_ID, Order_ID),
+    INDEX idx_cco_order (Order_ID),
     FOREIGN KEY (Customer_ID) REFERENCES customers(Customer_ID)
 );
 
+-- PURGE QUEUE (deleted customers / orders waiting for the background purge)
+CREATE TABLE purge_jobs (
+    Job_ID INT AUTO_INCREMENT PRIMARY KEY,
+    Status ENUM('queued', 'running', 'done', 'failed') NOT NULL DEFAULT 'queued',
+    Customers INT NOT NULL DEFAULT 0,
+    Orders_Total INT NOT NULL DEFAULT 0,
+    Orders_Done INT NOT NULL DEFAULT 0,
+    Requested_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    Started_At DATETIME NULL,
+    Finished_At DATETIME NULL,
+    Error TEXT NULL,
+    INDEX idx_purge_jobs_status (Status, Job_ID)
+);
+
+CREATE TABLE purge_queue (
+    Job_ID INT NOT NULL,
+    Entity ENUM('customer', 'order') NOT NULL,
+    Entity_ID INT NOT NULL,
+    PRIMARY KEY (Job_ID, Entity, Entity_ID),
+    FOREIGN KEY (Job_ID) REFERENCES purge_jobs(Job_ID)
+);
+
+-- IDEMPOTENCY KEYS (orders placed with a key; a retry gets the same Order_ID back)
+CREATE TABLE order_requests (
+    Idempotency_Key VARCHAR(64) PRIMARY KEY,
+    Request_Hash CHAR(64) NOT NULL,
+    Order_ID INT NOT NULL,
+    Created_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_order_requests_created (Created_At)
+);
+
+-- CSV IMPORTS (uploaded files loaded by the import worker; Rows_Done is the resume point)
+CREATE TABLE import_jobs (
+    Job_ID INT AUTO_INCREMENT PRIMARY KEY,
+    Target ENUM('customers', 'restaurants', 'menu', 'delivery_drivers') NOT NULL,
+    File_Name VARCHAR(255) NOT NULL,
+    File_Path VARCHAR(500) NOT NULL,
+    Status ENUM('queued', 'running', 'done', 'failed') NOT NULL DEFAULT 'queued',
+    Rows_Total INT NOT NULL DEFAULT 0,
+    Rows_Done INT NOT NULL DEFAULT 0,
+    Rows_Imported INT NOT NULL DEFAULT 0,
+    Rows_Failed INT NOT NULL DEFAULT 0,
+    Requested_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    Started_At DATETIME NULL,
+    Finished_At DATETIME NULL,
+    Error TEXT NULL,
+    INDEX idx_import_jobs_status (Status, Job_ID)
+);
+
+CREATE TABLE import_errors (
+    Job_ID INT NOT NULL,
+    Line_No INT NOT NULL,
+    Error VARCHAR(255) NOT NULL,
+    PRIMARY KEY (Job_ID, Line_No),
+    FOREIGN KEY (Job_ID) REFERENCES import_jobs(Job_ID)
+);
+
+-- ARCHIVE (closed months moved out of orders / order_items / deliveries by the archive job;
+-- same columns, compressed, no partitions)
+CREATE TABLE orders_archive (
+    Order_ID INT PRIMARY KEY,
+    Customer_ID INT,
+    Restaurant_ID INT,
+    Order_Date DATE NOT NULL,
+    Total_Amount DECIMAL(10,2),
+    Deleted_At DATETIME NULL DEFAULT NULL,
+    INDEX idx_orders_archive_customer (Customer_ID),
+    INDEX idx_orders_archive_restaurant_total (Restaurant_ID, Total_Amount),
+    INDEX idx_orders_archive_date (Order_Date)
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE order_items_archive (
+    Order_Item_ID INT PRIMARY KEY,
+    Order_ID INT,
+    Menu_Item_ID INT,
+    Quantity INT,
+    Price DECIMAL(10,2),
+    Order_Date DATE NOT NULL,
+    INDEX idx_order_items_archive_order (Order_ID),
+    INDEX idx_order_items_archive_menu (Menu_Item_ID)
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE deliveries_archive (
+    Delivery_ID INT PRIMARY KEY,
+    Order_ID INT,
+    Restaurant_ID INT,
+    Driver_ID INT,
+    Pickup_Time DATETIME NOT NULL,
+    Location VARCHAR(255),
+    Delivery_Fee DECIMAL(10,2),
+    INDEX idx_deliveries_archive_order (Order_ID),
+    INDEX idx_deliveries_archive_restaurant (Restaurant_ID),
+    INDEX idx_deliveries_archive_driver (Driver_ID)
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+-- ROLLUPS (report aggregates kept current by the order / delivery triggers)
+CREATE TABLE restaurant_rollup (
+    Restaurant_ID INT PRIMARY KEY,
+    Order_Count INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    Highest_Order DECIMAL(10,2) NULL,
+    Lowest_Order DECIMAL(10,2) NULL,
+    INDEX idx_restaurant_rollup_revenue (Revenue)
+);
+
+CREATE TABLE customer_rollup (
+    Customer_ID INT PRIMARY KEY,
+    Order_Count INT NOT NULL DEFAULT 0,
+    Spent DECIMAL(14,2) NOT NULL DEFAULT 0,
+    INDEX idx_customer_rollup_spent (Spent)
+);
+
+CREATE TABLE driver_rollup (
+    Driver_ID INT PRIMARY KEY,
+    Delivery_Count INT NOT NULL DEFAULT 0,
+    Earnings DECIMAL(14,2) NOT NULL DEFAULT 0,
+    INDEX idx_driver_rollup_earnings (Earnings)
+);
+
+CREATE TABLE daily_rollup (
+    Day DATE PRIMARY KEY,
+    Order_Count INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    Delivery_Count INT NOT NULL DEFAULT 0,
+    Delivery_Fees DECIMAL(14,2) NOT NULL DEFAULT 0
+);
+
+-- TABLE COUNTERS (row counts for the dashboard, maintained by triggers)
+CREATE TABLE table_counters (
+    Table_Name VARCHAR(64) PRIMARY KEY,
+    Row_Count BIGINT NOT NULL DEFAULT 0
+);
+
+-- TABLE VERSIONS (bumped by the triggers on every write; the app builds ETags from them)
+CREATE TABLE table_versions (
+    Table_Name VARCHAR(64) PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO table_counters (Table_Name, Row_Count)
+VALUES ('orders', 0), ('deliveries', 0), ('delivery_drivers', 0), ('restaurants', 0);
+
+-- versions start from the clock, so a rebuilt database never hands out an old ETag again
+INSERT INTO table_versions (Table_Name, Version)
+VALUES ('customers', UNIX_TIMESTAMP()), ('restaurants', UNIX_TIMESTAMP()), ('menu', UNIX_TIMESTAMP()),
+       ('orders', UNIX_TIMESTAMP()), ('order_items', UNIX_TIMESTAMP()), ('deliveries', UNIX_TIMESTAMP()),
+       ('delivery_drivers', UNIX_TIMESTAMP());
+
+-- ============================================================
+-- VIEWS
+-- ============================================================
+
+-- live + archived rows (rollup rebuild and check)
+CREATE VIEW orders_all AS
+SELECT Order_ID, Customer_ID, Restaurant_ID, Order_Date, Total_Amount, Deleted_At FROM orders
+UNION ALL
+SELECT Order_ID, Customer_ID, Restaurant_ID, Order_Date, Total_Amount, Deleted_At FROM orders_archive;
+
+CREATE VIEW deliveries_all AS
+SELECT Delivery_ID, Order_ID, Restaurant_ID, Driver_ID, Pickup_Time, Location, Delivery_Fee FROM deliveries
+UNION ALL
+SELECT Delivery_ID, Order_ID, Restaurant_ID, Driver_ID, Pickup_Time, Location, Delivery_Fee FROM deliveries_archive;
+
 -- ============================================================
 -- TRIGGERS
 -- ============================================================
@@ -102,20 +282,24 @@ FOR EACH ROW
 BEGIN
     INSERT INTO customer_current_orders (Customer_ID, Order_ID)
     VALUES (NEW.Customer_ID, NEW.Order_ID);
+
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'orders';
+
+    CALL RollupOrder(NEW.Restaurant_ID, NEW.Customer_ID, NEW.Order_Date, 1, NEW.Total_Amount);
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'orders';
 END$$
 
--- Trigger 2: After adding an order item → Recalculate total
+-- Trigger 2: After adding an order item → Add the line price to the total
 CREATE TRIGGER after_order_item_insert
 AFTER INSERT ON order_items
 FOR EACH ROW
 BEGIN
     UPDATE orders
-    SET Total_Amount = (
-        SELECT COALESCE(SUM(Price), 0)
-        FROM order_items
-        WHERE Order_ID = NEW.Order_ID
-    )
-    WHERE Order_ID = NEW.Order_ID;
+    SET Total_Amount = COALESCE(Total_Amount, 0) + NEW.Price
+    WHERE Order_ID = NEW.Order_ID AND Order_Date = NEW.Order_Date;
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'order_items';
 END$$
 
 -- Trigger 3: After a delivery is completed → Remove from current orders
@@ -125,6 +309,391 @@ FOR EACH ROW
 BEGIN
     DELETE FROM customer_current_orders
     WHERE Order_ID = NEW.Order_ID;
+
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'deliveries';
+
+    CALL RollupDelivery(NEW.Driver_ID, DATE(NEW.Pickup_Time), 1, NEW.Delivery_Fee);
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'deliveries';
+END$$
+
+-- Triggers 4-9: Keep table_counters in step with inserts and deletes
+CREATE TRIGGER after_order_delete
+AFTER DELETE ON orders
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'orders';
+
+    CALL RollupOrder(OLD.Restaurant_ID, OLD.Customer_ID, OLD.Order_Date, -1, -OLD.Total_Amount);
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'orders';
+END$$
+
+CREATE TRIGGER after_delivery_delete
+AFTER DELETE ON deliveries
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'deliveries';
+
+    CALL RollupDelivery(OLD.Driver_ID, DATE(OLD.Pickup_Time), -1, -OLD.Delivery_Fee);
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'deliveries';
+END$$
+
+CREATE TRIGGER after_driver_insert
+AFTER INSERT ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'delivery_drivers';
+
+    -- the earnings report lists drivers with no deliveries too
+    INSERT IGNORE INTO driver_rollup (Driver_ID) VALUES (NEW.Driver_ID);
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'delivery_drivers';
+END$$
+
+CREATE TRIGGER after_driver_delete
+AFTER DELETE ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'delivery_drivers';
+
+    DELETE FROM driver_rollup WHERE Driver_ID = OLD.Driver_ID;
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'delivery_drivers';
+END$$
+
+CREATE TRIGGER after_restaurant_insert
+AFTER INSERT ON restaurants
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'restaurants';
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'restaurants';
+END$$
+
+CREATE TRIGGER after_restaurant_delete
+AFTER DELETE ON restaurants
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'restaurants';
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'restaurants';
+END$$
+
+-- Triggers 10-11: Apply order / delivery edits to the rollup tables
+CREATE TRIGGER after_order_update
+AFTER UPDATE ON orders
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Restaurant_ID <=> OLD.Restaurant_ID) OR NOT (NEW.Customer_ID <=> OLD.Customer_ID)
+       OR NOT (NEW.Order_Date <=> OLD.Order_Date) THEN
+        CALL RollupOrder(OLD.Restaurant_ID, OLD.Customer_ID, OLD.Order_Date, -1, -OLD.Total_Amount);
+        CALL RollupOrder(NEW.Restaurant_ID, NEW.Customer_ID, NEW.Order_Date, 1, NEW.Total_Amount);
+    ELSEIF NOT (NEW.Total_Amount <=> OLD.Total_Amount) THEN
+        -- the usual case: the order_items trigger adding a line to the total
+        CALL RollupOrder(NEW.Restaurant_ID, NEW.Customer_ID, NEW.Order_Date, 0,
+                         COALESCE(NEW.Total_Amount, 0) - COALESCE(OLD.Total_Amount, 0));
+    END IF;
+
+    -- order lines are partitioned by their order's date and move with it
+    IF NOT (NEW.Order_Date <=> OLD.Order_Date) THEN
+        UPDATE order_items SET Order_Date = NEW.Order_Date
+        WHERE Order_ID = NEW.Order_ID AND Order_Date = OLD.Order_Date;
+    END IF;
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'orders';
+END$$
+
+CREATE TRIGGER after_delivery_update
+AFTER UPDATE ON deliveries
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Driver_ID <=> OLD.Driver_ID) OR NOT (DATE(NEW.Pickup_Time) <=> DATE(OLD.Pickup_Time))
+       OR NOT (NEW.Delivery_Fee <=> OLD.Delivery_Fee) THEN
+        CALL RollupDelivery(OLD.Driver_ID, DATE(OLD.Pickup_Time), -1, -OLD.Delivery_Fee);
+        CALL RollupDelivery(NEW.Driver_ID, DATE(NEW.Pickup_Time), 1, NEW.Delivery_Fee);
+    END IF;
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'deliveries';
+END$$
+
+-- Triggers 12-21: Bump table_versions for writes no other trigger covers
+CREATE TRIGGER after_customer_insert
+AFTER INSERT ON customers
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'customers';
+END$$
+
+CREATE TRIGGER after_customer_update
+AFTER UPDATE ON customers
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'customers';
+END$$
+
+CREATE TRIGGER after_customer_delete
+AFTER DELETE ON customers
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'customers';
+END$$
+
+CREATE TRIGGER after_restaurant_update
+AFTER UPDATE ON restaurants
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'restaurants';
+END$$
+
+CREATE TRIGGER after_menu_insert
+AFTER INSERT ON menu
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'menu';
+END$$
+
+CREATE TRIGGER after_menu_update
+AFTER UPDATE ON menu
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'menu';
+END$$
+
+CREATE TRIGGER after_menu_delete
+AFTER DELETE ON menu
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'menu';
+END$$
+
+CREATE TRIGGER after_order_item_update
+AFTER UPDATE ON order_items
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'order_items';
+END$$
+
+CREATE TRIGGER after_order_item_delete
+AFTER DELETE ON order_items
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'order_items';
+END$$
+
+CREATE TRIGGER after_driver_update
+AFTER UPDATE ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'delivery_drivers';
+END$$
+
+-- Triggers 22-32: Foreign keys of the partitioned tables (InnoDB has none there),
+-- locking reads and skipped with foreign_key_checks = 0 like real ones
+CREATE TRIGGER before_order_insert
+BEFORE INSERT ON orders
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF NEW.Customer_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM customers WHERE Customer_ID = NEW.Customer_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (orders.Customer_ID)';
+        END IF;
+        IF NEW.Restaurant_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM restaurants WHERE Restaurant_ID = NEW.Restaurant_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (orders.Restaurant_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_order_update
+BEFORE UPDATE ON orders
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF NEW.Customer_ID IS NOT NULL AND NOT (NEW.Customer_ID <=> OLD.Customer_ID)
+           AND NOT EXISTS (SELECT 1 FROM customers WHERE Customer_ID = NEW.Customer_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (orders.Customer_ID)';
+        END IF;
+        IF NEW.Restaurant_ID IS NOT NULL AND NOT (NEW.Restaurant_ID <=> OLD.Restaurant_ID)
+           AND NOT EXISTS (SELECT 1 FROM restaurants WHERE Restaurant_ID = NEW.Restaurant_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (orders.Restaurant_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_order_delete
+BEFORE DELETE ON orders
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF EXISTS (SELECT 1 FROM order_items WHERE Order_ID = OLD.Order_ID AND Order_Date = OLD.Order_Date FOR SHARE)
+           OR EXISTS (SELECT 1 FROM deliveries WHERE Order_ID = OLD.Order_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1451,
+                MESSAGE_TEXT = 'Cannot delete or update a parent row: a foreign key constraint fails (order_items / deliveries.Order_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_order_item_insert
+BEFORE INSERT ON order_items
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF NEW.Order_ID IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM orders WHERE Order_ID = NEW.Order_ID AND Order_Date = NEW.Order_Date FOR SHARE
+        ) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (order_items.Order_ID, Order_Date)';
+        END IF;
+        IF NEW.Menu_Item_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM menu WHERE Menu_Item_ID = NEW.Menu_Item_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (order_items.Menu_Item_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_order_item_update
+BEFORE UPDATE ON order_items
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        -- moving with their order (after_order_update) passes: the order already has the new date
+        IF NEW.Order_ID IS NOT NULL
+           AND NOT (NEW.Order_ID <=> OLD.Order_ID AND NEW.Order_Date <=> OLD.Order_Date)
+           AND NOT EXISTS (
+            SELECT 1 FROM orders WHERE Order_ID = NEW.Order_ID AND Order_Date = NEW.Order_Date FOR SHARE
+        ) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (order_items.Order_ID, Order_Date)';
+        END IF;
+        IF NEW.Menu_Item_ID IS NOT NULL AND NOT (NEW.Menu_Item_ID <=> OLD.Menu_Item_ID)
+           AND NOT EXISTS (SELECT 1 FROM menu WHERE Menu_Item_ID = NEW.Menu_Item_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (order_items.Menu_Item_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_delivery_insert
+BEFORE INSERT ON deliveries
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF NEW.Order_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM orders WHERE Order_ID = NEW.Order_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Order_ID)';
+        END IF;
+        IF NEW.Restaurant_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM restaurants WHERE Restaurant_ID = NEW.Restaurant_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Restaurant_ID)';
+        END IF;
+        IF NEW.Driver_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM delivery_drivers WHERE Driver_ID = NEW.Driver_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Driver_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_delivery_update
+BEFORE UPDATE ON deliveries
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF NEW.Order_ID IS NOT NULL AND NOT (NEW.Order_ID <=> OLD.Order_ID)
+           AND NOT EXISTS (SELECT 1 FROM orders WHERE Order_ID = NEW.Order_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Order_ID)';
+        END IF;
+        IF NEW.Restaurant_ID IS NOT NULL AND NOT (NEW.Restaurant_ID <=> OLD.Restaurant_ID)
+           AND NOT EXISTS (SELECT 1 FROM restaurants WHERE Restaurant_ID = NEW.Restaurant_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Restaurant_ID)';
+        END IF;
+        IF NEW.Driver_ID IS NOT NULL AND NOT (NEW.Driver_ID <=> OLD.Driver_ID)
+           AND NOT EXISTS (SELECT 1 FROM delivery_drivers WHERE Driver_ID = NEW.Driver_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Driver_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_customer_delete
+BEFORE DELETE ON customers
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF EXISTS (SELECT 1 FROM orders WHERE Customer_ID = OLD.Customer_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM orders_archive WHERE Customer_ID = OLD.Customer_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1451,
+                MESSAGE_TEXT = 'Cannot delete or update a parent row: a foreign key constraint fails (orders.Customer_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_restaurant_delete
+BEFORE DELETE ON restaurants
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF EXISTS (SELECT 1 FROM orders WHERE Restaurant_ID = OLD.Restaurant_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM orders_archive WHERE Restaurant_ID = OLD.Restaurant_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM deliveries WHERE Restaurant_ID = OLD.Restaurant_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM deliveries_archive WHERE Restaurant_ID = OLD.Restaurant_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1451,
+                MESSAGE_TEXT = 'Cannot delete or update a parent row: a foreign key constraint fails (orders / deliveries.Restaurant_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_menu_delete
+BEFORE DELETE ON menu
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF EXISTS (SELECT 1 FROM order_items WHERE Menu_Item_ID = OLD.Menu_Item_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM order_items_archive WHERE Menu_Item_ID = OLD.Menu_Item_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1451,
+                MESSAGE_TEXT = 'Cannot delete or update a parent row: a foreign key constraint fails (order_items.Menu_Item_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_driver_delete
+BEFORE DELETE ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF EXISTS (SELECT 1 FROM deliveries WHERE Driver_ID = OLD.Driver_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM deliveries_archive WHERE Driver_ID = OLD.Driver_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1451,
+                MESSAGE_TEXT = 'Cannot delete or update a parent row: a foreign key constraint fails (deliveries.Driver_ID)';
+        END IF;
+    END IF;
+END$$
+
+-- Triggers 33-34: Archived rows still count in the rollups until they are purged
+CREATE TRIGGER after_order_archive_delete
+AFTER DELETE ON orders_archive
+FOR EACH ROW
+BEGIN
+    CALL RollupOrder(OLD.Restaurant_ID, OLD.Customer_ID, OLD.Order_Date, -1, -OLD.Total_Amount);
+END$$
+
+CREATE TRIGGER after_delivery_archive_delete
+AFTER DELETE ON deliveries_archive
+FOR EACH ROW
+BEGIN
+    CALL RollupDelivery(OLD.Driver_ID, DATE(OLD.Pickup_Time), -1, -OLD.Delivery_Fee);
 END$$
 
 DELIMITER ;
@@ -156,8 +725,43 @@ BEGIN
 
     SET v_order_id = LAST_INSERT_ID();
 
-    INSERT INTO order_items (Order_ID, Menu_Item_ID, Quantity, Price)
-    VALUES (v_order_id, p_menu_item_id, p_quantity, v_price * p_quantity);
+    INSERT INTO order_items (Order_ID, Menu_Item_ID, Quantity, Price, Order_Date)
+    VALUES (v_order_id, p_menu_item_id, p_quantity, v_price * p_quantity, p_order_date);
+END$$
+
+
+-- Procedure: Place a multi-item order in one statement per table
+-- p_items: [{"menu_item_id": 1, "quantity": 2}, ...]
+CREATE PROCEDURE PlaceOrderItems(
+    IN p_customer_id INT,
+    IN p_restaurant_id INT,
+    IN p_order_date DATE,
+    IN p_items JSON
+)
+BEGIN
+    DECLARE v_order_id INT;
+    DECLARE v_matched INT;
+
+    INSERT INTO orders (Customer_ID, Restaurant_ID, Order_Date, Total_Amount)
+    VALUES (p_customer_id, p_restaurant_id, p_order_date, 0.00);
+
+    SET v_order_id = LAST_INSERT_ID();
+
+    -- one multi-row insert; the order_items trigger adds each line to the total
+    INSERT INTO order_items (Order_ID, Menu_Item_ID, Quantity, Price, Order_Date)
+    SELECT v_order_id, m.Menu_Item_ID, j.quantity, m.Price * j.quantity, p_order_date
+    FROM JSON_TABLE(p_items, '$[*]' COLUMNS (
+        menu_item_id INT PATH '$.menu_item_id',
+        quantity INT PATH '$.quantity'
+    )) AS j
+    JOIN menu m ON m.Menu_Item_ID = j.menu_item_id;
+
+    SET v_matched = ROW_COUNT();
+    IF v_matched <> JSON_LENGTH(p_items) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'PlaceOrderItems: unknown menu item in order';
+    END IF;
+
+    SELECT v_order_id AS Order_ID;
 END$$
 
 
@@ -174,8 +778,211 @@ BEGIN
     VALUES (p_order_id, p_restaurant_id, p_driver_id, NOW(), p_location, p_fee);
 END$$
 
+
+-- Procedure: Assign a batch of deliveries (auto-dispatch), given as a JSON list
+CREATE PROCEDURE AssignDeliveries(
+    IN p_deliveries JSON
+)
+BEGIN
+    -- AssignDelivery for a whole dispatch round: one multi-row insert
+    INSERT INTO deliveries (Order_ID, Restaurant_ID, Driver_ID, Pickup_Time, Location, Delivery_Fee)
+    SELECT j.order_id, j.restaurant_id, j.driver_id, NOW(), j.location, j.fee
+    FROM JSON_TABLE(p_deliveries, '$[*]' COLUMNS (
+        order_id INT PATH '$.order_id',
+        restaurant_id INT PATH '$.restaurant_id',
+        driver_id INT PATH '$.driver_id',
+        location VARCHAR(255) PATH '$.location',
+        fee DECIMAL(10,2) PATH '$.fee'
+    )) AS j;
+
+    SELECT ROW_COUNT() AS Assigned;
+END$$
+
+
+-- Procedure: Recount table_counters from the base tables
+CREATE PROCEDURE RebuildTableCounters()
+BEGIN
+    REPLACE INTO table_counters (Table_Name, Row_Count)
+    SELECT 'orders', COUNT(*) FROM orders
+    UNION ALL SELECT 'deliveries', COUNT(*) FROM deliveries
+    UNION ALL SELECT 'delivery_drivers', COUNT(*) FROM delivery_drivers
+    UNION ALL SELECT 'restaurants', COUNT(*) FROM restaurants;
+END$$
+
+
+-- Procedure: Apply one order's change to the rollups; p_count is +1 (insert), -1 (delete) or 0 (total changed)
+CREATE PROCEDURE RollupOrder(
+    IN p_restaurant_id INT,
+    IN p_customer_id INT,
+    IN p_order_date DATE,
+    IN p_count INT,
+    IN p_amount DECIMAL(14,2)
+)
+BEGIN
+    SET p_amount = COALESCE(p_amount, 0);
+
+    IF p_restaurant_id IS NOT NULL THEN
+        INSERT INTO restaurant_rollup (Restaurant_ID, Order_Count, Revenue)
+        VALUES (p_restaurant_id, p_count, p_amount)
+        ON DUPLICATE KEY UPDATE Order_Count = Order_Count + p_count, Revenue = Revenue + p_amount;
+
+        -- MIN/MAX can't be kept by deltas; one index dive per partition and one into the archive
+        UPDATE restaurant_rollup
+        SET Highest_Order = (SELECT MAX(m.Amount) FROM (
+                SELECT MAX(Total_Amount) AS Amount FROM orders WHERE Restaurant_ID = p_restaurant_id
+                UNION ALL
+                SELECT MAX(Total_Amount) FROM orders_archive WHERE Restaurant_ID = p_restaurant_id) AS m),
+            Lowest_Order = (SELECT MIN(m.Amount) FROM (
+                SELECT MIN(Total_Amount) AS Amount FROM orders WHERE Restaurant_ID = p_restaurant_id
+                UNION ALL
+                SELECT MIN(Total_Amount) FROM orders_archive WHERE Restaurant_ID = p_restaurant_id) AS m)
+        WHERE Restaurant_ID = p_restaurant_id;
+    END IF;
+
+    IF p_customer_id IS NOT NULL THEN
+        INSERT INTO customer_rollup (Customer_ID, Order_Count, Spent)
+        VALUES (p_customer_id, p_count, p_amount)
+        ON DUPLICATE KEY UPDATE Order_Count = Order_Count + p_count, Spent = Spent + p_amount;
+    END IF;
+
+    IF p_order_date IS NOT NULL THEN
+        INSERT INTO daily_rollup (Day, Order_Count, Revenue)
+        VALUES (p_order_date, p_count, p_amount)
+        ON DUPLICATE KEY UPDATE Order_Count = Order_Count + p_count, Revenue = Revenue + p_amount;
+    END IF;
+END$$
+
+-- Procedure: Apply one delivery's change to the rollups; p_count is +1 or -1
+CREATE PROCEDURE RollupDelivery(
+    IN p_driver_id INT,
+    IN p_day DATE,
+    IN p_count INT,
+    IN p_fee DECIMAL(14,2)
+)
+BEGIN
+    SET p_fee = COALESCE(p_fee, 0);
+
+    IF p_driver_id IS NOT NULL THEN
+        INSERT INTO driver_rollup (Driver_ID, Delivery_Count, Earnings)
+        VALUES (p_driver_id, p_count, p_fee)
+        ON DUPLICATE KEY UPDATE Delivery_Count = Delivery_Count + p_count, Earnings = Earnings + p_fee;
+    END IF;
+
+    IF p_day IS NOT NULL THEN
+        INSERT INTO daily_rollup (Day, Delivery_Count, Delivery_Fees)
+        VALUES (p_day, p_count, p_fee)
+        ON DUPLICATE KEY UPDATE Delivery_Count = Delivery_Count + p_count, Delivery_Fees = Delivery_Fees + p_fee;
+    END IF;
+END$$
+
+-- Procedure: Recompute every rollup from the base tables (live + archived rows)
+CREATE PROCEDURE RebuildRollups()
+BEGIN
+    DELETE FROM restaurant_rollup;
+    INSERT INTO restaurant_rollup (Restaurant_ID, Order_Count, Revenue, Highest_Order, Lowest_Order)
+    SELECT Restaurant_ID, COUNT(*), COALESCE(SUM(Total_Amount), 0), MAX(Total_Amount), MIN(Total_Amount)
+    FROM orders_all
+    WHERE Restaurant_ID IS NOT NULL
+    GROUP BY Restaurant_ID;
+
+    DELETE FROM customer_rollup;
+    INSERT INTO customer_rollup (Customer_ID, Order_Count, Spent)
+    SELECT Customer_ID, COUNT(*), COALESCE(SUM(Total_Amount), 0)
+    FROM orders_all
+    WHERE Customer_ID IS NOT NULL
+    GROUP BY Customer_ID;
+
+    DELETE FROM driver_rollup;
+    INSERT INTO driver_rollup (Driver_ID, Delivery_Count, Earnings)
+    SELECT dr.Driver_ID, COUNT(d.Delivery_ID), COALESCE(SUM(d.Delivery_Fee), 0)
+    FROM delivery_drivers dr
+    LEFT JOIN deliveries_all d ON d.Driver_ID = dr.Driver_ID
+    GROUP BY dr.Driver_ID;
+
+    DELETE FROM daily_rollup;
+    INSERT INTO daily_rollup (Day, Order_Count, Revenue)
+    SELECT Order_Date, COUNT(*), COALESCE(SUM(Total_Amount), 0)
+    FROM orders_all
+    GROUP BY Order_Date;
+
+    INSERT INTO daily_rollup (Day, Delivery_Count, Delivery_Fees)
+    SELECT s.Day, s.Deliveries, s.Fees
+    FROM (
+        SELECT DATE(Pickup_Time) AS Day, COUNT(*) AS Deliveries, COALESCE(SUM(Delivery_Fee), 0) AS Fees
+        FROM deliveries_all
+        GROUP BY DATE(Pickup_Time)
+    ) AS s
+    ON DUPLICATE KEY UPDATE Delivery_Count = s.Deliveries, Delivery_Fees = s.Fees;
+END$$
+
+-- Procedure: Monthly RANGE COLUMNS partitions on p_column up to the month of p_until.
+-- The first call partitions the table: p_old below the oldest row's month,
+-- one pYYYYMM per month from there, and p_future (MAXVALUE). Later calls split
+-- the months still missing out of p_future, which holds no rows normally.
+CREATE PROCEDURE EnsureMonthPartitions(
+    IN p_table VARCHAR(64),
+    IN p_column VARCHAR(64),
+    IN p_until DATE
+)
+BEGIN
+    DECLARE v_partitioned INT;
+    DECLARE v_first DATE;
+    DECLARE v_month DATE;
+    DECLARE v_parts TEXT DEFAULT '';
+
+    SELECT COUNT(*) INTO v_partitioned
+    FROM information_schema.partitions
+    WHERE table_schema = DATABASE() AND table_name = p_table AND partition_name IS NOT NULL;
+
+    IF v_partitioned = 0 THEN
+        SET @oldest = NULL;
+        SET @sql = CONCAT('SELECT MIN(', p_column, ') INTO @oldest FROM ', p_table);
+        PREPARE stmt FROM @sql;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+        SET v_first = DATE_FORMAT(LEAST(DATE(COALESCE(@oldest, CURDATE())), p_until), '%Y-%m-01');
+        SET v_month = v_first;
+    ELSE
+        -- bounds read back as quoted literals: '2026-11-01' or '2026-11-01 00:00:00'
+        SELECT MAX(DATE(TRIM(BOTH '''' FROM partition_description))) INTO v_month
+        FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = p_table AND partition_name <> 'p_future';
+        SET v_month = COALESCE(v_month, DATE_FORMAT(CURDATE(), '%Y-%m-01'));
+    END IF;
+
+    WHILE v_month <= p_until DO
+        SET v_parts = CONCAT(v_parts, 'PARTITION p', DATE_FORMAT(v_month, '%Y%m'),
+                             ' VALUES LESS THAN (''', v_month + INTERVAL 1 MONTH, '''), ');
+        SET v_month = v_month + INTERVAL 1 MONTH;
+    END WHILE;
+
+    SET @ddl = NULL;
+    IF v_partitioned = 0 THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' PARTITION BY RANGE COLUMNS (', p_column, ') (',
+                          'PARTITION p_old VALUES LESS THAN (''', v_first, '''), ', v_parts,
+                          'PARTITION p_future VALUES LESS THAN (MAXVALUE))');
+    ELSEIF v_parts <> '' THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' REORGANIZE PARTITION p_future INTO (', v_parts,
+                          'PARTITION p_future VALUES LESS THAN (MAXVALUE))');
+    END IF;
+
+    IF @ddl IS NOT NULL THEN
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
 DELIMITER ;
 
+-- ============================================================
+-- PARTITIONS (one per month; the archive job adds the coming months)
+-- ============================================================
+
+CALL EnsureMonthPartitions('orders', 'Order_Date', CURDATE() + INTERVAL 3 MONTH);
+CALL EnsureMonthPartitions('order_items', 'Order_Date', CURDATE() + INTERVAL 3 MONTH);
+CALL EnsureMonthPartitions('deliveries', 'Pickup_Time', CURDATE() + INTERVAL 3 MONTH);
+
 -- ============================================================
 -- FUNCTIONS
 -- ============================================================
@@ -194,34 +1001,47 @@ BEGIN
     RETURN cnt;
 END$$
 
--- Function 2: Get total revenue of a restaurant
+-- Function 2: Get total revenue of a restaurant (kept in restaurant_rollup)
 CREATE FUNCTION GetRestaurantRevenue(p_restaurant_id INT)
 RETURNS DECIMAL(10,2)
 DETERMINISTIC
 BEGIN
     DECLARE total DECIMAL(10,2);
-    SELECT COALESCE(SUM(Total_Amount), 0)
+    SELECT COALESCE(SUM(Revenue), 0)
     INTO total
-    FROM orders
+    FROM restaurant_rollup
     WHERE Restaurant_ID = p_restaurant_id;
     RETURN total;
 END$$
 
--- Function 3: Get total earnings of a delivery driver
+-- Function 3: Get total earnings of a delivery driver (kept in driver_rollup)
 CREATE FUNCTION GetDriverEarnings(p_driver_id INT)
 RETURNS DECIMAL(10,2)
 DETERMINISTIC
 BEGIN
     DECLARE total DECIMAL(10,2);
-    SELECT COALESCE(SUM(Delivery_Fee), 0)
+    SELECT COALESCE(SUM(Earnings), 0)
     INTO total
-    FROM deliveries
+    FROM driver_rollup
     WHERE Driver_ID = p_driver_id;
     RETURN total;
 END$$
 
 DELIMITER ;
 
+-- ============================================================
+-- ROLES (database accounts get one of these instead of their own grants)
+-- ============================================================
+
+CREATE ROLE IF NOT EXISTS app_admin, app_manager, app_operator, app_viewer;
+
+GRANT ALL PRIVILEGES ON dbms_project.* TO app_admin;
+GRANT SELECT, INSERT, UPDATE ON dbms_project.* TO app_manager;
+GRANT SELECT, INSERT, UPDATE, DELETE ON dbms_project.orders TO app_operator;
+GRANT SELECT, INSERT, UPDATE, DELETE ON dbms_project.order_items TO app_operator;
+GRANT SELECT, INSERT, UPDATE, DELETE ON dbms_project.deliveries TO app_operator;
+GRANT SELECT ON dbms_project.* TO app_viewer;
+
 -- ============================================================
 -- END OF DATABASE STRUCTURE
 -- ============================================================
@@ -1,12 +1,43 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context, g, session, has_request_context
 from db_config import init_mysql
-from flask_mysqldb import MySQL
-from MySQLdb import OperationalError as MySQLOperationalError
+from db_pool import PooledMySQL
+from ref_cache import ReferenceCache
+from fragment_cache import FragmentCacheExtension
+from sql_perf import SQLPerf
+from purge import PurgeWorker
+from csv_import import ImportWorker
+from group_commit import OrderWriter, QueueFull
+import archive
+import csv_import
+import purge
+import user_admin
+import export
+import dispatch
+import group_commit
+import validation
 from typing import Any, cast
+import hashlib
+import os
+import re
+import sys
+import textwrap
+import threading
+import time
+import uuid
+import click
+import json
+from datetime import date
+from decimal import Decimal
+from jinja2 import FileSystemBytecodeCache
 
 app = Flask(__name__)
 app.secret_key = 'secret123'
-mysql: MySQL = init_mysql(app)
+init_mysql(app)  # loads the MYSQL_* settings
+# connections come from a shared pool instead of one new connection per request;
+# views marked @mysql.read_only read from MYSQL_REPLICA_HOST when one is configured
+mysql = PooledMySQL(app)
+# times every statement run through get_cursor(); see /debug/perf
+sql_perf = SQLPerf(app)
 
 
 def get_cursor():
@@ -15,7 +46,7 @@ def get_cursor():
     # Pylance may consider `mysql.connection` optional; cast to Any to narrow type for the checker
     conn = cast(Any, mysql.connection)
     assert conn is not None
-    return conn.cursor()
+    return sql_perf.cursor(conn.cursor())
 
 
 def commit_db():
@@ -25,109 +56,1094 @@ def commit_db():
     assert conn is not None
     conn.commit()
 
+
+def rollback_db():
+    """Roll back current DB transaction."""
+    assert mysql is not None
+    conn = cast(Any, mysql.connection)
+    assert conn is not None
+    conn.rollback()
+
+
+# ----------------------------
+# Reference data cache (form dropdowns, bulk validation)
+# ----------------------------
+app.config.setdefault('REF_CACHE_MAX_ENTRIES', 64)
+app.config.setdefault('REF_CACHE_TTL', 300)  # seconds
+ref_cache = ReferenceCache(app.config['REF_CACHE_MAX_ENTRIES'], app.config['REF_CACHE_TTL'])
+
+# name -> (query, tables it depends on)
+REFERENCE_QUERIES = {
+    'restaurants_by_name': ("SELECT * FROM restaurants ORDER BY Name", ('restaurants',)),
+}
+
+
+def reference_rows(name: str):
+    """Rows for one of REFERENCE_QUERIES, served from ref_cache when still current."""
+    sql, tables = REFERENCE_QUERIES[name]
+
+    def load():
+        cur = get_cursor()
+        cur.execute(sql)
+        return tuple(cur.fetchall())
+
+    return ref_cache.get(name, tables, load)
+
+
+# ----------------------------
+# Conditional GET (ETag / 304 from the table_versions stamps)
+# ----------------------------
+app.config.setdefault('CONDITIONAL_GET', True)
+
+# endpoint -> tables its response is built from
+ETAG_TABLES = {
+    'index': ('orders', 'deliveries', 'delivery_drivers', 'restaurants'),
+    'orders': ('orders', 'customers', 'restaurants'),
+    'order_detail': ('orders', 'customers', 'restaurants', 'order_items', 'menu', 'deliveries'),
+    'view_data': ('deliveries', 'orders', 'customers', 'restaurants'),
+    'reports': ('customers', 'orders', 'deliveries'),
+    'customers': ('customers',),
+    'restaurants': ('restaurants',),
+    'drivers': ('delivery_drivers',),
+    'menu_items': ('menu',),
+    'join_query': ('restaurants',),
+    'nested_query': (),
+    'aggregate_query': (),
+    'assign_delivery': (),
+    'api_search_customers': ('customers',),
+    'api_lookup': ('customers', 'orders', 'restaurants', 'menu', 'delivery_drivers', 'deliveries'),
+}
+VERSIONED_TABLES = tuple(sorted({t for tables in ETAG_TABLES.values() for t in tables}))
+# endpoints that show the last RECENT_MONTHS only: their page also changes when a month begins
+WINDOWED_ENDPOINTS = {'view_data', 'join_query'}
+
+
+def _code_stamp() -> str:
+    """Latest change to this module or a template, so a deploy never revalidates an old page."""
+    template_dir = os.path.join(app.root_path, app.template_folder or 'templates')
+    paths = [__file__] + [os.path.join(root, name) for root, _, names in os.walk(template_dir) for name in names]
+    return str(max(os.stat(path).st_mtime_ns for path in paths))
+
+
+app.config.setdefault('ETAG_SALT', _code_stamp())
+
+
+def table_versions(tables):
+    """
+    Version stamps for `tables` (None when table_versions is missing).
+
+    All the stamps are read in one query, once per request. It is the first
+    read of the request's transaction, so the page's own queries run on the
+    same REPEATABLE READ snapshot the stamps describe.
+    """
+    if '_table_versions' not in g:
+        try:
+            cur = get_cursor()
+            # an IN list keeps this a primary-key range read
+            cur.execute(f"SELECT Table_Name, Version FROM table_versions "
+                        f"WHERE Table_Name IN ({', '.join(['%s'] * len(VERSIONED_TABLES))})", VERSIONED_TABLES)
+            g._table_versions = {r['Table_Name']: r['Version'] for r in cur.fetchall()}
+        except Exception:
+            # migration 008 not applied yet: no ETags, every request renders
+            g._table_versions = None
+    if g._table_versions is None:
+        return None
+    return tuple(g._table_versions.get(t, 0) for t in tables)
+
+
+@app.before_request
+def conditional_get():
+    """Answer If-None-Match with 304, before any data query, when none of the page's tables changed."""
+    tables = ETAG_TABLES.get(request.endpoint)
+    # a pending flash message is part of the next page rendered
+    if (tables is None or request.method not in ('GET', 'HEAD') or not app.config['CONDITIONAL_GET']
+            or session.get('_flashes')):
+        return None
+    versions = table_versions(tables)
+    if versions is None:
+        return None
+    since = recent_cutoff() if request.endpoint in WINDOWED_ENDPOINTS else None
+    g._etag = hashlib.sha1(repr((app.config['ETAG_SALT'], request.full_path, versions, since)).encode()).hexdigest()
+    if request.if_none_match.contains_weak(g._etag):
+        return Response(status=304)
+    return None
+
+
+@app.after_request
+def add_etag(response):
+    etag = g.pop('_etag', None)
+    if etag and response.status_code in (200, 304):
+        response.set_etag(etag, weak=True)
+        # browsers may keep the page but must revalidate it on every use
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# ----------------------------
+# Template caches (compiled templates on disk, rendered fragments in memory)
+# ----------------------------
+# new workers load compiled templates from here instead of compiling them again;
+# entries are keyed by the template source, so an edited template recompiles ('' turns it off)
+app.config.setdefault('JINJA_BYTECODE_CACHE_DIR', os.path.join(app.instance_path, 'jinja-bytecode'))
+app.config.setdefault('FRAGMENT_CACHE_MAX_ENTRIES', 256)
+app.config.setdefault('FRAGMENT_CACHE', True)
+
+
+def bytecode_cache(directory: str):
+    """FileSystemBytecodeCache in `directory`, or None when it is off or can't be created."""
+    if not directory:
+        return None
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        return None
+    return FileSystemBytecodeCache(directory)
+
+
+def fragment_versions(tables):
+    """Stamps keying {% cache %} blocks: this request's table_versions (None outside a request)."""
+    if not has_request_context() or not set(tables) <= set(VERSIONED_TABLES):
+        return None
+    return table_versions(tables)
+
+
+app.jinja_env.bytecode_cache = bytecode_cache(app.config['JINJA_BYTECODE_CACHE_DIR'])
+app.jinja_env.add_extension(FragmentCacheExtension)
+# ttl 0: the stamps in every key already make entries stale, LRU bounds the memory
+fragment_cache = ReferenceCache(app.config['FRAGMENT_CACHE_MAX_ENTRIES'], ttl=0)
+app.jinja_env.fragment_cache = fragment_cache if app.config['FRAGMENT_CACHE'] else None
+app.jinja_env.fragment_versions = fragment_versions
+
+
+# ----------------------------
+# Keyset pagination helpers
+# ----------------------------
+app.config.setdefault('PAGE_SIZE', 50)
+app.config.setdefault('MAX_PAGE_SIZE', 500)
+
+
+def get_page_size() -> int:
+    """Page size from ?size=, clamped to MAX_PAGE_SIZE (falls back to PAGE_SIZE)."""
+    size = request.args.get('size', type=int) or app.config['PAGE_SIZE']
+    return max(1, min(size, app.config['MAX_PAGE_SIZE']))
+
+
+def fetch_keyset_page(cur, select_sql: str, key_column: str, key_field: str, where: str = '', params: tuple = ()):
+    """
+    Fetch one page of rows newest-first using the primary key as the cursor.
+
+    ?after=<id> returns rows older than <id>, ?before=<id> returns rows newer than <id>.
+    Only PAGE_SIZE + 1 rows are ever read, so cost stays flat as the table grows.
+    Returns (rows, pager) where pager holds next/prev URLs for the template.
+    """
+    size = get_page_size()
+    after = request.args.get('after', type=int)
+    before = request.args.get('before', type=int)
+
+    conditions = [where] if where else []
+    args = list(params)
+    if before is not None:
+        conditions.append(f"{key_column} > %s")
+        args.append(before)
+        order = 'ASC'
+    else:
+        if after is not None:
+            conditions.append(f"{key_column} < %s")
+            args.append(after)
+        order = 'DESC'
+
+    sql = select_sql
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {key_column} {order} LIMIT %s"
+    args.append(size + 1)
+    cur.execute(sql, tuple(args))
+    rows = list(cur.fetchall())
+
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if before is not None:
+        rows.reverse()
+        has_newer, has_older = has_more, bool(rows)
+    else:
+        has_newer, has_older = after is not None and bool(rows), has_more
+
+    page_args = {k: v for k, v in request.args.items() if k not in ('after', 'before')}
+    page_args.update(request.view_args or {})
+    pager = {
+        'size': size,
+        'next_url': url_for(request.endpoint, after=rows[-1][key_field], **page_args) if has_older else None,
+        'prev_url': url_for(request.endpoint, before=rows[0][key_field], **page_args) if has_newer else None,
+    }
+    return rows, pager
+
+
 # ----------------------------
 # Home Page
 # ----------------------------
-@app.route('/')
-def index():
+# Dashboard card -> table_counters.Table_Name
+DASHBOARD_COUNTERS = {
+    'orders': 'orders',
+    'deliveries': 'deliveries',
+    'drivers': 'delivery_drivers',
+    'restaurants': 'restaurants',
+}
+
+
+def dashboard_counts() -> dict:
     cur = get_cursor()
-    # gather some quick counts for dashboard
-    counts = {}
-    try:
-        cur.execute('SELECT COUNT(*) AS cnt FROM orders')
-        counts['orders'] = cur.fetchone()['cnt']
-    except Exception:
-        counts['orders'] = 0
+    # counts are kept up to date by triggers, so this is one primary-key lookup
+    counts = {key: 0 for key in DASHBOARD_COUNTERS}
     try:
-        cur.execute('SELECT COUNT(*) AS cnt FROM deliveries')
-        counts['deliveries'] = cur.fetchone()['cnt']
-    except Exception:
-        counts['deliveries'] = 0
-    try:
-        cur.execute('SELECT COUNT(*) AS cnt FROM delivery_drivers')
-        counts['drivers'] = cur.fetchone()['cnt']
-    except Exception:
-        counts['drivers'] = 0
-    try:
-        cur.execute('SELECT COUNT(*) AS cnt FROM restaurants')
-        counts['restaurants'] = cur.fetchone()['cnt']
+        cur.execute(
+            "SELECT Table_Name, Row_Count FROM table_counters WHERE Table_Name IN (%s, %s, %s, %s)",
+            tuple(DASHBOARD_COUNTERS.values())
+        )
+        row_counts = {r['Table_Name']: r['Row_Count'] for r in cur.fetchall()}
+        for key, table in DASHBOARD_COUNTERS.items():
+            counts[key] = row_counts.get(table, 0)
     except Exception:
-        counts['restaurants'] = 0
+        pass
+    return counts
 
-    return render_template('index.html', counts=counts)
+
+@app.route('/')
+@mysql.read_only
+def index():
+    # the cards are a cached fragment: dashboard_counts() runs only when one of their tables changed
+    return render_template('index.html', load_counts=dashboard_counts)
 
 # ----------------------------
 # Place Order (calls procedure)
 # ----------------------------
-@app.route('/place_order', methods=['GET', 'POST'])
-def place_order():
+app.config.setdefault('MAX_ORDER_ITEMS', 500)
+# group commit: orders are queued and placed in batches, one transaction (one fsync) per batch
+app.config.setdefault('ORDER_GROUP_COMMIT', False)
+app.config.setdefault('GROUP_COMMIT_BATCH_SIZE', 100)       # orders per transaction
+app.config.setdefault('GROUP_COMMIT_MAX_WAIT_MS', 5)        # how long a batch may wait to fill
+app.config.setdefault('GROUP_COMMIT_QUEUE_SIZE', 5000)      # orders waiting before submits push back
+app.config.setdefault('GROUP_COMMIT_QUEUE_TIMEOUT', 0.5)    # seconds to wait for room, then 503
+app.config.setdefault('GROUP_COMMIT_RESULT_TIMEOUT', 30)    # seconds a request waits for its commit
+app.config.setdefault('ORDER_KEY_TTL', 86400)               # seconds idempotency keys are kept
+MAX_IDEMPOTENCY_KEY = 64
+
+
+def parse_order(data) -> dict:
+    """validation.parse_order, capped at MAX_ORDER_ITEMS lines."""
+    return validation.parse_order(data, app.config['MAX_ORDER_ITEMS'])
+
+
+def place_order_items(cur, order: dict) -> int:
+    """Insert a validated order and all its lines via PlaceOrderItems; return the new Order_ID."""
+    cur.callproc('PlaceOrderItems', (order['customer_id'], order['restaurant_id'],
+                                     order['order_date'], json.dumps(order['items'])))
+    order_id = cur.fetchone()['Order_ID']
+    while cur.nextset():
+        pass
+    return order_id
+
+
+order_writer = OrderWriter(
+    mysql.pool,
+    place_order_items,
+    batch_size=app.config['GROUP_COMMIT_BATCH_SIZE'],
+    max_wait=app.config['GROUP_COMMIT_MAX_WAIT_MS'] / 1000.0,
+    queue_size=app.config['GROUP_COMMIT_QUEUE_SIZE'],
+    queue_timeout=app.config['GROUP_COMMIT_QUEUE_TIMEOUT'],
+    key_ttl=app.config['ORDER_KEY_TTL'],
+    on_commit=lambda n: ref_cache.invalidate('orders'),
+)
+
+
+def submit_order(order: dict, key=None) -> int:
+    """
+    Place a validated order and return its Order_ID, through the group-commit
+    writer when ORDER_GROUP_COMMIT is on, otherwise in this request's own
+    transaction. A repeated idempotency `key` returns the first Order_ID.
+    """
+    if key is not None and not 0 < len(key) <= MAX_IDEMPOTENCY_KEY:
+        raise ValueError(f'The idempotency key must be 1-{MAX_IDEMPOTENCY_KEY} characters')
+    if app.config['ORDER_GROUP_COMMIT']:
+        return order_writer.submit(order, key, app.config['GROUP_COMMIT_RESULT_TIMEOUT'])
     cur = get_cursor()
-    cur.execute("SELECT * FROM customers")
-    customers = cur.fetchall()
-    cur.execute("SELECT * FROM restaurants")
-    restaurants = cur.fetchall()
-    cur.execute("SELECT * FROM menu")
-    menu = cur.fetchall()
+    if key:
+        digest = group_commit.request_hash(order)
+        order_id = group_commit.existing_order(cur, key, digest)
+        if order_id is not None:
+            return order_id
+    order_id = place_order_items(cur, order)
+    if key:
+        group_commit.remember(cur, key, digest, order_id)
+    commit_db()
+    ref_cache.invalidate('orders')
+    return order_id
+
 
+def order_form():
+    # a fresh key per rendered form, so a double submit places the order once
+    return render_template('place_order.html', idempotency_key=uuid.uuid4().hex)
+
+
+@app.route('/place_order', methods=['GET', 'POST'])
+def place_order():
     if request.method == 'POST':
-        customer_id = request.form['customer_id']
-        restaurant_id = request.form['restaurant_id']
-        menu_item_id = request.form['menu_item_id']
-        quantity = request.form['quantity']
-        cur.callproc('PlaceOrder', (customer_id, restaurant_id, '2025-10-10', menu_item_id, quantity))
-        commit_db()
-        flash('Order placed successfully!', 'success')
+        # one menu_item_id/quantity pair per line on the form
+        lines = zip(request.form.getlist('menu_item_id'), request.form.getlist('quantity'))
+        try:
+            order = parse_order({
+                'customer_id': request.form.get('customer_id'),
+                'restaurant_id': request.form.get('restaurant_id'),
+                'items': [{'menu_item_id': m, 'quantity': q} for m, q in lines],
+            })
+            order_id = submit_order(order, request.form.get('idempotency_key') or None)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return order_form()
+        except (QueueFull, TimeoutError):
+            flash('We are taking a lot of orders right now; please try again in a moment.', 'warning')
+            return order_form()
+        except Exception as e:
+            rollback_db()
+            flash(f'Error placing order: {str(e)}', 'danger')
+            return order_form()
+        flash(f'Order #{order_id} placed successfully!', 'success')
         return redirect(url_for('index'))
 
-    return render_template('place_order.html', customers=customers, restaurants=restaurants, menu=menu)
+    return order_form()
+
+
+@app.route('/api/orders', methods=['POST'])
+def api_place_order():
+    """
+    Place a multi-item order from JSON:
+    {"customer_id": 1, "restaurant_id": 1, "order_date": "2025-10-10",
+     "items": [{"menu_item_id": 1, "quantity": 2}, ...]}
+
+    An Idempotency-Key header makes retries safe: the same key returns the
+    same order_id. 503 (with Retry-After) when the order queue is full.
+    """
+    try:
+        order = parse_order(request.get_json(force=True, silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        order_id = submit_order(order, request.headers.get('Idempotency-Key'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+    except TimeoutError as e:
+        return jsonify({'error': str(e)}), 504
+    except Exception as e:
+        rollback_db()
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'order_id': order_id}), 201
+
+
+# ----------------------------
+# Bulk order ingestion (partner batches)
+# ----------------------------
+app.config.setdefault('BULK_CHUNK_SIZE', 1000)
+app.config.setdefault('BULK_MAX_ROWS', 100000)
+
+_autoinc_mode: dict = {}
+
+
+def chunk_reference_ids(cur, orders: list) -> dict:
+    """
+    Which of a chunk's customer, restaurant and menu item ids exist, read in
+    the chunk's own transaction: three primary-key IN lookups, whatever the
+    size of the tables.
+    """
+    def existing(sql, values):
+        values = sorted(set(values))
+        cur.execute(sql.format(', '.join(['%s'] * len(values))), values)
+        return {next(iter(r.values())) for r in cur.fetchall()}
+
+    return {
+        'customers': existing("SELECT Customer_ID FROM customers WHERE Deleted_At IS NULL AND Customer_ID IN ({})",
+                              (o['customer_id'] for o in orders)),
+        'restaurants': existing("SELECT Restaurant_ID FROM restaurants WHERE Restaurant_ID IN ({})",
+                                (o['restaurant_id'] for o in orders)),
+        'menu': existing("SELECT Menu_Item_ID FROM menu WHERE Menu_Item_ID IN ({})",
+                         (i['menu_item_id'] for o in orders for i in o['items'])),
+    }
+
+
+def _unknown_reference(order: dict, ids: dict):
+    """Return an error message if the order points at a missing customer, restaurant or menu item."""
+    if order['customer_id'] not in ids['customers']:
+        return f"Unknown customer_id {order['customer_id']}"
+    if order['restaurant_id'] not in ids['restaurants']:
+        return f"Unknown restaurant_id {order['restaurant_id']}"
+    for item in order['items']:
+        if item['menu_item_id'] not in ids['menu']:
+            return f"Unknown menu_item_id {item['menu_item_id']}"
+    return None
+
+
+def _consecutive_autoinc(cur) -> bool:
+    """
+    True when a multi-row INSERT is guaranteed consecutive AUTO_INCREMENT ids
+    (innodb_autoinc_lock_mode 0 or 1), so Order_IDs can be derived from the first one.
+    """
+    if 'consecutive' not in _autoinc_mode:
+        cur.execute("SELECT @@innodb_autoinc_lock_mode AS mode")
+        _autoinc_mode['consecutive'] = int(cur.fetchone()['mode']) < 2
+    return _autoinc_mode['consecutive']
+
+
+def insert_order_chunk(cur, orders: list) -> list:
+    """Insert validated orders and their lines; return the new Order_IDs in order."""
+    order_sql = "INSERT INTO orders (Customer_ID, Restaurant_ID, Order_Date, Total_Amount) VALUES (%s, %s, %s, 0.00)"
+    order_rows = [(o['customer_id'], o['restaurant_id'], o['order_date']) for o in orders]
+    if _consecutive_autoinc(cur):
+        # one explicit multi-row statement: executemany splits past max_stmt_length, and
+        # lastrowid would then be the first id of its last statement only
+        values = ', '.join(["(%s, %s, %s, 0.00)"] * len(order_rows))
+        cur.execute(f"INSERT INTO orders (Customer_ID, Restaurant_ID, Order_Date, Total_Amount) VALUES {values}",
+                    tuple(v for row in order_rows for v in row))
+        if cur.rowcount != len(order_rows):
+            raise RuntimeError(f'Inserted {cur.rowcount} of {len(order_rows)} orders')
+        first_id = cur.lastrowid
+        order_ids = list(range(first_id, first_id + len(order_rows)))
+    else:
+        # interleaved auto-increment: ids of a multi-row insert may have gaps
+        order_ids = []
+        for row in order_rows:
+            cur.execute(order_sql, row)
+            order_ids.append(cur.lastrowid)
+
+    # priced from menu in the same statement, as PlaceOrderItems does; the
+    # after_order_item_insert trigger adds each line price to orders.Total_Amount
+    lines = [
+        {'order_id': order_id, 'menu_item_id': item['menu_item_id'], 'quantity': item['quantity'],
+         'order_date': order['order_date']}
+        for order_id, order in zip(order_ids, orders)
+        for item in order['items']
+    ]
+    cur.execute("""
+        INSERT INTO order_items (Order_ID, Menu_Item_ID, Quantity, Price, Order_Date)
+        SELECT j.order_id, m.Menu_Item_ID, j.quantity, m.Price * j.quantity, j.order_date
+        FROM JSON_TABLE(%s, '$[*]' COLUMNS (
+            order_id INT PATH '$.order_id',
+            menu_item_id INT PATH '$.menu_item_id',
+            quantity INT PATH '$.quantity',
+            order_date DATE PATH '$.order_date'
+        )) AS j
+        JOIN menu m ON m.Menu_Item_ID = j.menu_item_id
+    """, (json.dumps(lines),))
+    if cur.rowcount != len(lines):
+        # a menu item went away since the chunk was validated
+        raise RuntimeError('Unknown menu item in chunk')
+    return order_ids
+
+
+def _read_bulk_payload() -> list:
+    """Return [(row, error)] from a JSON array, {"orders": [...]} or NDJSON body."""
+    body = request.get_data(as_text=True)
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        rows = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append((json.loads(line), None))
+            except ValueError:
+                rows.append((None, 'Invalid JSON line'))
+        return rows
+    data = json.loads(body)
+    if isinstance(data, dict):
+        data = data.get('orders')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of orders')
+    return [(row, None) for row in data]
+
+
+@app.route('/api/orders/bulk', methods=['POST'])
+def api_bulk_orders():
+    """
+    Ingest a batch of orders (same shape as /api/orders) from JSON or NDJSON.
+
+    Rows are checked and inserted in chunks of BULK_CHUNK_SIZE, one transaction
+    each: the chunk's ids are looked up with IN lists, its orders go in with one
+    multi-row INSERT and its lines with one INSERT ... SELECT priced from menu. The response lists one result
+    per input row, in input order.
+    """
+    try:
+        payload = _read_bulk_payload()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(payload) > app.config['BULK_MAX_ROWS']:
+        return jsonify({'error': f"At most {app.config['BULK_MAX_ROWS']} orders per request"}), 413
+
+    cur = get_cursor()
+    results: list = [None] * len(payload)
+    valid = []
+    for index, (row, error) in enumerate(payload):
+        if error is None:
+            try:
+                order = parse_order(row if isinstance(row, dict) else {})
+            except ValueError as e:
+                error = str(e)
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'error': error}
+        else:
+            valid.append((index, order))
+
+    chunk_size = app.config['BULK_CHUNK_SIZE']
+    for start in range(0, len(valid), chunk_size):
+        chunk = []
+        try:
+            ids = chunk_reference_ids(cur, [order for _, order in valid[start:start + chunk_size]])
+            for index, order in valid[start:start + chunk_size]:
+                error = _unknown_reference(order, ids)
+                if error:
+                    results[index] = {'index': index, 'status': 'error', 'error': error}
+                else:
+                    chunk.append((index, order))
+            order_ids = insert_order_chunk(cur, [order for _, order in chunk]) if chunk else []
+            commit_db()
+            if chunk:
+                ref_cache.invalidate('orders')
+        except Exception as e:
+            rollback_db()
+            for index, _ in chunk or valid[start:start + chunk_size]:
+                results[index] = {'index': index, 'status': 'error', 'error': f'Chunk failed: {str(e)}'}
+            continue
+        for (index, _), order_id in zip(chunk, order_ids):
+            results[index] = {'index': index, 'status': 'created', 'order_id': order_id}
+
+    created = sum(1 for r in results if r['status'] == 'created')
+    return jsonify({'created': created, 'failed': len(results) - created, 'results': results}), 200
+
 
 # ----------------------------
 # Assign Delivery (procedure)
 # ----------------------------
 @app.route('/assign_delivery', methods=['GET', 'POST'])
 def assign_delivery():
-    cur = get_cursor()
-    cur.execute("SELECT * FROM orders")
-    orders = cur.fetchall()
-    cur.execute("SELECT * FROM delivery_drivers")
-    drivers = cur.fetchall()
-    cur.execute("SELECT * FROM restaurants")
-    restaurants = cur.fetchall()
-
     if request.method == 'POST':
-        order_id = request.form['order_id']
-        restaurant_id = request.form['restaurant_id']
-        driver_id = request.form['driver_id']
-        location = request.form['location']
-        fee = request.form['fee']
-        cur.callproc('AssignDelivery', (order_id, restaurant_id, driver_id, location, fee))
+        try:
+            delivery = validation.parse_delivery(request.form)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return render_template('assign_delivery.html')
+        cur = get_cursor()
+        cur.callproc('AssignDelivery', (delivery['order_id'], delivery['restaurant_id'], delivery['driver_id'],
+                                        delivery['location'], delivery['fee']))
         commit_db()
         flash('Delivery assigned successfully!', 'success')
         return redirect(url_for('index'))
 
-    return render_template('assign_delivery.html', orders=orders, drivers=drivers, restaurants=restaurants)
+    return render_template('assign_delivery.html')
+
+
+# ----------------------------
+# Auto-dispatch (every waiting order to a free driver, in one batch)
+# ----------------------------
+app.config.setdefault('DISPATCH_BUSY_MINUTES', 45)     # a driver with a pickup this recent is still out
+app.config.setdefault('DISPATCH_DRIVER_CAPACITY', 1)   # orders per driver per round
+app.config.setdefault('DISPATCH_MAX_ORDERS', 5000)     # oldest waiting orders considered per round
+app.config.setdefault('DISPATCH_FEE', '40.00')         # driver waiting in the order's zone
+app.config.setdefault('DISPATCH_REMOTE_FEE', '60.00')  # driver from another zone
+app.config.setdefault('DISPATCH_ALLOW_REMOTE', True)   # send out-of-zone drivers for what is left
+
+
+def dispatch_round(dry_run: bool) -> dict:
+    """One dispatch.run_round() on this request's connection; commits unless dry_run."""
+    try:
+        result = dispatch.run_round(
+            get_cursor(),
+            dry_run=dry_run,
+            busy_minutes=app.config['DISPATCH_BUSY_MINUTES'],
+            capacity=app.config['DISPATCH_DRIVER_CAPACITY'],
+            max_orders=app.config['DISPATCH_MAX_ORDERS'],
+            fee=app.config['DISPATCH_FEE'],
+            remote_fee=app.config['DISPATCH_REMOTE_FEE'],
+            allow_remote=app.config['DISPATCH_ALLOW_REMOTE'],
+        )
+    except Exception:
+        rollback_db()
+        raise
+    if dry_run:
+        rollback_db()
+    else:
+        commit_db()
+    return result
+
+
+@app.route('/dispatch', methods=['GET', 'POST'])
+def dispatch_orders():
+    """GET previews the next round (dry run); POST runs it."""
+    if request.method == 'POST':
+        try:
+            result = dispatch_round(dry_run=False)
+        except Exception as e:
+            flash(f'Error dispatching orders: {str(e)}', 'danger')
+            return redirect(url_for('dispatch_orders'))
+        flash(f"{result['assigned']} order(s) dispatched, {len(result['unassigned'])} still waiting.", 'success')
+        return redirect(url_for('view_data'))
+    return render_template('dispatch.html', result=dispatch_round(dry_run=True))
+
+
+@app.route('/api/dispatch', methods=['POST'])
+def api_dispatch():
+    """
+    Run a dispatch round; {"dry_run": true} (or ?dry_run=1) only computes it.
+
+    Returns the counts, per-phase timings in ms, the assignments and the ids
+    of the orders left waiting.
+    """
+    data = request.get_json(silent=True) or {}
+    dry_run = bool(data.get('dry_run')) or request.args.get('dry_run') in ('1', 'true')
+    try:
+        result = dispatch_round(dry_run)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify(result)
+
+# ----------------------------
+# Working set (recent months of the partitioned tables)
+# ----------------------------
+# orders / order_items / deliveries have one partition per month (archive.py);
+# the browsing pages bound their date so MySQL opens the last RECENT_MONTHS
+# partitions only, however much history the tables hold.
+app.config.setdefault('RECENT_MONTHS', 3)
+app.config.setdefault('ARCHIVE_KEEP_MONTHS', 12)       # months kept in the live tables, this one included
+app.config.setdefault('ARCHIVE_AHEAD_MONTHS', 3)       # empty partitions kept ready ahead of today
+app.config.setdefault('ARCHIVE_BATCH_SIZE', 5000)      # rows per archive transaction
+app.config.setdefault('ARCHIVE_LOCK_WAIT_TIMEOUT', 5)  # seconds EXCHANGE / DROP PARTITION may wait for locks
+app.config.setdefault('ARCHIVE_PAUSE', 0.0)            # seconds between archive batches
+
+
+def recent_cutoff() -> date:
+    """First day of the oldest month the working-set pages read (the current month counts as one)."""
+    return archive.month_start(date.today(), app.config['RECENT_MONTHS'] - 1)
+
 
 # ----------------------------
 # View Data and Reports
 # ----------------------------
 @app.route('/view_data')
+@mysql.read_only
 def view_data():
     cur = get_cursor()
-    cur.execute("""
+    since = recent_cutoff()
+    records, pager = fetch_keyset_page(cur, """
         SELECT d.Delivery_ID as delivery_id, c.First_Name, c.Last_Name, r.Name AS Restaurant_Name, d.Pickup_Time, d.Location
         FROM deliveries d
         JOIN orders o ON d.Order_ID = o.Order_ID
         JOIN customers c ON o.Customer_ID = c.Customer_ID
         JOIN restaurants r ON o.Restaurant_ID = r.Restaurant_ID
-    """)
-    records = cur.fetchall()
-    return render_template('view_data.html', records=records)
+    """, 'd.Delivery_ID', 'delivery_id', f"d.Pickup_Time >= %s AND {VISIBLE_ORDERS}", (since,))
+    return render_template('view_data.html', records=records, pager=pager, since=since)
+
+
+# ----------------------------
+# Customer search (FULLTEXT name index, phone/email prefix indexes)
+# ----------------------------
+app.config.setdefault('SEARCH_MAX_CUSTOMERS', 1000)
+FULLTEXT_MIN_TOKEN = 3  # innodb_ft_min_token_size
+# rows stamped Deleted_At are waiting for the purge worker and must not show up
+VISIBLE_ORDERS = "o.Deleted_At IS NULL AND c.Deleted_At IS NULL"
+
+
+def _like_prefix(value: str) -> str:
+    """Escape LIKE wildcards so user input is only ever used as a literal prefix."""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def search_customers(cur, q: str, limit: int, offset: int = 0):
+    """
+    Return customers matching q, best match first.
+
+    - contains '@'          -> Email prefix (idx_customers_email)
+    - digits / leading '+'  -> Phone_No prefix (UNIQUE index)
+    - anything else         -> MATCH ... AGAINST on ft_customers_name, every word as a prefix;
+                               words shorter than the FULLTEXT token size fall back to name prefixes
+    """
+    columns = "Customer_ID, First_Name, Last_Name, Phone_No, Email"
+    if '@' in q:
+        cur.execute(f"SELECT {columns}, 1 AS Score FROM customers WHERE Email LIKE %s AND Deleted_At IS NULL "
+                    "ORDER BY Email, Customer_ID LIMIT %s OFFSET %s", (_like_prefix(q), limit, offset))
+        return cur.fetchall()
+
+    phone = re.sub(r'[\s\-()]', '', q)
+    if phone.lstrip('+').isdigit():
+        cur.execute(f"SELECT {columns}, 1 AS Score FROM customers WHERE Phone_No LIKE %s AND Deleted_At IS NULL "
+                    "ORDER BY Phone_No LIMIT %s OFFSET %s", (_like_prefix(phone), limit, offset))
+        return cur.fetchall()
+
+    words = re.findall(r'\w+', q)
+    ft_words = [w for w in words if len(w) >= FULLTEXT_MIN_TOKEN]
+    if ft_words:
+        against = ' '.join(f'+{w}*' for w in ft_words)
+        cur.execute(f"""
+            SELECT {columns}, MATCH(First_Name, Last_Name) AGAINST (%s IN BOOLEAN MODE) AS Score
+            FROM customers
+            WHERE MATCH(First_Name, Last_Name) AGAINST (%s IN BOOLEAN MODE) AND Deleted_At IS NULL
+            ORDER BY Score DESC, Customer_ID DESC
+            LIMIT %s OFFSET %s
+        """, (against, against, limit, offset))
+        return cur.fetchall()
+    if words:
+        prefix = _like_prefix(words[0])
+        cur.execute(f"""
+            SELECT {columns}, 1 AS Score FROM customers WHERE First_Name LIKE %s AND Deleted_At IS NULL
+            UNION
+            SELECT {columns}, 1 AS Score FROM customers WHERE Last_Name LIKE %s AND Deleted_At IS NULL
+            ORDER BY Customer_ID DESC
+            LIMIT %s OFFSET %s
+        """, (prefix, prefix, limit, offset))
+        return cur.fetchall()
+    return []
+
+
+@app.route('/api/search/customers')
+@mysql.read_only
+def api_search_customers():
+    """Ranked, paged customer hits as JSON (?q=&size=&page=)."""
+    q = request.args.get('q', '').strip()
+    size = get_page_size()
+    page = max(1, request.args.get('page', 1, type=int))
+    hits = search_customers(get_cursor(), q, size + 1, (page - 1) * size) if q else []
+    return jsonify({
+        'q': q,
+        'page': page,
+        'has_next': len(hits) > size,
+        'results': [
+            {
+                'customer_id': h['Customer_ID'],
+                'name': f"{h['First_Name']} {h['Last_Name']}",
+                'phone': h['Phone_No'],
+                'email': h['Email'],
+                'score': float(h['Score']),
+            }
+            for h in hits[:size]
+        ],
+    })
+
+
+# ----------------------------
+# Typeahead lookups for the order and delivery forms
+# ----------------------------
+app.config.setdefault('LOOKUP_LIMIT', 20)
+app.config.setdefault('LOOKUP_MAX_LIMIT', 50)
+
+# kind -> (table, key column, sort/prefix column, label expression)
+NAME_LOOKUPS = {
+    'restaurants': ('restaurants', 'Restaurant_ID', 'Name', 'Name'),
+    'drivers': ('delivery_drivers', 'Driver_ID', 'First_Name', "CONCAT(First_Name, ' ', Last_Name)"),
+    'menu': ('menu', 'Menu_Item_ID', 'Name', "CONCAT(Name, ' - ', Price)"),
+}
+
+
+def _name_lookup(cur, kind: str, q: str, after, limit: int, where: str = '', params: tuple = ()):
+    """
+    Prefix lookup ordered by (name, id) so it walks the name index.
+
+    after=<id> continues from that row: (name, id) > (name of <id>, <id>).
+    """
+    table, key, name_col, label = NAME_LOOKUPS[kind]
+    conditions = [f"{name_col} LIKE %s"]
+    args = [_like_prefix(q)]
+    if where:
+        conditions.append(where)
+        args.extend(params)
+    if after is not None:
+        conditions.append(f"({name_col}, {key}) > ((SELECT {name_col} FROM {table} WHERE {key} = %s), %s)")
+        args.extend([after, after])
+    cur.execute(f"""
+        SELECT {key} AS id, {label} AS label
+        FROM {table}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {name_col}, {key}
+        LIMIT %s
+    """, tuple(args) + (limit + 1,))
+    rows = list(cur.fetchall())
+    return rows[:limit], (rows[limit - 1]['id'] if len(rows) > limit else None)
+
+
+def order_search(cur, q: str):
+    """
+    (WHERE fragment, args) for the orders q finds, or None when it finds none.
+
+    q is a customer name, phone or email (search_customers); all digits is
+    also an order id, so those match either one. Both sides are index
+    lookups (PRIMARY, idx_orders_customer) that MySQL unions.
+    """
+    parts, args = [], []
+    if q.isdigit():
+        parts.append("o.Order_ID = %s")
+        args.append(int(q))
+    customer_ids = [c['Customer_ID'] for c in search_customers(cur, q, app.config['SEARCH_MAX_CUSTOMERS'])]
+    if customer_ids:
+        parts.append(f"o.Customer_ID IN ({', '.join(['%s'] * len(customer_ids))})")
+        args.extend(customer_ids)
+    if not parts:
+        return None
+    return f"({' OR '.join(parts)})", tuple(args)
+
+
+def _order_lookup(cur, q: str, after, limit: int, undelivered: bool):
+    """Newest orders first; q is an order id or a customer name/phone/email."""
+    conditions, args = [VISIBLE_ORDERS], []
+    if q:
+        search = order_search(cur, q)
+        if search is None:
+            return [], None
+        conditions.append(search[0])
+        args.extend(search[1])
+    if after is not None:
+        conditions.append("o.Order_ID < %s")
+        args.append(after)
+    # customer_current_orders holds exactly the orders that have no delivery yet
+    source = "customer_current_orders cco JOIN orders o ON o.Order_ID = cco.Order_ID" if undelivered else "orders o"
+    cur.execute(f"""
+        SELECT o.Order_ID, o.Restaurant_ID, c.First_Name, c.Last_Name, r.Name AS Restaurant
+        FROM {source}
+        JOIN customers c ON o.Customer_ID = c.Customer_ID
+        JOIN restaurants r ON o.Restaurant_ID = r.Restaurant_ID
+        WHERE {' AND '.join(conditions)}
+        ORDER BY o.Order_ID DESC
+        LIMIT %s
+    """, tuple(args) + (limit + 1,))
+    rows = list(cur.fetchall())
+    results = [
+        {
+            'id': r['Order_ID'],
+            'label': f"Order #{r['Order_ID']} - {r['First_Name']} {r['Last_Name']} ({r['Restaurant']})",
+            # lets the delivery form fill in the restaurant for the picked order
+            'fill': {'restaurant_id': {'id': r['Restaurant_ID'], 'label': r['Restaurant']}},
+        }
+        for r in rows[:limit]
+    ]
+    return results, (rows[limit - 1]['Order_ID'] if len(rows) > limit else None)
+
+
+@app.route('/api/lookup/<kind>')
+@mysql.read_only
+def api_lookup(kind: str):
+    """
+    Typeahead source: ?q=<prefix>&limit=&after=<id>.
+
+    kinds: customers, restaurants, drivers, menu (&restaurant_id=), orders (&undelivered=1).
+    Returns {"results": [{"id", "label"}], "next": <after cursor or null>}.
+    """
+    q = request.args.get('q', '').strip()
+    after = request.args.get('after', type=int)
+    limit = request.args.get('limit', app.config['LOOKUP_LIMIT'], type=int)
+    limit = max(1, min(limit, app.config['LOOKUP_MAX_LIMIT']))
+    cur = get_cursor()
+
+    if kind == 'customers':
+        if q:
+            hits = search_customers(cur, q, limit)
+            results, next_after = [{'id': h['Customer_ID'], 'label': f"{h['First_Name']} {h['Last_Name']}"} for h in hits], None
+        else:
+            if after is not None:
+                cur.execute("SELECT Customer_ID, First_Name, Last_Name FROM customers "
+                            "WHERE Customer_ID < %s AND Deleted_At IS NULL ORDER BY Customer_ID DESC LIMIT %s", (after, limit + 1))
+            else:
+                cur.execute("SELECT Customer_ID, First_Name, Last_Name FROM customers "
+                            "WHERE Deleted_At IS NULL ORDER BY Customer_ID DESC LIMIT %s", (limit + 1,))
+            rows = list(cur.fetchall())
+            results = [{'id': r['Customer_ID'], 'label': f"{r['First_Name']} {r['Last_Name']}"} for r in rows[:limit]]
+            next_after = rows[limit - 1]['Customer_ID'] if len(rows) > limit else None
+    elif kind == 'orders':
+        results, next_after = _order_lookup(cur, q, after, limit, request.args.get('undelivered') == '1')
+    elif kind == 'menu' and request.args.get('restaurant_id', type=int) is not None:
+        results, next_after = _name_lookup(cur, kind, q, after, limit, 'Restaurant_ID = %s',
+                                           (request.args.get('restaurant_id', type=int),))
+    elif kind in NAME_LOOKUPS:
+        results, next_after = _name_lookup(cur, kind, q, after, limit)
+    else:
+        return jsonify({'error': f'Unknown lookup {kind}'}), 404
+
+    return jsonify({'results': list(results), 'next': next_after})
+
+
+# ----------------------------
+# Purge queue (deleted customers and orders are removed in the background)
+# ----------------------------
+app.config.setdefault('PURGE_BATCH_SIZE', 500)        # orders per DELETE batch
+app.config.setdefault('PURGE_BATCH_PAUSE', 0.05)      # seconds between batches
+app.config.setdefault('PURGE_POLL_INTERVAL', 30)      # seconds between queue checks
+app.config.setdefault('PURGE_WORKER', True)           # run the worker thread in this process
+app.config.setdefault('PURGE_MAX_CUSTOMERS', 10000)   # per bulk request
+
+purge_worker = PurgeWorker(
+    mysql.pool,
+    batch_size=app.config['PURGE_BATCH_SIZE'],
+    pause=app.config['PURGE_BATCH_PAUSE'],
+    poll_interval=app.config['PURGE_POLL_INTERVAL'],
+    on_batch=lambda n: ref_cache.invalidate('customers', 'orders'),
+)
+
+
+@app.before_request
+def start_purge_worker():
+    # started lazily so CLI commands and imports don't spawn the thread
+    if app.config['PURGE_WORKER']:
+        purge_worker.start()
+
+
+def queue_purge(customer_ids=(), order_ids=()) -> int:
+    """Hide the rows now, commit, and hand the actual deletes to the purge worker."""
+    cur = get_cursor()
+    job_id = purge.enqueue(cur, customer_ids, order_ids)
+    commit_db()
+    ref_cache.invalidate('customers', 'orders')
+    if app.config['PURGE_WORKER']:
+        purge_worker.wake()
+    return job_id
+
+
+@app.route('/api/customers/purge', methods=['POST'])
+def api_purge_customers():
+    """
+    Bulk delete: {"customer_ids": [...]} (and/or "order_ids").
+
+    Returns 202 with the job id right away; poll /api/purge/<job_id> for progress.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = {}
+    for field in ('customer_ids', 'order_ids'):
+        value = data.get(field, [])
+        if not isinstance(value, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in value):
+            return jsonify({'error': f'{field} must be a list of integers'}), 400
+        ids[field] = value
+    if not ids['customer_ids'] and not ids['order_ids']:
+        return jsonify({'error': 'Nothing to delete'}), 400
+    if len(ids['customer_ids']) > app.config['PURGE_MAX_CUSTOMERS']:
+        return jsonify({'error': f"At most {app.config['PURGE_MAX_CUSTOMERS']} customers per request"}), 400
+
+    try:
+        job_id = queue_purge(ids['customer_ids'], ids['order_ids'])
+    except Exception as e:
+        rollback_db()
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'job_id': job_id, 'status_url': url_for('api_purge_status', job_id=job_id)}), 202
+
+
+@app.route('/api/purge/<int:job_id>')
+@mysql.primary
+def api_purge_status(job_id: int):
+    """Progress of one purge job (Status, Orders_Done / Orders_Total, Percent_Done)."""
+    job = purge.job_status(get_cursor(), job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown purge job {job_id}'}), 404
+    return jsonify(job)
+
+
+# ----------------------------
+# Bulk CSV import (customers, restaurants, menu, drivers; run by a background worker)
+# ----------------------------
+app.config.setdefault('IMPORT_DIR', os.path.join(app.instance_path, 'imports'))  # uploads wait here
+app.config.setdefault('IMPORT_CHUNK_SIZE', 5000)      # rows per validate + insert transaction
+app.config.setdefault('IMPORT_METHOD', 'insert')      # 'insert' or 'load' (LOAD DATA LOCAL INFILE)
+app.config.setdefault('IMPORT_MAX_ROWS', 1000000)     # per file
+app.config.setdefault('IMPORT_MAX_ERRORS', 10000)     # row errors kept per job (all are counted)
+app.config.setdefault('IMPORT_ERRORS_SHOWN', 200)     # on the job page
+app.config.setdefault('IMPORT_POLL_INTERVAL', 30)     # seconds between queue checks
+app.config.setdefault('IMPORT_WORKER', True)          # run the worker thread in this process
+
+import_worker = ImportWorker(
+    mysql.pool,
+    chunk_size=app.config['IMPORT_CHUNK_SIZE'],
+    method=app.config['IMPORT_METHOD'],
+    # LOAD DATA LOCAL needs local_infile on the connection; the pool's don't have it
+    connect=(lambda: mysql.connect(app.config, local_infile=1)) if app.config['IMPORT_METHOD'] == 'load' else None,
+    poll_interval=app.config['IMPORT_POLL_INTERVAL'],
+    max_errors=app.config['IMPORT_MAX_ERRORS'],
+    on_chunk=lambda table, n: ref_cache.invalidate(table),
+)
+
+
+@app.before_request
+def start_import_worker():
+    if app.config['IMPORT_WORKER']:
+        import_worker.start()
+
+
+def queue_import(table: str, file_name: str, save) -> int:
+    """
+    Spool a CSV into IMPORT_DIR with `save(path)`, check it, queue its job and
+    commit; ValueError (file removed) when it can't be imported.
+    """
+    os.makedirs(app.config['IMPORT_DIR'], exist_ok=True)
+    path = os.path.join(app.config['IMPORT_DIR'], f'{uuid.uuid4().hex}.csv')
+    save(path)
+    try:
+        rows = csv_import.inspect_file(path, table, app.config['IMPORT_MAX_ROWS'])
+        cur = get_cursor()
+        job_id = csv_import.enqueue(cur, table, file_name, path, rows)
+        commit_db()
+    except Exception:
+        os.remove(path)
+        raise
+    if app.config['IMPORT_WORKER']:
+        import_worker.wake()
+    return job_id
+
+
+@app.route('/import', methods=['GET', 'POST'])
+@mysql.primary
+def import_data():
+    """Upload a CSV for one of csv_import.IMPORTS; the import runs in the background."""
+    if request.method == 'POST':
+        table = request.form.get('target', '')
+        upload = request.files.get('file')
+        if table not in csv_import.IMPORTS:
+            flash('Choose what the file contains', 'danger')
+        elif upload is None or not upload.filename:
+            flash('Choose a CSV file to upload', 'danger')
+        else:
+            try:
+                job_id = queue_import(table, upload.filename, upload.save)
+            except ValueError as e:
+                flash(f'{upload.filename}: {e}', 'danger')
+            else:
+                flash(f'Import #{job_id} queued', 'success')
+                return redirect(url_for('import_status', job_id=job_id))
+    cur = get_cursor()
+    cur.execute("SELECT * FROM import_jobs ORDER BY Job_ID DESC LIMIT 20")
+    return render_template('import.html', jobs=cur.fetchall(), imports=csv_import.IMPORTS,
+                           required=csv_import.REQUIRED, chunk_size=app.config['IMPORT_CHUNK_SIZE'])
+
+
+@app.route('/import/<int:job_id>')
+@mysql.primary
+def import_status(job_id: int):
+    """Progress and row errors of one import (?format=json for polling)."""
+    job = csv_import.job_status(get_cursor(), job_id, app.config['IMPORT_ERRORS_SHOWN'])
+    if request.args.get('format') == 'json':
+        if job is None:
+            return jsonify({'error': f'Unknown import {job_id}'}), 404
+        job.pop('File_Path')
+        return jsonify(job)
+    if job is None:
+        flash(f'Unknown import {job_id}', 'warning')
+        return redirect(url_for('import_data'))
+    return render_template('import_status.html', job=job)
+
+
+@app.route('/import/<int:job_id>/errors.csv')
+def import_errors(job_id: int):
+    """Every recorded row error of one import, streamed as CSV."""
+    body = export.stream_query(mysql.pool, "SELECT Line_No, Error FROM import_errors WHERE Job_ID = %s "
+                               "ORDER BY Line_No", (job_id,), 'csv', fetch_size=app.config['EXPORT_FETCH_SIZE'])
+    return Response(stream_with_context(body), mimetype=export.FORMATS['csv'], headers={
+        'Content-Disposition': f'attachment; filename=import-{job_id}-errors.csv',
+    })
 
 
 # ----------------------------
 # Orders list and details (read-only)
 # ----------------------------
 @app.route('/orders')
+@mysql.read_only
 def orders():
     q = request.args.get('q', '').strip()
     cur = get_cursor()
@@ -136,57 +1152,90 @@ def orders():
         FROM orders o
         JOIN customers c ON o.Customer_ID = c.Customer_ID
         JOIN restaurants r ON o.Restaurant_ID = r.Restaurant_ID
-        ORDER BY o.Order_ID DESC
     """
     if q:
-        # simple search: by order id or customer name
-        if q.isdigit():
-            cur.execute("SELECT o.Order_ID, o.Order_Date, c.First_Name, c.Last_Name, r.Name AS Restaurant FROM orders o JOIN customers c ON o.Customer_ID=c.Customer_ID JOIN restaurants r ON o.Restaurant_ID=r.Restaurant_ID WHERE o.Order_ID=%s", (q,))
+        # an order id and/or the customers the search indexes find
+        search = order_search(cur, q)
+        if search:
+            rows, pager = fetch_keyset_page(cur, base_sql, 'o.Order_ID', 'Order_ID',
+                                            f"{search[0]} AND {VISIBLE_ORDERS}", search[1])
         else:
-            cur.execute("SELECT o.Order_ID, o.Order_Date, c.First_Name, c.Last_Name, r.Name AS Restaurant FROM orders o JOIN customers c ON o.Customer_ID=c.Customer_ID JOIN restaurants r ON o.Restaurant_ID=r.Restaurant_ID WHERE CONCAT(c.First_Name,' ',c.Last_Name) LIKE %s", (f"%{q}%",))
+            rows, pager = [], None
     else:
-        cur.execute(base_sql)
+        rows, pager = fetch_keyset_page(cur, base_sql, 'o.Order_ID', 'Order_ID', VISIBLE_ORDERS)
+
+    return render_template('orders.html', orders=rows, q=q, pager=pager)
+
 
-    rows = cur.fetchall()
-    return render_template('orders.html', orders=rows, q=q)
+# ----------------------------
+# Schema probe (optional columns, looked up once per process)
+# ----------------------------
+# name the app selects it as -> (table, columns that may hold it, first one present wins)
+OPTIONAL_COLUMNS = {
+    'Phone': ('customers', ('Phone_No', 'Phone')),
+}
+_schema_columns = {}
+_schema_lock = threading.Lock()
+
+
+def schema_columns() -> dict:
+    """OPTIONAL_COLUMNS name -> column present in this database, or None; one information_schema read per process."""
+    if not _schema_columns:
+        with _schema_lock:
+            if not _schema_columns:
+                tables = sorted({table for table, _ in OPTIONAL_COLUMNS.values()})
+                cur = get_cursor()
+                cur.execute(f"SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.columns "
+                            f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({', '.join(['%s'] * len(tables))})",
+                            tuple(tables))
+                present = {(r['TABLE_NAME'].lower(), r['COLUMN_NAME'].lower()) for r in cur.fetchall()}
+                _schema_columns.update({
+                    name: next((c for c in candidates if (table, c.lower()) in present), None)
+                    for name, (table, candidates) in OPTIONAL_COLUMNS.items()
+                })
+    return _schema_columns
+
+
+def _json_rows(value, key: str) -> list:
+    """Rows from a JSON_ARRAYAGG column (NULL when there are none), sorted by `key`; decimals stay Decimal."""
+    if value is None:
+        return []
+    rows = json.loads(value, parse_float=Decimal)
+    return sorted(rows, key=lambda r: r[key])
 
 
 @app.route('/order/<int:order_id>')
+@mysql.read_only
 def order_detail(order_id: int):
+    phone = schema_columns()['Phone']
     cur = get_cursor()
-    # Some schemas may not include a Phone column on customers; try the richer query first
-    try:
-        cur.execute(
-            "SELECT o.*, c.First_Name, c.Last_Name, c.Phone, r.Name AS Restaurant "
-            "FROM orders o JOIN customers c ON o.Customer_ID=c.Customer_ID "
-            "JOIN restaurants r ON o.Restaurant_ID=r.Restaurant_ID WHERE o.Order_ID=%s",
-            (order_id,)
-        )
-    except MySQLOperationalError:
-        # Fallback to a query that doesn't reference c.Phone
-        cur.execute(
-            "SELECT o.*, c.First_Name, c.Last_Name, r.Name AS Restaurant "
-            "FROM orders o JOIN customers c ON o.Customer_ID=c.Customer_ID "
-            "JOIN restaurants r ON o.Restaurant_ID=r.Restaurant_ID WHERE o.ORDER_ID=%s",
-            (order_id,)
-        )
+    # one round trip: the lines and deliveries come back as JSON arrays next to the header;
+    # both subqueries are Order_ID index lookups (lines also prune to the order's date partition)
+    cur.execute(f"""
+        SELECT o.*, c.First_Name, c.Last_Name, {f'c.{phone}' if phone else 'NULL'} AS Phone, r.Name AS Restaurant,
+            (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                        'Order_Item_ID', oi.Order_Item_ID, 'Menu_Item_ID', oi.Menu_Item_ID, 'MenuName', m.Name,
+                        'Quantity', oi.Quantity, 'Price', oi.Price))
+             FROM order_items oi JOIN menu m ON oi.Menu_Item_ID = m.Menu_Item_ID
+             WHERE oi.Order_ID = o.Order_ID AND oi.Order_Date = o.Order_Date) AS Items_JSON,
+            (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                        'Delivery_ID', d.Delivery_ID, 'Driver_ID', d.Driver_ID, 'Location', d.Location,
+                        'Pickup_Time', DATE_FORMAT(d.Pickup_Time, '%%Y-%%m-%%d %%H:%%i:%%s'), 'Fee', d.Delivery_Fee))
+             FROM deliveries d
+             WHERE d.Order_ID = o.Order_ID) AS Deliveries_JSON
+        FROM orders o
+        JOIN customers c ON o.Customer_ID = c.Customer_ID
+        JOIN restaurants r ON o.Restaurant_ID = r.Restaurant_ID
+        WHERE o.Order_ID = %s AND {VISIBLE_ORDERS}
+    """, (order_id,))
     order = cur.fetchone()
 
-    # try to fetch order items if table exists
     items = []
-    try:
-        cur.execute("SELECT oi.*, m.Name AS MenuName, m.Price FROM order_items oi JOIN menu m ON oi.Menu_Item_ID = m.Menu_Item_ID WHERE oi.Order_ID=%s", (order_id,))
-        items = cur.fetchall()
-    except Exception:
-        items = []
-
-    # deliveries for this order
     deliveries = []
-    try:
-        cur.execute("SELECT * FROM deliveries WHERE Order_ID=%s", (order_id,))
-        deliveries = cur.fetchall()
-    except Exception:
-        deliveries = []
+    if order is not None:
+        order = dict(order)
+        items = _json_rows(order.pop('Items_JSON'), 'Order_Item_ID')
+        deliveries = _json_rows(order.pop('Deliveries_JSON'), 'Delivery_ID')
 
     return render_template('order_detail.html', order=order, items=items, deliveries=deliveries)
 
@@ -194,7 +1243,9 @@ def order_detail(order_id: int):
 @app.route('/order/delete/<int:order_id>', methods=['POST'])
 def delete_order(order_id: int):
     """
-    Delete an order and all related data (order items and deliveries)
+    Delete an order and all related data (order items and deliveries).
+
+    The order is hidden immediately; the purge worker removes the rows.
     """
     cur = get_cursor()
     try:
@@ -202,26 +1253,11 @@ def delete_order(order_id: int):
         cur.execute("SELECT o.Order_ID, CONCAT(c.First_Name, ' ', c.Last_Name) as customer_name FROM orders o JOIN customers c ON o.Customer_ID=c.Customer_ID WHERE o.Order_ID=%s", (order_id,))
         order = cur.fetchone()
         order_info = f"Order #{order_id} from {order['customer_name']}" if order else f"Order #{order_id}"
-        
-        # Delete in correct order to respect foreign keys
-        # 1. Delete deliveries for this order
-        cur.execute("DELETE FROM deliveries WHERE Order_ID=%s", (order_id,))
-        
-        # 2. Delete order items
-        cur.execute("DELETE FROM order_items WHERE Order_ID=%s", (order_id,))
-        
-        # 3. Delete the order itself
-        cur.execute("DELETE FROM orders WHERE Order_ID=%s", (order_id,))
-        
-        commit_db()
+
+        queue_purge(order_ids=[order_id])
         flash(f'{order_info} and all associated data has been deleted successfully', 'success')
     except Exception as e:
-        # Rollback on error
-        assert mysql is not None
-        conn = cast(Any, mysql.connection)
-        assert conn is not None
-        conn.rollback()
-        
+        rollback_db()
         flash(f'Error deleting order: {str(e)}', 'danger')
     
     return redirect(url_for('orders'))
@@ -257,25 +1293,82 @@ def delete_delivery(delivery_id: int):
 # ----------------------------
 # Function Calls (reports)
 # ----------------------------
+# Active-order report: one grouped query per page instead of one
+# GetActiveOrderCount() call per customer.
+app.config.setdefault('REPORT_CACHE_TTL', 30)  # seconds; 0 disables caching
+
+REPORT_SORTS = {
+    'active': 'ActiveOrders DESC, c.Customer_ID',
+    'active_asc': 'ActiveOrders ASC, c.Customer_ID',
+    'name': 'c.First_Name, c.Last_Name, c.Customer_ID',
+}
+_report_cache: dict = {}
+
+
+def active_order_report(cur, sort: str, page: int, size: int):
+    """
+    Return (rows, has_next) for one page of the active-order report.
+
+    Counts come from a single GROUP BY over customer_current_orders, so the
+    number of round trips is constant regardless of how many customers exist.
+    Results are kept for REPORT_CACHE_TTL seconds, or until a write bumps
+    the version of a table the report reads.
+    """
+    ttl = app.config['REPORT_CACHE_TTL']
+    key = (sort, page, size, table_versions(ETAG_TABLES['reports']))
+    cached = _report_cache.get(key)
+    if ttl and cached and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+
+    cur.execute(f"""
+        SELECT c.Customer_ID, CONCAT(c.First_Name, ' ', c.Last_Name) AS Name,
+               COALESCE(a.ActiveOrders, 0) AS ActiveOrders
+        FROM customers c
+        LEFT JOIN (
+            SELECT Customer_ID, COUNT(*) AS ActiveOrders
+            FROM customer_current_orders
+            GROUP BY Customer_ID
+        ) a ON a.Customer_ID = c.Customer_ID
+        WHERE c.Deleted_At IS NULL
+        ORDER BY {REPORT_SORTS[sort]}
+        LIMIT %s OFFSET %s
+    """, (size + 1, (page - 1) * size))
+    rows = list(cur.fetchall())
+    result = (rows[:size], len(rows) > size)
+
+    if ttl:
+        if len(_report_cache) >= 256:
+            _report_cache.clear()
+        _report_cache[key] = (time.monotonic(), result)
+    return result
+
+
 @app.route('/reports')
+@mysql.read_only
 def reports():
-    cur = get_cursor()
-    cur.execute("SELECT Customer_ID, CONCAT(First_Name, ' ', Last_Name) AS Name FROM customers")
-    customers = cur.fetchall()
+    sort = request.args.get('sort', 'active')
+    if sort not in REPORT_SORTS:
+        sort = 'active'
+    page = max(1, request.args.get('page', 1, type=int))
+    size = get_page_size()
 
-    customer_data = []
-    for c in customers:
-        cur.execute(f"SELECT GetActiveOrderCount({c['Customer_ID']}) AS ActiveOrders")
-        active = cur.fetchone()['ActiveOrders']
-        customer_data.append({'name': c['Name'], 'active_orders': active})
+    cur = get_cursor()
+    rows, has_next = active_order_report(cur, sort, page, size)
+    customer_data = [{'name': r['Name'], 'active_orders': r['ActiveOrders']} for r in rows]
 
-    return render_template('reports.html', customer_data=customer_data)
+    pager = {
+        'size': size,
+        'next_url': url_for('reports', sort=sort, page=page + 1, size=size) if has_next else None,
+        'prev_url': url_for('reports', sort=sort, page=page - 1, size=size) if page > 1 else None,
+    }
+    return render_template('reports.html', customer_data=customer_data, pager=pager, sort=sort)
 
 
 # ----------------------------
 # Query 1: NESTED QUERY - Customers with multiple orders
 # ----------------------------
 @app.route('/query/nested-query', methods=['GET', 'POST'])
+@mysql.read_only
 def nested_query():
     """
     Nested Query: Find customers with more than X active orders
@@ -291,7 +1384,7 @@ def nested_query():
         query = """
         SELECT Customer_ID, CONCAT(First_Name, ' ', Last_Name) AS CustomerName, Email, Phone_No
         FROM customers
-        WHERE Customer_ID IN (
+        WHERE Deleted_At IS NULL AND Customer_ID IN (
             SELECT Customer_ID FROM customer_current_orders
             GROUP BY Customer_ID
             HAVING COUNT(*) > %s
@@ -311,6 +1404,7 @@ def nested_query():
 # Query 2: JOIN QUERY - Orders with delivery details
 # ----------------------------
 @app.route('/query/join-query', methods=['GET', 'POST'])
+@mysql.read_only
 def join_query():
     """
     Join Query: Find orders with their delivery and restaurant information
@@ -318,13 +1412,14 @@ def join_query():
     cur = get_cursor()
     results = []
     restaurant_filter = ''
+    since = recent_cutoff()
     
     if request.method == 'POST':
         restaurant_filter = request.form.get('restaurant_id', '')
         
         # JOIN QUERY: Select orders with complete delivery and restaurant information
         if restaurant_filter and restaurant_filter.isdigit():
-            query = """
+            query = f"""
             SELECT 
                 o.Order_ID,
                 CONCAT(c.First_Name, ' ', c.Last_Name) AS CustomerName,
@@ -338,14 +1433,14 @@ def join_query():
             FROM orders o
             JOIN customers c ON o.Customer_ID = c.Customer_ID
             JOIN restaurants r ON o.Restaurant_ID = r.Restaurant_ID
-            LEFT JOIN deliveries d ON o.Order_ID = d.Order_ID
+            LEFT JOIN deliveries d ON o.Order_ID = d.Order_ID AND d.Pickup_Time >= %s
             LEFT JOIN delivery_drivers dr ON d.Driver_ID = dr.Driver_ID
-            WHERE r.Restaurant_ID = %s
+            WHERE r.Restaurant_ID = %s AND o.Order_Date >= %s AND {VISIBLE_ORDERS}
             ORDER BY o.Order_Date DESC
             """
-            cur.execute(query, (restaurant_filter,))
+            cur.execute(query, (since, restaurant_filter, since))
         else:
-            query = """
+            query = f"""
             SELECT 
                 o.Order_ID,
                 CONCAT(c.First_Name, ' ', c.Last_Name) AS CustomerName,
@@ -359,29 +1454,91 @@ def join_query():
             FROM orders o
             JOIN customers c ON o.Customer_ID = c.Customer_ID
             JOIN restaurants r ON o.Restaurant_ID = r.Restaurant_ID
-            LEFT JOIN deliveries d ON o.Order_ID = d.Order_ID
+            LEFT JOIN deliveries d ON o.Order_ID = d.Order_ID AND d.Pickup_Time >= %s
             LEFT JOIN delivery_drivers dr ON d.Driver_ID = dr.Driver_ID
+            WHERE o.Order_Date >= %s AND {VISIBLE_ORDERS}
             ORDER BY o.Order_Date DESC
             LIMIT 50
             """
-            cur.execute(query)
+            cur.execute(query, (since, since))
         
         results = cur.fetchall()
         
         if not results:
             flash('No orders found matching the criteria.', 'info')
     
-    # Get restaurants for filter dropdown
-    cur.execute("SELECT Restaurant_ID, Name FROM restaurants ORDER BY Name")
-    restaurants = cur.fetchall()
+    def restaurants():
+        # restaurants for the filter dropdowns; the template calls this only when its fragment isn't cached
+        cur.execute("SELECT Restaurant_ID, Name FROM restaurants ORDER BY Name")
+        return cur.fetchall()
     
-    return render_template('query_join.html', results=results, restaurants=restaurants, selected_restaurant=restaurant_filter)
+    return render_template('query_join.html', results=results, restaurants=restaurants, selected_restaurant=restaurant_filter,
+                           limited=request.method == 'POST' and not restaurant_filter.isdigit(), since=since)
 
 
 # ----------------------------
 # Query 3: AGGREGATE QUERY - Revenue and statistics
 # ----------------------------
+# report -> (query over the rollup tables, message when empty)
+# The rollups are kept current by the order / delivery triggers, so each report
+# reads one row per restaurant / driver / customer / day instead of grouping
+# every order. `flask --app app verify-rollups` checks them against the base tables.
+AGGREGATE_QUERIES = {
+    'all_restaurants': ("""
+        SELECT
+            r.Restaurant_ID,
+            r.Name,
+            ru.Order_Count AS TotalOrders,
+            ru.Revenue AS TotalRevenue,
+            ROUND(ru.Revenue / ru.Order_Count, 2) AS AvgOrderValue,
+            ru.Highest_Order AS HighestOrder,
+            ru.Lowest_Order AS LowestOrder
+        FROM restaurant_rollup ru
+        JOIN restaurants r ON r.Restaurant_ID = ru.Restaurant_ID
+        WHERE ru.Order_Count > 0
+        ORDER BY ru.Revenue DESC
+    """, 'No restaurants with orders found.'),
+    'driver_earnings': ("""
+        SELECT
+            dr.Driver_ID,
+            CONCAT(dr.First_Name, ' ', dr.Last_Name) AS DriverName,
+            du.Delivery_Count AS TotalDeliveries,
+            du.Earnings AS TotalEarnings,
+            ROUND(du.Earnings / NULLIF(du.Delivery_Count, 0), 2) AS AvgFeePerDelivery
+        FROM driver_rollup du
+        JOIN delivery_drivers dr ON dr.Driver_ID = du.Driver_ID
+        ORDER BY du.Earnings DESC
+    """, 'No driver earnings data found.'),
+    'customer_spending': ("""
+        SELECT
+            c.Customer_ID,
+            CONCAT(c.First_Name, ' ', c.Last_Name) AS CustomerName,
+            cu.Order_Count AS TotalOrders,
+            cu.Spent AS TotalSpent,
+            ROUND(cu.Spent / cu.Order_Count, 2) AS AvgOrderValue
+        FROM customer_rollup cu
+        JOIN customers c ON c.Customer_ID = cu.Customer_ID
+        WHERE cu.Order_Count > 0 AND c.Deleted_At IS NULL
+        ORDER BY cu.Spent DESC
+    """, 'No customer spending data found.'),
+    'daily_totals': ("""
+        SELECT
+            Day,
+            Order_Count AS TotalOrders,
+            Revenue AS TotalRevenue,
+            ROUND(Revenue / NULLIF(Order_Count, 0), 2) AS AvgOrderValue,
+            Delivery_Count AS TotalDeliveries,
+            Delivery_Fees AS TotalDeliveryFees
+        FROM daily_rollup
+        WHERE Order_Count > 0 OR Delivery_Count > 0
+        ORDER BY Day DESC
+        LIMIT 90
+    """, 'No orders or deliveries recorded yet.'),
+}
+
+
 @app.route('/query/aggregate-query', methods=['GET', 'POST'])
+@mysql.read_only
 def aggregate_query():
     """
     Aggregate Query: Calculate revenue, order counts, and statistics
@@ -392,83 +1549,111 @@ def aggregate_query():
     
     if request.method == 'POST':
         query_type = request.form.get('query_type', 'all_restaurants')
+        if query_type not in AGGREGATE_QUERIES:
+            query_type = 'all_restaurants'
+        query, empty_message = AGGREGATE_QUERIES[query_type]
+        cur.execute(query)
+        results = cur.fetchall()
         
-        if query_type == 'all_restaurants':
-            # AGGREGATE QUERY: Restaurant revenue and order statistics
-            query = """
-            SELECT 
-                r.Restaurant_ID,
-                r.Name,
-                COUNT(DISTINCT o.Order_ID) AS TotalOrders,
-                COALESCE(SUM(o.Total_Amount), 0) AS TotalRevenue,
-                ROUND(AVG(o.Total_Amount), 2) AS AvgOrderValue,
-                MAX(o.Total_Amount) AS HighestOrder,
-                MIN(o.Total_Amount) AS LowestOrder
-            FROM restaurants r
-            LEFT JOIN orders o ON r.Restaurant_ID = o.Restaurant_ID
-            GROUP BY r.Restaurant_ID, r.Name
-            HAVING COUNT(DISTINCT o.Order_ID) > 0
-            ORDER BY TotalRevenue DESC
-            """
-            cur.execute(query)
-            results = cur.fetchall()
-            
-            if not results:
-                flash('No restaurants with orders found.', 'info')
-        
-        elif query_type == 'driver_earnings':
-            # AGGREGATE QUERY: Driver earnings statistics
-            query = """
-            SELECT 
-                dr.Driver_ID,
-                CONCAT(dr.First_Name, ' ', dr.Last_Name) AS DriverName,
-                COUNT(DISTINCT d.Delivery_ID) AS TotalDeliveries,
-                COALESCE(SUM(d.Delivery_Fee), 0) AS TotalEarnings,
-                ROUND(AVG(d.Delivery_Fee), 2) AS AvgFeePerDelivery
-            FROM delivery_drivers dr
-            LEFT JOIN deliveries d ON dr.Driver_ID = d.Driver_ID
-            GROUP BY dr.Driver_ID, dr.First_Name, dr.Last_Name
-            ORDER BY TotalEarnings DESC
-            """
-            cur.execute(query)
-            results = cur.fetchall()
-            
-            if not results:
-                flash('No driver earnings data found.', 'info')
-        
-        elif query_type == 'customer_spending':
-            # AGGREGATE QUERY: Customer spending statistics
-            query = """
-            SELECT 
-                c.Customer_ID,
-                CONCAT(c.First_Name, ' ', c.Last_Name) AS CustomerName,
-                COUNT(DISTINCT o.Order_ID) AS TotalOrders,
-                COALESCE(SUM(o.Total_Amount), 0) AS TotalSpent,
-                ROUND(AVG(o.Total_Amount), 2) AS AvgOrderValue
-            FROM customers c
-            LEFT JOIN orders o ON c.Customer_ID = o.Customer_ID
-            GROUP BY c.Customer_ID, c.First_Name, c.Last_Name
-            HAVING COUNT(DISTINCT o.Order_ID) > 0
-            ORDER BY TotalSpent DESC
-            """
-            cur.execute(query)
-            results = cur.fetchall()
-            
-            if not results:
-                flash('No customer spending data found.', 'info')
+        if not results:
+            flash(empty_message, 'info')
     
-    return render_template('query_aggregate.html', results=results, query_type=query_type)
+    return render_template('query_aggregate.html', results=results, query_type=query_type,
+                           query_sql=textwrap.dedent(AGGREGATE_QUERIES[query_type][0]).strip())
+
+
+# ----------------------------
+# Streaming exports (join query, deliveries)
+# ----------------------------
+app.config.setdefault('EXPORT_FETCH_SIZE', 1000)          # rows per fetchmany() / response chunk
+app.config.setdefault('EXPORT_NET_WRITE_TIMEOUT', 600)    # seconds the server waits on a slow download
+
+# name -> (query, date column, restaurant column, key column)
+EXPORTS = {
+    'orders': ("""
+        SELECT
+            o.Order_ID,
+            CONCAT(c.First_Name, ' ', c.Last_Name) AS CustomerName,
+            r.Name AS RestaurantName,
+            o.Order_Date,
+            o.Total_Amount,
+            d.Delivery_ID,
+            d.Location,
+            d.Delivery_Fee,
+            CONCAT(dr.First_Name, ' ', dr.Last_Name) AS DriverName
+        FROM orders o
+        JOIN customers c ON o.Customer_ID = c.Customer_ID
+        JOIN restaurants r ON o.Restaurant_ID = r.Restaurant_ID
+        LEFT JOIN deliveries d ON o.Order_ID = d.Order_ID
+        LEFT JOIN delivery_drivers dr ON d.Driver_ID = dr.Driver_ID
+    """, 'o.Order_Date', 'o.Restaurant_ID', 'o.Order_ID'),
+    'deliveries': ("""
+        SELECT d.Delivery_ID, c.First_Name, c.Last_Name, r.Name AS Restaurant_Name, d.Pickup_Time, d.Location
+        FROM deliveries d
+        JOIN orders o ON d.Order_ID = o.Order_ID
+        JOIN customers c ON o.Customer_ID = c.Customer_ID
+        JOIN restaurants r ON o.Restaurant_ID = r.Restaurant_ID
+    """, 'd.Pickup_Time', 'o.Restaurant_ID', 'd.Delivery_ID'),
+}
+
+
+def export_filters(date_column: str, restaurant_column: str):
+    """WHERE conditions and params from ?restaurant_id=&from=&to= (dates inclusive); ValueError on bad input."""
+    conditions, params = [VISIBLE_ORDERS], []
+    restaurant_id = request.args.get('restaurant_id', '')
+    if restaurant_id:
+        if not restaurant_id.isdigit():
+            raise ValueError('restaurant_id must be a number')
+        conditions.append(f"{restaurant_column} = %s")
+        params.append(int(restaurant_id))
+    for arg, condition in (('from', f"{date_column} >= %s"), ('to', f"{date_column} < %s + INTERVAL 1 DAY")):
+        value = request.args.get(arg, '')
+        if value:
+            try:
+                params.append(date.fromisoformat(value))
+            except ValueError:
+                raise ValueError(f'{arg} must be a date (YYYY-MM-DD)')
+            conditions.append(condition)
+    return conditions, tuple(params)
+
+
+@app.route('/export/<name>')
+def export_rows(name: str):
+    """
+    Stream a whole result set as ?format=csv (default) or ndjson.
+
+    Filters: restaurant_id, from, to. Rows come out in key order, so the
+    first bytes go out as soon as MySQL starts scanning.
+    """
+    fmt = request.args.get('format', 'csv')
+    if name not in EXPORTS or fmt not in export.FORMATS:
+        return jsonify({'error': f'Unknown export {name}.{fmt}'}), 404
+    select_sql, date_column, restaurant_column, key_column = EXPORTS[name]
+    try:
+        conditions, params = export_filters(date_column, restaurant_column)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    sql = f"{select_sql} WHERE {' AND '.join(conditions)} ORDER BY {key_column}"
+    # its own connection, not the request's: from the replica when one is usable
+    body = export.stream_query(mysql.read_pool(), sql, params, fmt,
+                               fetch_size=app.config['EXPORT_FETCH_SIZE'],
+                               net_write_timeout=app.config['EXPORT_NET_WRITE_TIMEOUT'])
+    return Response(stream_with_context(body), mimetype=export.FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename={name}-{date.today().isoformat()}.{fmt}',
+        'X-Accel-Buffering': 'no',  # keep nginx from buffering the whole download
+    })
 
 
 # ----------------------------
 # CRUD: Customers
 # ----------------------------
 @app.route('/customers')
+@mysql.read_only
 def customers():
     cur = get_cursor()
-    cur.execute("SELECT * FROM customers ORDER BY Customer_ID DESC")
-    rows = cur.fetchall()
-    return render_template('customers.html', customers=rows)
+    rows, pager = fetch_keyset_page(cur, "SELECT * FROM customers", 'Customer_ID', 'Customer_ID', "Deleted_At IS NULL")
+    return render_template('customers.html', customers=rows, pager=pager)
 
 
 @app.route('/customer/add', methods=['GET', 'POST'])
@@ -481,12 +1666,14 @@ def add_customer():
         email = request.form['email']
         cur.execute("INSERT INTO customers (First_Name, Last_Name, Phone_No, Email) VALUES (%s,%s,%s,%s)", (fn, ln, phone, email))
         commit_db()
+        ref_cache.invalidate('customers')
         flash('Customer added', 'success')
         return redirect(url_for('customers'))
     return render_template('customer_form.html', customer=None)
 
 
 @app.route('/customer/edit/<int:customer_id>', methods=['GET', 'POST'])
+@mysql.primary
 def edit_customer(customer_id: int):
     cur = get_cursor()
     if request.method == 'POST':
@@ -496,6 +1683,7 @@ def edit_customer(customer_id: int):
         email = request.form['email']
         cur.execute("UPDATE customers SET First_Name=%s, Last_Name=%s, Phone_No=%s, Email=%s WHERE Customer_ID=%s", (fn, ln, phone, email, customer_id))
         commit_db()
+        ref_cache.invalidate('customers')
         flash('Customer updated', 'success')
         return redirect(url_for('customers'))
     cur.execute("SELECT * FROM customers WHERE Customer_ID=%s", (customer_id,))
@@ -504,6 +1692,7 @@ def edit_customer(customer_id: int):
 
 
 @app.route('/customer/delete/<int:customer_id>')
+@mysql.primary
 def delete_customer(customer_id: int):
     cur = get_cursor()
     try:
@@ -511,31 +1700,13 @@ def delete_customer(customer_id: int):
         cur.execute("SELECT CONCAT(First_Name, ' ', Last_Name) as name FROM customers WHERE Customer_ID=%s", (customer_id,))
         customer = cur.fetchone()
         customer_name = customer['name'] if customer else 'Customer'
-        
-        # Get all order IDs for this customer
-        cur.execute("SELECT Order_ID FROM orders WHERE Customer_ID=%s", (customer_id,))
-        orders = cur.fetchall()
-        
-        # Delete all related data in correct order
-        for order in orders:
-            order_id = order['Order_ID']
-            # Delete deliveries for this order
-            cur.execute("DELETE FROM deliveries WHERE Order_ID=%s", (order_id,))
-            # Delete order items
-            cur.execute("DELETE FROM order_items WHERE Order_ID=%s", (order_id,))
-            # Delete the order
-            cur.execute("DELETE FROM orders WHERE Order_ID=%s", (order_id,))
-        
-        # Delete from customer_current_orders (NEW LINE)
-        cur.execute("DELETE FROM customer_current_orders WHERE Customer_ID=%s", (customer_id,))
-        
-        # Finally delete the customer
-        cur.execute("DELETE FROM customers WHERE Customer_ID=%s", (customer_id,))
-        commit_db()
-        
-        order_count = len(orders) if orders else 0
+
+        # the customer disappears now; their orders are deleted in batches by the purge worker
+        job_id = queue_purge(customer_ids=[customer_id])
+        job = purge.job_status(cur, job_id)
+        order_count = job['Orders_Total'] if job else 0
         if order_count > 0:
-            flash(f'Customer "{customer_name}" and their {order_count} order(s) with all associated data have been deleted successfully', 'success')
+            flash(f'Customer "{customer_name}" has been deleted; their {order_count} order(s) are being removed in the background', 'success')
         else:
             flash(f'Customer "{customer_name}" has been deleted successfully', 'success')
     except Exception as e:
@@ -559,11 +1730,11 @@ def delete_customer(customer_id: int):
 # CRUD: Restaurants
 # ----------------------------
 @app.route('/restaurants')
+@mysql.read_only
 def restaurants():
     cur = get_cursor()
-    cur.execute("SELECT * FROM restaurants ORDER BY Restaurant_ID DESC")
-    rows = cur.fetchall()
-    return render_template('restaurants.html', restaurants=rows)
+    rows, pager = fetch_keyset_page(cur, "SELECT * FROM restaurants", 'Restaurant_ID', 'Restaurant_ID')
+    return render_template('restaurants.html', restaurants=rows, pager=pager)
 
 
 @app.route('/restaurant/add', methods=['GET', 'POST'])
@@ -575,12 +1746,14 @@ def add_restaurant():
         phone = request.form['phone']
         cur.execute("INSERT INTO restaurants (Name, Address, Phone_No) VALUES (%s,%s,%s)", (name, address, phone))
         commit_db()
+        ref_cache.invalidate('restaurants')
         flash('Restaurant added', 'success')
         return redirect(url_for('restaurants'))
     return render_template('restaurant_form.html', restaurant=None)
 
 
 @app.route('/restaurant/edit/<int:restaurant_id>', methods=['GET', 'POST'])
+@mysql.primary
 def edit_restaurant(restaurant_id: int):
     cur = get_cursor()
     if request.method == 'POST':
@@ -589,6 +1762,7 @@ def edit_restaurant(restaurant_id: int):
         phone = request.form['phone']
         cur.execute("UPDATE restaurants SET Name=%s, Address=%s, Phone_No=%s WHERE Restaurant_ID=%s", (name, address, phone, restaurant_id))
         commit_db()
+        ref_cache.invalidate('restaurants')
         flash('Restaurant updated', 'success')
         return redirect(url_for('restaurants'))
     cur.execute("SELECT * FROM restaurants WHERE Restaurant_ID=%s", (restaurant_id,))
@@ -597,6 +1771,7 @@ def edit_restaurant(restaurant_id: int):
 
 
 @app.route('/restaurant/delete/<int:restaurant_id>')
+@mysql.primary
 def delete_restaurant(restaurant_id: int):
     cur = get_cursor()
     try:
@@ -608,6 +1783,7 @@ def delete_restaurant(restaurant_id: int):
         # Try to delete the restaurant
         cur.execute("DELETE FROM restaurants WHERE Restaurant_ID=%s", (restaurant_id,))
         commit_db()
+        ref_cache.invalidate('restaurants')
         flash(f'Restaurant "{restaurant_name}" has been deleted successfully', 'success')
     except Exception as e:
         # Rollback on error
@@ -631,11 +1807,11 @@ def delete_restaurant(restaurant_id: int):
 # CRUD: Drivers
 # ----------------------------
 @app.route('/drivers')
+@mysql.read_only
 def drivers():
     cur = get_cursor()
-    cur.execute("SELECT * FROM delivery_drivers ORDER BY Driver_ID DESC")
-    rows = cur.fetchall()
-    return render_template('drivers.html', drivers=rows)
+    rows, pager = fetch_keyset_page(cur, "SELECT * FROM delivery_drivers", 'Driver_ID', 'Driver_ID')
+    return render_template('drivers.html', drivers=rows, pager=pager)
 
 
 @app.route('/driver/add', methods=['GET', 'POST'])
@@ -648,12 +1824,14 @@ def add_driver():
         dest = request.form['destination']
         cur.execute("INSERT INTO delivery_drivers (First_Name, Last_Name, Pickup, Destination) VALUES (%s,%s,%s,%s)", (fn, ln, pickup, dest))
         commit_db()
+        ref_cache.invalidate('delivery_drivers')
         flash('Driver added', 'success')
         return redirect(url_for('drivers'))
     return render_template('driver_form.html', driver=None)
 
 
 @app.route('/driver/edit/<int:driver_id>', methods=['GET', 'POST'])
+@mysql.primary
 def edit_driver(driver_id: int):
     cur = get_cursor()
     if request.method == 'POST':
@@ -663,6 +1841,7 @@ def edit_driver(driver_id: int):
         dest = request.form['destination']
         cur.execute("UPDATE delivery_drivers SET First_Name=%s, Last_Name=%s, Pickup=%s, Destination=%s WHERE Driver_ID=%s", (fn, ln, pickup, dest, driver_id))
         commit_db()
+        ref_cache.invalidate('delivery_drivers')
         flash('Driver updated', 'success')
         return redirect(url_for('drivers'))
     cur.execute("SELECT * FROM delivery_drivers WHERE Driver_ID=%s", (driver_id,))
@@ -671,6 +1850,7 @@ def edit_driver(driver_id: int):
 
 
 @app.route('/driver/delete/<int:driver_id>')
+@mysql.primary
 def delete_driver(driver_id: int):
     cur = get_cursor()
     try:
@@ -682,6 +1862,7 @@ def delete_driver(driver_id: int):
         # Try to delete the driver
         cur.execute("DELETE FROM delivery_drivers WHERE Driver_ID=%s", (driver_id,))
         commit_db()
+        ref_cache.invalidate('delivery_drivers')
         flash(f'Driver "{driver_name}" has been deleted successfully', 'success')
     except Exception as e:
         # Rollback on error
@@ -705,18 +1886,16 @@ def delete_driver(driver_id: int):
 # CRUD: Menu Items
 # ----------------------------
 @app.route('/menu')
+@mysql.read_only
 def menu_items():
     cur = get_cursor()
-    cur.execute("SELECT * FROM menu ORDER BY Menu_Item_ID DESC")
-    rows = cur.fetchall()
-    return render_template('menu_items.html', menu=rows)
+    rows, pager = fetch_keyset_page(cur, "SELECT * FROM menu", 'Menu_Item_ID', 'Menu_Item_ID')
+    return render_template('menu_items.html', menu=rows, pager=pager)
 
 
 @app.route('/menu/add', methods=['GET', 'POST'])
 def add_menu_item():
     cur = get_cursor()
-    cur.execute("SELECT * FROM restaurants ORDER BY Name")
-    restaurants = cur.fetchall()
     if request.method == 'POST':
         name = request.form['name']
         restaurant_id = request.form['restaurant_id']
@@ -724,16 +1903,16 @@ def add_menu_item():
         price = request.form['price']
         cur.execute("INSERT INTO menu (Restaurant_ID, Name, Description, Price) VALUES (%s,%s,%s,%s)", (restaurant_id, name, description, price))
         commit_db()
+        ref_cache.invalidate('menu')
         flash('Menu item added', 'success')
         return redirect(url_for('menu_items'))
-    return render_template('menu_form.html', item=None, restaurants=restaurants)
+    return render_template('menu_form.html', item=None, restaurants=reference_rows('restaurants_by_name'))
 
 
 @app.route('/menu/edit/<int:menu_item_id>', methods=['GET', 'POST'])
+@mysql.primary
 def edit_menu_item(menu_item_id: int):
     cur = get_cursor()
-    cur.execute("SELECT * FROM restaurants ORDER BY Name")
-    restaurants = cur.fetchall()
     if request.method == 'POST':
         name = request.form['name']
         restaurant_id = request.form['restaurant_id']
@@ -741,19 +1920,22 @@ def edit_menu_item(menu_item_id: int):
         price = request.form['price']
         cur.execute("UPDATE menu SET Name=%s, Restaurant_ID=%s, Description=%s, Price=%s WHERE Menu_Item_ID=%s", (name, restaurant_id, description, price, menu_item_id))
         commit_db()
+        ref_cache.invalidate('menu')
         flash('Menu item updated', 'success')
         return redirect(url_for('menu_items'))
     cur.execute("SELECT * FROM menu WHERE Menu_Item_ID=%s", (menu_item_id,))
     item = cur.fetchone()
-    return render_template('menu_form.html', item=item, restaurants=restaurants)
+    return render_template('menu_form.html', item=item, restaurants=reference_rows('restaurants_by_name'))
 
 
 @app.route('/menu/delete/<int:menu_item_id>')
+@mysql.primary
 def delete_menu_item(menu_item_id: int):
     cur = get_cursor()
     try:
         cur.execute("DELETE FROM menu WHERE Menu_Item_ID=%s", (menu_item_id,))
         commit_db()
+        ref_cache.invalidate('menu')
         flash('Menu item deleted', 'warning')
     except Exception as e:
         # Rollback the transaction on error
@@ -774,7 +1956,14 @@ def delete_menu_item(menu_item_id: int):
 # ----------------------------
 # USER MANAGEMENT: Create Users and Grant Privileges
 # ----------------------------
+# Accounts get one role per privilege level (migration 013) instead of their own grants
+app.config.setdefault('USER_HOST', 'localhost')       # host part of the accounts created here
+app.config.setdefault('USER_BATCH_SIZE', 100)         # accounts per CREATE USER / GRANT statement
+app.config.setdefault('USER_BULK_MAX', 5000)          # accounts per /api/users/bulk request
+
+
 @app.route('/users')
+@mysql.primary
 def users():
     """
     Display list of database users and their privileges
@@ -787,7 +1976,8 @@ def users():
         flash(f'Error fetching users: {str(e)}', 'danger')
         users_list = []
     
-    return render_template('users.html', users=users_list)
+    return render_template('users.html', users=users_list,
+                           protected_users=user_admin.PROTECTED_USERS + tuple(user_admin.ROLES.values()))
 
 
 @app.route('/user/create', methods=['GET', 'POST'])
@@ -805,56 +1995,62 @@ def create_user():
             return render_template('user_form.html')
         
         cur = get_cursor()
-        try:
-            # Create user
-            cur.execute(f"CREATE USER IF NOT EXISTS '{username}'@'localhost' IDENTIFIED BY '{password}'")
-            
-            # Grant privileges based on role
-            if privilege_level == 'admin':
-                cur.execute(f"GRANT ALL PRIVILEGES ON dbms_project.* TO '{username}'@'localhost'")
-                privilege_desc = "All Privileges (Admin)"
-            elif privilege_level == 'manager':
-                cur.execute(f"GRANT SELECT, INSERT, UPDATE ON dbms_project.* TO '{username}'@'localhost'")
-                privilege_desc = "Select, Insert, Update (Manager)"
-            elif privilege_level == 'viewer':
-                cur.execute(f"GRANT SELECT ON dbms_project.* TO '{username}'@'localhost'")
-                privilege_desc = "Select Only (Viewer)"
-            elif privilege_level == 'operator':
-                # Operator can do CRUD on specific tables
-                cur.execute(f"GRANT SELECT, INSERT, UPDATE, DELETE ON dbms_project.orders TO '{username}'@'localhost'")
-                cur.execute(f"GRANT SELECT, INSERT, UPDATE, DELETE ON dbms_project.order_items TO '{username}'@'localhost'")
-                cur.execute(f"GRANT SELECT, INSERT, UPDATE, DELETE ON dbms_project.deliveries TO '{username}'@'localhost'")
-                privilege_desc = "Order/Delivery Operations (Operator)"
-            
-            cur.execute("FLUSH PRIVILEGES")
-            commit_db()
-            
-            flash(f'User "{username}" created with {privilege_desc}', 'success')
-            return redirect(url_for('users'))
-        
-        except Exception as e:
-            flash(f'Error creating user: {str(e)}', 'danger')
+        result, = user_admin.provision(cur, [{'username': username, 'password': password, 'role': privilege_level}],
+                                       host=app.config['USER_HOST'])
+        if result['status'] != 'created':
+            flash(f"Error creating user: {result['error']}", 'danger')
             return render_template('user_form.html')
+        flash(f'User "{username}" created with the {user_admin.ROLES[privilege_level]} role', 'success')
+        return redirect(url_for('users'))
     
     return render_template('user_form.html')
 
 
+@app.route('/api/users/bulk', methods=['POST'])
+def api_bulk_users():
+    """
+    Create many database accounts: {"role": ..., "users": [{"username", "password"?, "role"?}]}.
+
+    Accounts are created USER_BATCH_SIZE at a time, one CREATE USER, GRANT
+    <role> and SET DEFAULT ROLE statement per batch. A missing password is
+    generated and returned once, in that account's result.
+    """
+    data = request.get_json(silent=True)
+    if isinstance(data, list):
+        data = {'users': data}
+    if not isinstance(data, dict) or not isinstance(data.get('users'), list):
+        return jsonify({'error': 'Expected {"role": ..., "users": [...]}'}), 400
+    if len(data['users']) > app.config['USER_BULK_MAX']:
+        return jsonify({'error': f"At most {app.config['USER_BULK_MAX']} accounts per request"}), 413
+
+    accounts = []
+    for row in data['users']:
+        if isinstance(row, str):
+            row = {'username': row}
+        if isinstance(row, dict) and 'role' not in row:
+            row = dict(row, role=data.get('role'))
+        accounts.append(row)
+    results = user_admin.provision(get_cursor(), accounts, host=app.config['USER_HOST'],
+                                   batch_size=app.config['USER_BATCH_SIZE'])
+    created = sum(1 for r in results if r['status'] == 'created')
+    return jsonify({'created': created, 'failed': len(results) - created, 'results': results}), 200
+
+
 @app.route('/user/delete/<username>', methods=['POST'])
 def delete_user(username: str):
     """
     Delete a database user
     """
-    # Protect system users from deletion
-    protected_users = ['root', 'admin', 'mysql.sys', 'mysql.session', 'mysql.infoschema']
-    if username.lower() in protected_users:
-        flash(f'Cannot delete system user: {username}. This user is protected.', 'danger')
+    # Protect system users and the privilege roles from deletion
+    try:
+        user_admin.check_username(username)
+    except ValueError as e:
+        flash(f'Cannot delete {username}: {e}', 'danger')
         return redirect(url_for('users'))
     
     cur = get_cursor()
     try:
-        cur.execute(f"DROP USER IF EXISTS '{username}'@'localhost'")
-        cur.execute("FLUSH PRIVILEGES")
-        commit_db()
+        cur.execute("DROP USER IF EXISTS %s@%s", (username, app.config['USER_HOST']))
         flash(f'User "{username}" deleted successfully', 'success')
     except Exception as e:
         flash(f'Error deleting user: {str(e)}', 'danger')
@@ -863,6 +2059,7 @@ def delete_user(username: str):
 
 
 @app.route('/user/privileges/<username>')
+@mysql.primary
 def user_privileges(username: str):
     """
     View and manage privileges for a specific user
@@ -870,7 +2067,7 @@ def user_privileges(username: str):
     cur = get_cursor()
     try:
         # Get user grants information
-        cur.execute(f"SHOW GRANTS FOR '{username}'@'localhost'")
+        cur.execute("SHOW GRANTS FOR %s@%s", (username, app.config['USER_HOST']))
         grants = cur.fetchall()
     except Exception as e:
         flash(f'Error fetching privileges: {str(e)}', 'danger')
@@ -879,36 +2076,38 @@ def user_privileges(username: str):
     return render_template('user_privileges.html', username=username, grants=grants)
 
 
+@app.route('/users/matrix')
+@mysql.primary
+def user_matrix():
+    """Privileges and roles of every account on one page, from a single query."""
+    cur = get_cursor()
+    try:
+        rows = user_admin.privilege_matrix(cur, app.config.get('MYSQL_DB') or 'dbms_project')
+    except Exception as e:
+        flash(f'Error fetching privileges: {str(e)}', 'danger')
+        rows = []
+    return render_template('user_matrix.html', rows=rows, privileges=user_admin.MATRIX_PRIVILEGES)
+
+
 @app.route('/user/privileges/<username>/update', methods=['POST'])
 def update_user_privileges(username: str):
     """
     Update privileges for a specific user
     """
-    # Protect system users
-    protected_users = ['root', 'admin', 'mysql.sys', 'mysql.session', 'mysql.infoschema']
-    if username.lower() in protected_users:
-        flash(f'Cannot modify privileges for system user: {username}', 'danger')
+    # Protect system users and the privilege roles
+    try:
+        user_admin.check_username(username)
+    except ValueError as e:
+        flash(f'Cannot modify privileges for {username}: {e}', 'danger')
         return redirect(url_for('user_privileges', username=username))
     
+    privilege_level = request.form.get('privilege_level', 'viewer')
+    if privilege_level not in user_admin.ROLES:
+        privilege_level = 'viewer'
     cur = get_cursor()
     try:
-        privilege_level = request.form.get('privilege_level', 'viewer')
-        
-        # First, revoke all current privileges
-        cur.execute(f"REVOKE ALL PRIVILEGES ON dbms_project.* FROM '{username}'@'localhost'")
-        
-        # Grant new privileges based on role
-        if privilege_level == 'admin':
-            cur.execute(f"GRANT ALL PRIVILEGES ON dbms_project.* TO '{username}'@'localhost'")
-        elif privilege_level == 'manager':
-            cur.execute(f"GRANT SELECT, INSERT, UPDATE ON dbms_project.* TO '{username}'@'localhost'")
-        elif privilege_level == 'operator':
-            cur.execute(f"GRANT SELECT, INSERT, UPDATE, DELETE ON dbms_project.* TO '{username}'@'localhost'")
-        else:  # viewer
-            cur.execute(f"GRANT SELECT ON dbms_project.* TO '{username}'@'localhost'")
-        
-        cur.execute("FLUSH PRIVILEGES")
-        commit_db()
+        user_admin.set_level(cur, username, privilege_level, app.config.get('MYSQL_DB') or 'dbms_project',
+                             host=app.config['USER_HOST'])
         flash(f'Privileges updated for user "{username}" to {privilege_level.upper()}', 'success')
     except Exception as e:
         flash(f'Error updating privileges: {str(e)}', 'danger')
@@ -916,6 +2115,246 @@ def update_user_privileges(username: str):
     return redirect(url_for('user_privileges', username=username))
 
 
+# ----------------------------
+# Diagnostics
+# ----------------------------
+@app.route('/debug/pool')
+def debug_pool():
+    """Connection pool counters (checkouts, waits, timeouts, errors, sizes)."""
+    return jsonify(mysql.stats())
+
+
+@app.route('/debug/cache')
+def debug_cache():
+    """Reference data cache counters (hits, misses, evictions, invalidations)."""
+    return jsonify(ref_cache.stats())
+
+
+@app.route('/debug/templates')
+def debug_templates():
+    """Fragment cache counters and how many compiled templates the bytecode cache holds."""
+    bcc = app.jinja_env.bytecode_cache
+    directory = getattr(bcc, 'directory', None)
+    compiled = len([n for n in os.listdir(directory) if n.endswith('.cache')]) if directory else None
+    return jsonify({'fragments': fragment_cache.stats(),
+                    'bytecode_cache': {'directory': directory, 'compiled_templates': compiled}})
+
+
+@app.route('/debug/perf')
+def debug_perf():
+    """Per-route latency percentiles, query counts and N+1 suspects (?format=json for raw numbers)."""
+    routes = sql_perf.snapshot()
+    if request.args.get('format') == 'json':
+        return jsonify(routes)
+    return render_template('debug_perf.html', routes=routes,
+                           slow_ms=app.config['SLOW_QUERY_MS'],
+                           n_plus_one=app.config['N_PLUS_ONE_THRESHOLD'])
+
+
+@app.route('/debug/orders')
+def debug_orders():
+    """Group-commit writer counters (batches, orders placed / failed, queue depth)."""
+    return jsonify({'enabled': app.config['ORDER_GROUP_COMMIT'], 'writer': order_writer.stats()})
+
+
+@app.route('/debug/imports')
+def debug_imports():
+    """Import worker counters plus the imports not finished yet."""
+    cur = get_cursor()
+    cur.execute("SELECT * FROM import_jobs WHERE Status <> 'done' ORDER BY Job_ID")
+    return jsonify({'worker': import_worker.stats(), 'pending': list(cur.fetchall())})
+
+
+@app.route('/debug/purge')
+def debug_purge():
+    """Purge worker counters plus the jobs not finished yet."""
+    cur = get_cursor()
+    cur.execute("SELECT * FROM purge_jobs WHERE Status <> 'done' ORDER BY Job_ID")
+    return jsonify({'worker': purge_worker.stats(), 'pending': list(cur.fetchall())})
+
+
+# ----------------------------
+# Admin commands (run with `flask --app app <command>`)
+# ----------------------------
+@app.cli.command('rebuild-counters')
+def rebuild_counters_command():
+    """Recount table_counters from the base tables."""
+    cur = get_cursor()
+    cur.callproc('RebuildTableCounters')
+    commit_db()
+    cur.execute("SELECT Table_Name, Row_Count FROM table_counters ORDER BY Table_Name")
+    for row in cur.fetchall():
+        print(f"{row['Table_Name']}: {row['Row_Count']}")
+
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the report rollup tables from orders and deliveries (run while writes are quiet)."""
+    cur = get_cursor()
+    cur.callproc('RebuildRollups')
+    commit_db()
+    for table in ('restaurant_rollup', 'customer_rollup', 'driver_rollup', 'daily_rollup'):
+        cur.execute(f"SELECT COUNT(*) AS n FROM {table}")
+        print(f"{table}: {cur.fetchone()['n']} rows")
+
+
+@app.cli.command('verify-rollups')
+@click.option('--limit', default=20, show_default=True, help='Mismatches to print per rollup.')
+def verify_rollups_command(limit):
+    """Compare the rollup tables with the base tables; exit 1 if they disagree."""
+    import rollups
+    mismatches = rollups.verify(get_cursor())
+    for name in rollups.CHECKS:
+        bad = mismatches.get(name, [])
+        print(f"{name}: {'OK' if not bad else f'{len(bad)} mismatched rows'}")
+        for key, stored, live in bad[:limit]:
+            print(f"    {key}: rollup={stored} actual={live}")
+    if mismatches:
+        print("Run `flask --app app rebuild-rollups` to recompute them.")
+        sys.exit(1)
+
+
+@app.cli.command('migrate')
+@click.option('--rerun', is_flag=True, help='Re-apply every migration, not just new ones.')
+def migrate_command(rerun):
+    """Apply the versioned scripts in migrations/."""
+    import db_migrate
+    applied = db_migrate.apply_migrations(cast(Any, mysql.connection), rerun=rerun)
+    print('\n'.join(applied) if applied else 'Database is up to date.')
+
+
+@app.cli.command('purge')
+@click.option('--retry', is_flag=True, help='Re-queue failed and interrupted jobs first.')
+def purge_command(retry):
+    """Run queued purge jobs in the foreground (for deployments with PURGE_WORKER off)."""
+    if retry:
+        conn = mysql.pool.acquire()
+        try:
+            print(f"{purge.requeue(conn)} job(s) re-queued")
+        finally:
+            mysql.pool.release(conn)
+    ran = purge_worker.drain()
+    stats = purge_worker.stats()
+    print(f"{ran} job(s) run, {stats['orders_purged']} order(s) purged, {stats['jobs_failed']} failed")
+    if stats['last_error']:
+        print(f"last error: {stats['last_error']}")
+
+
+@app.cli.command('archive')
+@click.option('--months', type=int, help='Months to keep in the live tables (default ARCHIVE_KEEP_MONTHS).')
+@click.option('--dry-run', is_flag=True, help='List the partitions that would be archived.')
+def archive_command(months, dry_run):
+    """Move closed months to the archive tables and add the coming months' partitions."""
+    keep = months or app.config['ARCHIVE_KEEP_MONTHS']
+    if keep < app.config['RECENT_MONTHS']:
+        raise click.BadParameter('must cover RECENT_MONTHS', param_hint='--months')
+    conn = mysql.pool.acquire()
+    try:
+        done = archive.run(conn, keep_months=keep, ahead_months=app.config['ARCHIVE_AHEAD_MONTHS'],
+                           batch_size=app.config['ARCHIVE_BATCH_SIZE'],
+                           lock_wait_timeout=app.config['ARCHIVE_LOCK_WAIT_TIMEOUT'],
+                           pause=app.config['ARCHIVE_PAUSE'], dry_run=dry_run)
+    finally:
+        mysql.pool.release(conn)
+    verb = 'would move about' if dry_run else 'moved'
+    for part in done:
+        print(f"{part['table']}.{part['partition']}: {verb} {part['rows']} row(s)")
+    if not done:
+        print(f"Nothing older than {keep} month(s) to archive.")
+
+
+@app.cli.command('import-csv')
+@click.argument('target', required=False, type=click.Choice(sorted(csv_import.IMPORTS)))
+@click.argument('path', required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option('--retry', is_flag=True, help='Re-queue failed and interrupted imports first (they resume).')
+def import_csv_command(target, path, retry):
+    """Queue a CSV import (a copy of PATH) and run queued imports in the foreground."""
+    import shutil
+    if retry:
+        conn = mysql.pool.acquire()
+        try:
+            print(f"{csv_import.requeue(conn)} import(s) re-queued")
+        finally:
+            mysql.pool.release(conn)
+    if target and path:
+        try:
+            job_id = queue_import(target, os.path.basename(path), lambda dest: shutil.copyfile(path, dest))
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='PATH')
+        print(f"import #{job_id} queued")
+    elif target or path:
+        raise click.UsageError('Give both TARGET and PATH, or neither')
+    started = time.perf_counter()
+    ran = import_worker.drain()
+    stats = import_worker.stats()
+    print(f"{ran} import(s) run in {round(time.perf_counter() - started, 1)}s: {stats['rows_imported']} row(s) "
+          f"imported, {stats['rows_failed']} rejected ({stats['method']}), {stats['jobs_failed']} failed")
+    if stats['last_error']:
+        print(f"last error: {stats['last_error']}")
+
+
+@app.cli.command('dispatch')
+@click.option('--dry-run', is_flag=True, help='Compute the assignments without writing them.')
+def dispatch_command(dry_run):
+    """Assign every waiting order to a free driver (one dispatch round)."""
+    result = dispatch_round(dry_run)
+    verb = 'would be' if dry_run else 'were'
+    print(f"{result['orders']} waiting order(s), {result['free_drivers']} free driver(s): "
+          f"{result['assigned']} {verb} assigned ({result['in_zone']} in zone), "
+          f"{len(result['unassigned'])} left waiting")
+    print(f"load {result['ms']['load']} ms, match {result['ms']['match']} ms, write {result['ms']['write']} ms")
+
+
+@app.cli.command('bench-data')
+@click.option('--scale', default='10k', show_default=True, help='Data set size: 10k, 1m or 10m orders.')
+@click.option('--seed', default=42, show_default=True, help='Same seed and scale, same rows.')
+@click.option('--method', type=click.Choice(['load', 'insert']), default='load', show_default=True,
+              help='LOAD DATA LOCAL INFILE or multi-row INSERTs.')
+@click.option('--chunk-size', default=50000, show_default=True, help='Rows per load / commit.')
+@click.option('--manifest', type=click.Path(dir_okay=False),
+              help='Write the data set description here (for benchmark.loadtest --dataset).')
+def bench_data_command(scale, seed, method, chunk_size, manifest):
+    """Append a synthetic benchmark data set to the database (see benchmark/)."""
+    from benchmark import datagen
+    if scale not in datagen.SCALES:
+        raise click.BadParameter(f"choose from {', '.join(datagen.SCALES)}", param_hint='--scale')
+    conn = mysql.connect(app.config, local_infile=1)
+    try:
+        summary = datagen.generate(conn, scale, seed, method, chunk_size, echo=click.echo)
+    finally:
+        conn.close()
+    for table, info in summary['tables'].items():
+        print(f"{table}: {info['rows']} rows in {info['load_seconds']}s")
+    print(f"done in {summary['seconds']}s ({summary['method']})")
+    if manifest:
+        with open(manifest, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+@app.cli.command('compile-templates')
+def compile_templates_command():
+    """Compile every template into the bytecode cache (run at deploy, before the workers start)."""
+    if app.jinja_env.bytecode_cache is None:
+        print('The bytecode cache is off (JINJA_BYTECODE_CACHE_DIR).')
+        sys.exit(1)
+    names = app.jinja_env.list_templates()
+    started = time.perf_counter()
+    for name in names:
+        app.jinja_env.get_template(name)
+    print(f"{len(names)} template(s) compiled into {app.config['JINJA_BYTECODE_CACHE_DIR']} "
+          f"in {round((time.perf_counter() - started) * 1000)} ms")
+
+
+@app.cli.command('audit-queries')
+@click.option('--verbose', is_flag=True, help='Print the full plan for every statement.')
+def audit_queries_command(verbose):
+    """EXPLAIN every statement the app issues; exit 1 on full scans or filesorts."""
+    import query_audit
+    flagged = query_audit.run_audit(sys.modules[__name__], get_cursor(), echo=click.echo, verbose=verbose)
+    if flagged:
+        sys.exit(1)
+
+
 # ----------------------------
 if __name__ == '__main__':
     app.run(debug=True)
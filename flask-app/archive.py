@@ -0,0 +1,181 @@
+"""
+Cold-data archive for the month-partitioned tables.
+
+orders and order_items are RANGE COLUMNS partitioned on Order_Date and
+deliveries on Pickup_Time, one partition per month (pYYYYMM, plus p_old for
+anything older than the first month and p_future for MAXVALUE). A query with
+a date predicate only opens the partitions it needs, and a closed month can
+leave the table without a long DELETE:
+
+    LOCK TABLES orders WRITE, orders_swap WRITE
+    ALTER TABLE orders EXCHANGE PARTITION p202401 WITH TABLE orders_swap
+    ALTER TABLE orders DROP PARTITION p202401          -- now empty
+    UNLOCK TABLES
+
+The exchange and the drop only change metadata, so the table is locked for
+milliseconds whatever the month holds; lock_wait_timeout bounds how long they
+wait behind running statements. The month's rows are then in orders_swap,
+which nothing else reads, and are moved into the compressed orders_archive in
+batches of `batch_size` rows, one short transaction per batch. A run that is
+interrupted leaves rows in the swap table; the next run moves those first.
+
+Archiving moves rows without firing the row triggers: the rollups keep
+counting archived orders and deliveries (RebuildRollups reads orders_all /
+deliveries_all), while table_counters, which count the live tables, are
+decremented as each batch moves. Archived orders leave
+customer_current_orders. Between the exchange and the end of the move, the
+month being archived is in neither the live nor the archive table.
+
+After every table the partitions for the coming months are added
+(EnsureMonthPartitions), so `flask --app app archive` run from cron once a
+month is all the partition upkeep there is.
+"""
+import time
+from datetime import date
+
+# table -> (partitioning column, key column, columns moved to the archive)
+TABLES = {
+    'orders': ('Order_Date', 'Order_ID',
+               ('Order_ID', 'Customer_ID', 'Restaurant_ID', 'Order_Date', 'Total_Amount', 'Deleted_At')),
+    'order_items': ('Order_Date', 'Order_Item_ID',
+                    ('Order_Item_ID', 'Order_ID', 'Menu_Item_ID', 'Quantity', 'Price', 'Order_Date')),
+    'deliveries': ('Pickup_Time', 'Delivery_ID',
+                   ('Delivery_ID', 'Order_ID', 'Restaurant_ID', 'Driver_ID', 'Pickup_Time', 'Location',
+                    'Delivery_Fee')),
+}
+# tables with a table_counters row
+COUNTED = ('orders', 'deliveries')
+
+
+def month_start(day: date, months_back: int = 0) -> date:
+    """First day of the month `months_back` months before `day`'s (negative: ahead)."""
+    index = day.year * 12 + day.month - 1 - months_back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def closed_partitions(cur, table: str, before: date) -> list:
+    """Partitions of `table` holding only rows older than `before`, oldest first, with estimated row counts."""
+    cur.execute("""
+        SELECT PARTITION_NAME, TABLE_ROWS
+        FROM information_schema.partitions
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME <> 'p_future'
+          AND DATE(TRIM(BOTH '''' FROM PARTITION_DESCRIPTION)) <= %s
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (table, before))
+    return list(cur.fetchall())
+
+
+def _swap_table(cur, table: str) -> str:
+    """{table}_swap: an unpartitioned copy of the table's structure, for EXCHANGE PARTITION."""
+    swap = f'{table}_swap'
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {swap} LIKE {table}")
+    cur.execute("SELECT COUNT(*) AS n FROM information_schema.partitions "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL", (swap,))
+    if cur.fetchone()['n']:
+        cur.execute(f"ALTER TABLE {swap} REMOVE PARTITIONING")
+    return swap
+
+
+def drain(conn, table: str, batch_size: int = 5000, pause: float = 0.0) -> int:
+    """Move every row of {table}_swap into {table}_archive; returns how many moved."""
+    _, key, columns = TABLES[table]
+    swap, archive = f'{table}_swap', f'{table}_archive'
+    column_list = ', '.join(columns)
+    cur = conn.cursor()
+    moved = 0
+    try:
+        cur.execute("SELECT COUNT(*) AS n FROM information_schema.tables "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (swap,))
+        if not cur.fetchone()['n']:
+            return 0
+        while True:
+            # the swap table is ours alone, so a key range stays put between statements
+            cur.execute(f"SELECT {key} FROM {swap} ORDER BY {key} LIMIT %s", (batch_size,))
+            keys = [r[key] for r in cur.fetchall()]
+            if not keys:
+                return moved
+            bounds = (keys[0], keys[-1])
+            cur.execute(f"INSERT INTO {archive} ({column_list}) "
+                        f"SELECT {column_list} FROM {swap} WHERE {key} BETWEEN %s AND %s", bounds)
+            if table == 'orders':
+                cur.execute(f"DELETE cco FROM customer_current_orders cco "
+                            f"JOIN {swap} s ON s.Order_ID = cco.Order_ID "
+                            f"WHERE s.Order_ID BETWEEN %s AND %s", bounds)
+            cur.execute(f"DELETE FROM {swap} WHERE {key} BETWEEN %s AND %s", bounds)
+            n = cur.rowcount
+            if table in COUNTED:
+                cur.execute("UPDATE table_counters SET Row_Count = Row_Count - %s WHERE Table_Name = %s",
+                            (n, table))
+                # the counts changed: pages and fragments keyed on the stamps must re-render
+                cur.execute("UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = %s", (table,))
+            conn.commit()
+            moved += n
+            if pause:
+                time.sleep(pause)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def archive_partition(conn, table: str, partition: str, batch_size: int = 5000,
+                      lock_wait_timeout: int = 5, pause: float = 0.0) -> int:
+    """Detach one closed partition and move its rows to the archive; returns how many moved."""
+    cur = conn.cursor()
+    try:
+        swap = _swap_table(cur, table)
+        cur.execute("SELECT @@SESSION.lock_wait_timeout AS t")
+        previous = cur.fetchone()['t']
+        cur.execute("SET SESSION lock_wait_timeout = %s", (lock_wait_timeout,))
+        try:
+            # a row inserted between the exchange and the drop would be dropped with the partition
+            cur.execute(f"LOCK TABLES {table} WRITE, {swap} WRITE")
+            try:
+                cur.execute(f"ALTER TABLE {table} EXCHANGE PARTITION {partition} WITH TABLE {swap}")
+                cur.execute(f"ALTER TABLE {table} DROP PARTITION {partition}")
+            finally:
+                cur.execute("UNLOCK TABLES")
+        finally:
+            # pooled connection: leave the session as it was
+            cur.execute("SET SESSION lock_wait_timeout = %s", (previous,))
+        cur.execute("UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = %s", (table,))
+        conn.commit()
+    finally:
+        cur.close()
+    return drain(conn, table, batch_size, pause)
+
+
+def run(conn, keep_months: int = 12, ahead_months: int = 3, batch_size: int = 5000,
+        lock_wait_timeout: int = 5, pause: float = 0.0, dry_run: bool = False, today=None) -> list:
+    """
+    Archive every month older than the last `keep_months` (the current month
+    included) and add partitions up to `ahead_months` ahead.
+
+    Returns [{'table', 'partition', 'rows'}]; with dry_run nothing changes and
+    'rows' is the server's estimate.
+    """
+    today = today or date.today()
+    cutoff = month_start(today, keep_months - 1)
+    done = []
+    cur = conn.cursor()
+    try:
+        for table, (column, _, _) in TABLES.items():
+            if not dry_run:
+                leftover = drain(conn, table, batch_size, pause)
+                if leftover:
+                    done.append({'table': table, 'partition': f'{table}_swap', 'rows': leftover})
+            for part in closed_partitions(cur, table, cutoff):
+                rows = part['TABLE_ROWS'] if dry_run else archive_partition(
+                    conn, table, part['PARTITION_NAME'], batch_size, lock_wait_timeout, pause)
+                done.append({'table': table, 'partition': part['PARTITION_NAME'], 'rows': rows})
+            if not dry_run:
+                cur.callproc('EnsureMonthPartitions', (table, column, month_start(today, -ahead_months)))
+                while cur.nextset():
+                    pass
+                # empty again; the next run recreates it from the table's current definition
+                cur.execute(f"DROP TABLE IF EXISTS {table}_swap")
+                conn.commit()
+        return done
+    finally:
+        cur.close()
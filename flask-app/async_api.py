@@ -0,0 +1,259 @@
+"""
+Async JSON API for order placement and delivery assignment (ASGI).
+
+The same PlaceOrderItems / AssignDelivery procedures and order / delivery
+reads as the Flask views, served from an asyncio event loop on an aiomysql
+pool. A request waiting on MySQL holds a coroutine instead of a worker
+thread, so one process keeps thousands of requests in flight; the pool
+(ASYNC_POOL_MAX_SIZE) bounds how many of them are in the database at once
+and the rest queue on it for up to ASYNC_POOL_TIMEOUT seconds, then get 503.
+Input goes through validation.py, exactly as in the HTML forms.
+
+Run it next to the Flask app, e.g.
+
+    hypercorn async_api:app --bind 0.0.0.0:8001 --workers 2
+
+    POST /api/orders          {"customer_id", "restaurant_id", "order_date"?, "items": [...]}
+    POST /api/deliveries      {"order_id", "restaurant_id", "driver_id", "location", "fee"}
+    GET  /api/orders          ?after=<Order_ID>&size=     newest first
+    GET  /api/orders/<id>     order with its items and deliveries
+    GET  /api/deliveries      ?after=<Delivery_ID>&size=&order_id=
+
+Settings (app.config): the MYSQL_* connection settings (db_config.init_mysql) and
+    ASYNC_POOL_MIN_SIZE     connections opened at startup (default 5)
+    ASYNC_POOL_MAX_SIZE     hard cap on open connections (default 50)
+    ASYNC_POOL_TIMEOUT      seconds to wait for a free connection before a 503 (default 5)
+    MAX_ORDER_ITEMS         lines accepted per order (default 500)
+    API_PAGE_SIZE           rows per page on the list endpoints (default 50)
+    API_MAX_PAGE_SIZE       largest ?size= accepted (default 500)
+"""
+import asyncio
+import contextlib
+import json
+
+import aiomysql
+from quart import Quart, jsonify, request
+
+from db_config import init_mysql
+import validation
+
+app = Quart(__name__)
+init_mysql(app)
+app.config.setdefault('MYSQL_HOST', 'localhost')
+app.config.setdefault('MYSQL_USER', None)
+app.config.setdefault('MYSQL_PASSWORD', None)
+app.config.setdefault('MYSQL_DB', None)
+app.config.setdefault('MYSQL_PORT', 3306)
+app.config.setdefault('MYSQL_UNIX_SOCKET', None)
+app.config.setdefault('MYSQL_CONNECT_TIMEOUT', 10)
+app.config.setdefault('MYSQL_CHARSET', 'utf8mb4')
+app.config.setdefault('MYSQL_POOL_RECYCLE', 3600)
+app.config.setdefault('ASYNC_POOL_MIN_SIZE', 5)
+app.config.setdefault('ASYNC_POOL_MAX_SIZE', 50)
+app.config.setdefault('ASYNC_POOL_TIMEOUT', 5)
+app.config.setdefault('MAX_ORDER_ITEMS', 500)
+app.config.setdefault('API_PAGE_SIZE', 50)
+app.config.setdefault('API_MAX_PAGE_SIZE', 500)
+
+# rows stamped Deleted_At are waiting for the purge worker and must not show up
+VISIBLE_ORDERS = "o.Deleted_At IS NULL AND c.Deleted_At IS NULL"
+_SIGNAL = 1644   # SIGNAL from the procedure (unknown menu item)
+
+
+class PoolBusy(Exception):
+    """No connection became free within ASYNC_POOL_TIMEOUT."""
+
+
+# ----------------------------
+# Pool lifecycle
+# ----------------------------
+@app.before_serving
+async def open_pool():
+    config = app.config
+    app.pool = await aiomysql.create_pool(
+        minsize=config['ASYNC_POOL_MIN_SIZE'],
+        maxsize=config['ASYNC_POOL_MAX_SIZE'],
+        pool_recycle=config['MYSQL_POOL_RECYCLE'],
+        host=config['MYSQL_HOST'],
+        port=config['MYSQL_PORT'],
+        user=config['MYSQL_USER'],
+        password=config['MYSQL_PASSWORD'] or '',
+        db=config['MYSQL_DB'],
+        unix_socket=config['MYSQL_UNIX_SOCKET'],
+        charset=config['MYSQL_CHARSET'],
+        connect_timeout=config['MYSQL_CONNECT_TIMEOUT'],
+        cursorclass=aiomysql.DictCursor,
+        autocommit=False,
+    )
+
+
+@app.after_serving
+async def close_pool():
+    app.pool.close()
+    await app.pool.wait_closed()
+
+
+@contextlib.asynccontextmanager
+async def cursor():
+    """A DictCursor on a pooled connection; rolls back whatever was not committed."""
+    try:
+        conn = await asyncio.wait_for(app.pool.acquire(), app.config['ASYNC_POOL_TIMEOUT'])
+    except asyncio.TimeoutError:
+        raise PoolBusy()
+    try:
+        async with conn.cursor() as cur:
+            yield cur
+    finally:
+        try:
+            await conn.rollback()
+        finally:
+            app.pool.release(conn)
+
+
+@app.errorhandler(PoolBusy)
+async def pool_busy(e):
+    return jsonify({'error': 'The database is busy, try again shortly'}), 503, {'Retry-After': '1'}
+
+
+async def _json_body():
+    data = await request.get_json(force=True, silent=True)
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    return data
+
+
+def _page_args():
+    """(after, size) from ?after=&size=; size clamped to API_MAX_PAGE_SIZE."""
+    after = request.args.get('after', type=int)
+    size = request.args.get('size', app.config['API_PAGE_SIZE'], type=int)
+    return after, max(1, min(size, app.config['API_MAX_PAGE_SIZE']))
+
+
+# ----------------------------
+# Writes (procedures)
+# ----------------------------
+@app.route('/api/orders', methods=['POST'])
+async def api_place_order():
+    """One order with its lines; 201 {"order_id"}."""
+    try:
+        order = validation.parse_order(await _json_body(), app.config['MAX_ORDER_ITEMS'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    async with cursor() as cur:
+        try:
+            await cur.callproc('PlaceOrderItems', (order['customer_id'], order['restaurant_id'],
+                                                   order['order_date'], json.dumps(order['items'])))
+        except (aiomysql.IntegrityError, aiomysql.OperationalError) as e:
+            if isinstance(e, aiomysql.OperationalError) and e.args[0] != _SIGNAL:
+                raise
+            return jsonify({'error': 'Unknown customer, restaurant or menu item'}), 400
+        order_id = (await cur.fetchone())['Order_ID']
+        while await cur.nextset():
+            pass
+        await cur.connection.commit()
+    return jsonify({'order_id': order_id}), 201
+
+
+@app.route('/api/deliveries', methods=['POST'])
+async def api_assign_delivery():
+    """Assign a driver to an order; 201 {"delivery_id", "order_id"}."""
+    try:
+        delivery = validation.parse_delivery(await _json_body())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    async with cursor() as cur:
+        try:
+            await cur.callproc('AssignDelivery', (delivery['order_id'], delivery['restaurant_id'],
+                                                  delivery['driver_id'], delivery['location'], delivery['fee']))
+        except aiomysql.IntegrityError:
+            return jsonify({'error': 'Unknown order, restaurant or driver'}), 400
+        while await cur.nextset():
+            pass
+        await cur.execute("SELECT LAST_INSERT_ID() AS Delivery_ID")
+        delivery_id = (await cur.fetchone())['Delivery_ID']
+        await cur.connection.commit()
+    return jsonify({'delivery_id': delivery_id, 'order_id': delivery['order_id']}), 201
+
+
+# ----------------------------
+# Reads
+# ----------------------------
+@app.route('/api/orders')
+async def api_orders():
+    """Newest orders first: {"orders": [...], "next": <after cursor or null>}."""
+    after, size = _page_args()
+    conditions, args = [VISIBLE_ORDERS], []
+    if after is not None:
+        conditions.append("o.Order_ID < %s")
+        args.append(after)
+    async with cursor() as cur:
+        await cur.execute(f"""
+            SELECT o.Order_ID, o.Customer_ID, o.Restaurant_ID, o.Order_Date, o.Total_Amount,
+                   c.First_Name, c.Last_Name, r.Name AS Restaurant
+            FROM orders o
+            JOIN customers c ON o.Customer_ID = c.Customer_ID
+            JOIN restaurants r ON o.Restaurant_ID = r.Restaurant_ID
+            WHERE {' AND '.join(conditions)}
+            ORDER BY o.Order_ID DESC
+            LIMIT %s
+        """, tuple(args) + (size + 1,))
+        rows = await cur.fetchall()
+    return jsonify({'orders': rows[:size], 'next': rows[size - 1]['Order_ID'] if len(rows) > size else None})
+
+
+@app.route('/api/orders/<int:order_id>')
+async def api_order(order_id: int):
+    """One order with "items" and "deliveries"; 404 when missing or deleted."""
+    async with cursor() as cur:
+        await cur.execute(f"""
+            SELECT o.Order_ID, o.Customer_ID, o.Restaurant_ID, o.Order_Date, o.Total_Amount,
+                   c.First_Name, c.Last_Name, r.Name AS Restaurant
+            FROM orders o
+            JOIN customers c ON o.Customer_ID = c.Customer_ID
+            JOIN restaurants r ON o.Restaurant_ID = r.Restaurant_ID
+            WHERE o.Order_ID = %s AND {VISIBLE_ORDERS}
+        """, (order_id,))
+        order = await cur.fetchone()
+        if order is None:
+            return jsonify({'error': 'Order not found'}), 404
+        await cur.execute("""
+            SELECT oi.Order_Item_ID, oi.Menu_Item_ID, m.Name AS MenuName, oi.Quantity, oi.Price
+            FROM order_items oi JOIN menu m ON oi.Menu_Item_ID = m.Menu_Item_ID
+            WHERE oi.Order_ID = %s AND oi.Order_Date = %s
+        """, (order_id, order['Order_Date']))
+        order['items'] = await cur.fetchall()
+        await cur.execute("""
+            SELECT Delivery_ID, Restaurant_ID, Driver_ID, Pickup_Time, Location, Delivery_Fee
+            FROM deliveries WHERE Order_ID = %s
+        """, (order_id,))
+        order['deliveries'] = await cur.fetchall()
+    return jsonify(order)
+
+
+@app.route('/api/deliveries')
+async def api_deliveries():
+    """Newest deliveries first, optionally for one ?order_id=: {"deliveries": [...], "next": ...}."""
+    after, size = _page_args()
+    conditions, args = [VISIBLE_ORDERS], []
+    order_id = request.args.get('order_id', type=int)
+    if order_id is not None:
+        conditions.append("d.Order_ID = %s")
+        args.append(order_id)
+    if after is not None:
+        conditions.append("d.Delivery_ID < %s")
+        args.append(after)
+    async with cursor() as cur:
+        await cur.execute(f"""
+            SELECT d.Delivery_ID, d.Order_ID, d.Restaurant_ID, d.Driver_ID, d.Pickup_Time, d.Location,
+                   d.Delivery_Fee, c.First_Name, c.Last_Name, r.Name AS Restaurant
+            FROM deliveries d
+            JOIN orders o ON d.Order_ID = o.Order_ID
+            JOIN customers c ON o.Customer_ID = c.Customer_ID
+            JOIN restaurants r ON d.Restaurant_ID = r.Restaurant_ID
+            WHERE {' AND '.join(conditions)}
+            ORDER BY d.Delivery_ID DESC
+            LIMIT %s
+        """, tuple(args) + (size + 1,))
+        rows = await cur.fetchall()
+    return jsonify({'deliveries': rows[:size],
+                    'next': rows[size - 1]['Delivery_ID'] if len(rows) > size else None})
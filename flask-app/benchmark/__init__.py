@@ -0,0 +1,17 @@
+"""
+Benchmark kit: a synthetic data generator and an HTTP load harness.
+
+    # 1. fill the local database (see datagen.SCALES for the sizes)
+    flask --app app bench-data --scale 1m --seed 42 --manifest bench/dataset.json
+
+    # 2. start the app, then drive it
+    python -m benchmark.loadtest --url http://127.0.0.1:5000 --concurrency 8 \\
+        --requests 200 --dataset bench/dataset.json --out bench/$(git rev-parse --short HEAD).json
+
+    # 3. compare two commits
+    python -m benchmark.loadtest --compare bench/abc1234.json bench/def5678.json
+
+The same scale and seed always produce the same rows, and the harness sends
+the same request sequence for the same seed, so result files taken on
+different commits against the same dataset are comparable route by route.
+"""
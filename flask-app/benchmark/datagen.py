@@ -0,0 +1,234 @@
+"""
+Synthetic data for benchmarks.
+
+generate() appends a deterministic data set of the requested scale to the
+connected database: customers, restaurants with their menu item (menu is 1:1
+with restaurants), delivery drivers, then orders with their order_items and
+deliveries. Rows are written out in CSV chunks and bulk loaded with LOAD DATA
+LOCAL INFILE (the server and the client both need local_infile on; without
+it the loader falls back to multi-row INSERTs, as does method='insert').
+
+The triggers stay in place, so table_counters, customer_current_orders and
+the rollup tables come out right. Each chunk of orders is loaded after its
+order_items, with foreign_key_checks off (which also skips the triggers
+standing in for foreign keys): the order_items trigger then finds no order
+to add the line to, and the orders go in with their final
+Total_Amount instead of taking one UPDATE (and one rollup call) per line.
+"""
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from MySQLdb import OperationalError
+
+# scale -> base row counts; every order gets 1-3 lines and DELIVERED_SHARE of them a delivery
+SCALES = {
+    '10k': {'customers': 2_000, 'restaurants': 200, 'drivers': 100, 'orders': 10_000},
+    '1m': {'customers': 100_000, 'restaurants': 5_000, 'drivers': 2_000, 'orders': 1_000_000},
+    '10m': {'customers': 1_000_000, 'restaurants': 20_000, 'drivers': 10_000, 'orders': 10_000_000},
+}
+DELIVERED_SHARE = 0.8
+START_DATE = date(2024, 1, 1)   # order dates are spread over DAYS days from here
+DAYS = 365
+
+# table -> (key column, columns loaded)
+TABLES = {
+    'customers': ('Customer_ID', ('Customer_ID', 'First_Name', 'Last_Name', 'Phone_No', 'Email')),
+    'restaurants': ('Restaurant_ID', ('Restaurant_ID', 'Name', 'Address', 'Phone_No')),
+    'menu': ('Menu_Item_ID', ('Menu_Item_ID', 'Restaurant_ID', 'Name', 'Description', 'Price')),
+    'delivery_drivers': ('Driver_ID', ('Driver_ID', 'First_Name', 'Last_Name', 'Pickup', 'Destination')),
+    'orders': ('Order_ID', ('Order_ID', 'Customer_ID', 'Restaurant_ID', 'Order_Date', 'Total_Amount')),
+    'order_items': ('Order_Item_ID', ('Order_Item_ID', 'Order_ID', 'Menu_Item_ID', 'Quantity', 'Price',
+                                      'Order_Date')),
+    'deliveries': ('Delivery_ID', ('Delivery_ID', 'Order_ID', 'Restaurant_ID', 'Driver_ID',
+                                   'Pickup_Time', 'Location', 'Delivery_Fee')),
+}
+
+FIRST_NAMES = ('Aarav', 'Aditi', 'Arjun', 'Diya', 'Ishaan', 'Kavya', 'Meera', 'Nikhil', 'Priya', 'Rahul',
+               'Riya', 'Rohan', 'Saanvi', 'Sahil', 'Sneha', 'Tanvi', 'Varun', 'Vikram', 'Ananya', 'Karan',
+               'Neha', 'Pooja', 'Amit', 'Sanjay', 'Deepa', 'Farhan', 'Zoya', 'Kabir', 'Isha', 'Manav')
+LAST_NAMES = ('Sharma', 'Verma', 'Patel', 'Reddy', 'Iyer', 'Nair', 'Gupta', 'Singh', 'Kumar', 'Mehta',
+              'Joshi', 'Rao', 'Das', 'Bose', 'Khan', 'Kapoor', 'Malhotra', 'Chopra', 'Pillai', 'Menon')
+CUISINES = ('Spice', 'Tandoor', 'Curry', 'Masala', 'Biryani', 'Dosa', 'Noodle', 'Pizza', 'Burger', 'Grill',
+            'Kebab', 'Thali', 'Chaat', 'Wok', 'Sushi', 'Taco', 'Bakery', 'Cafe')
+PLACES = ('House', 'Garden', 'Corner', 'Kitchen', 'Express', 'Palace', 'Junction', 'Point', 'Hub', 'Bistro')
+DISHES = ('Paneer Tikka', 'Butter Chicken', 'Veg Biryani', 'Masala Dosa', 'Chole Bhature', 'Hakka Noodles',
+          'Margherita Pizza', 'Veg Burger', 'Mutton Kebab', 'Veg Thali', 'Pani Puri', 'Fried Rice',
+          'Salmon Roll', 'Bean Taco', 'Chocolate Cake', 'Cold Coffee')
+STREETS = ('MG Road', 'Park Street', 'Brigade Road', 'Linking Road', 'Anna Salai', 'FC Road', 'Church Street',
+           'Residency Road', 'Station Road', 'Ring Road', 'Lake View', 'Hill Road')
+CITIES = ('Bengaluru', 'Mumbai', 'Delhi', 'Chennai', 'Hyderabad', 'Pune', 'Kolkata', 'Ahmedabad')
+
+# errors meaning LOAD DATA LOCAL is switched off on one side or the other
+_LOCAL_INFILE_DISABLED = {1148, 2068, 3948}
+
+
+def _money(cents: int) -> str:
+    return f'{cents // 100}.{cents % 100:02d}'
+
+
+def _address(rng) -> str:
+    return f'{rng.randint(1, 999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}'
+
+
+class Loader:
+    """Bulk-loads row tuples into a table by LOAD DATA LOCAL INFILE or multi-row INSERT."""
+
+    def __init__(self, conn, method: str = 'load', echo=print):
+        self.conn = conn
+        self.method = method
+        self.echo = echo
+        self.rows = {}
+        self.seconds = {}
+
+    def load(self, table: str, rows: list):
+        if not rows:
+            return
+        start = time.perf_counter()
+        columns = TABLES[table][1]
+        if self.method == 'load':
+            try:
+                self._load_data(table, columns, rows)
+            except OperationalError as e:
+                if e.args[0] not in _LOCAL_INFILE_DISABLED:
+                    raise
+                self.echo(f'LOAD DATA LOCAL INFILE unavailable ({e.args[1]}); using multi-row INSERTs')
+                self.method = 'insert'
+        if self.method == 'insert':
+            cur = self.conn.cursor()
+            # MySQLdb turns executemany(INSERT ... VALUES) into multi-row statements
+            cur.executemany(f"INSERT INTO {table} ({', '.join(columns)}) "
+                            f"VALUES ({', '.join(['%s'] * len(columns))})", rows)
+            cur.close()
+        self.rows[table] = self.rows.get(table, 0) + len(rows)
+        self.seconds[table] = self.seconds.get(table, 0.0) + time.perf_counter() - start
+
+    def _load_data(self, table, columns, rows):
+        fd, path = tempfile.mkstemp(prefix=f'bench_{table}_', suffix='.csv')
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f, lineterminator='\n').writerows(rows)
+            cur = self.conn.cursor()
+            cur.execute(f"""
+                LOAD DATA LOCAL INFILE %s INTO TABLE {table}
+                FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+                LINES TERMINATED BY '\\n'
+                ({', '.join(columns)})
+            """, (path,))
+            cur.close()
+        finally:
+            os.remove(path)
+
+
+def _next_ids(cur) -> dict:
+    """First free key per table, so generated rows can reference each other without lookups."""
+    ids = {}
+    for table, (key, _) in TABLES.items():
+        cur.execute(f"SELECT COALESCE(MAX({key}), 0) AS n FROM {table}")
+        ids[table] = cur.fetchone()['n'] + 1
+    return ids
+
+
+def generate(conn, scale: str = '10k', seed: int = 42, method: str = 'load',
+             chunk_size: int = 50_000, echo=print) -> dict:
+    """
+    Append the `scale` data set for `seed` to the database; returns a manifest
+    (scale, seed, first id and row count per table, load timings).
+
+    Each table draws from its own seeded random stream, so a given scale and
+    seed always produce the same rows.
+    """
+    sizes = SCALES[scale]
+    started = time.perf_counter()
+    loader = Loader(conn, method, echo)
+    cur = conn.cursor()
+    first = _next_ids(cur)
+    cur.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+    try:
+        rng = random.Random(f'{seed}:customers')
+        for start in range(0, sizes['customers'], chunk_size):
+            rows = []
+            for cid in range(first['customers'] + start,
+                             first['customers'] + min(start + chunk_size, sizes['customers'])):
+                fn, ln = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                rows.append((cid, fn, ln, f'555{cid:010d}', f'{fn.lower()}.{ln.lower()}{cid}@example.com'))
+            loader.load('customers', rows)
+            conn.commit()
+
+        rng = random.Random(f'{seed}:restaurants')
+        restaurants, menu, prices = [], [], []
+        for n in range(sizes['restaurants']):
+            rid, price = first['restaurants'] + n, rng.randint(99, 899) * 5
+            dish = rng.choice(DISHES)
+            restaurants.append((rid, f'{rng.choice(CUISINES)} {rng.choice(PLACES)} {rid}', _address(rng),
+                                f'444{rid:07d}'))
+            menu.append((first['menu'] + n, rid, dish, f'House special {dish.lower()}', _money(price)))
+            prices.append(price)
+        loader.load('restaurants', restaurants)
+        loader.load('menu', menu)
+
+        rng = random.Random(f'{seed}:drivers')
+        loader.load('delivery_drivers', [
+            (first['delivery_drivers'] + n, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+             rng.choice(CITIES), rng.choice(CITIES))
+            for n in range(sizes['drivers'])
+        ])
+        conn.commit()
+
+        rng = random.Random(f'{seed}:orders')
+        item_id, delivery_id = first['order_items'], first['deliveries']
+        for start in range(0, sizes['orders'], chunk_size):
+            orders, items, deliveries = [], [], []
+            for oid in range(first['orders'] + start,
+                             first['orders'] + min(start + chunk_size, sizes['orders'])):
+                r = rng.randrange(sizes['restaurants'])
+                day = START_DATE + timedelta(days=rng.randrange(DAYS))
+                total = 0
+                for _ in range(rng.randint(1, 3)):
+                    quantity = rng.randint(1, 4)
+                    total += prices[r] * quantity
+                    items.append((item_id, oid, first['menu'] + r, quantity, _money(prices[r] * quantity),
+                                  day.isoformat()))
+                    item_id += 1
+                orders.append((oid, first['customers'] + rng.randrange(sizes['customers']),
+                               first['restaurants'] + r, day.isoformat(), _money(total)))
+                if rng.random() < DELIVERED_SHARE:
+                    pickup = datetime(day.year, day.month, day.day) + timedelta(minutes=rng.randrange(600, 1380))
+                    deliveries.append((delivery_id, oid, first['restaurants'] + r,
+                                       first['delivery_drivers'] + rng.randrange(sizes['drivers']),
+                                       pickup.strftime('%Y-%m-%d %H:%M:%S'), _address(rng),
+                                       _money(rng.randint(20, 80) * 5)))
+                    delivery_id += 1
+            # lines first: see the module docstring
+            loader.load('order_items', items)
+            loader.load('orders', orders)
+            loader.load('deliveries', deliveries)
+            conn.commit()
+            echo(f"orders: {min(start + chunk_size, sizes['orders'])}/{sizes['orders']}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.execute("SET SESSION foreign_key_checks = 1, unique_checks = 1")
+
+    # fresh index statistics, so plans don't depend on how the rows arrived
+    for table in TABLES:
+        cur.execute(f"ANALYZE TABLE {table}")
+        cur.fetchall()
+    cur.close()
+
+    return {
+        'scale': scale,
+        'seed': seed,
+        'method': loader.method,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'seconds': round(time.perf_counter() - started, 1),
+        'tables': {
+            table: {'first_id': first[table], 'rows': loader.rows.get(table, 0),
+                    'load_seconds': round(loader.seconds.get(table, 0.0), 2)}
+            for table in TABLES
+        },
+    }
@@ -0,0 +1,306 @@
+"""
+HTTP load harness for the app.
+
+Drives each route in ROUTES in turn against a running server: `warmup`
+unrecorded requests, then `requests` timed ones from `concurrency` threads,
+each thread on its own keep-alive connection. Redirects are not followed, so
+a POST is timed up to its 302. Per route it reports throughput, error count
+and latency percentiles; the JSON written with --out also records the git
+commit, the settings and (with --dataset) the datagen manifest, so runs on
+different commits can be put side by side with --compare.
+
+Ids for the forms (customers, restaurants and their menu item, drivers,
+undelivered orders) are discovered through the /api/lookup endpoints before
+the run. Every route's request list is built up front from its own seeded
+random stream, so the same seed replays the same requests.
+
+    python -m benchmark.loadtest --url http://127.0.0.1:5000 --out results.json
+    python -m benchmark.loadtest --compare before.json after.json
+"""
+import http.client
+import json
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+import click
+
+from sql_perf import percentile
+
+
+def _place_order_form(f, rng):
+    restaurant = rng.choice([r for r in f['restaurants'] if r['id'] in f['menu']])
+    lines = rng.randint(1, 3)
+    return '/place_order', {
+        'customer_id': rng.choice(f['customers'])['id'],
+        'restaurant_id': restaurant['id'],
+        'menu_item_id': [f['menu'][restaurant['id']]] * lines,
+        'quantity': [rng.randint(1, 4) for _ in range(lines)],
+    }
+
+
+def _assign_delivery_form(f, rng):
+    # each undelivered order can be delivered once; build() stops when they run out
+    order = f['undelivered'].pop()
+    return '/assign_delivery', {
+        'order_id': order['id'],
+        'restaurant_id': order['fill']['restaurant_id']['id'],
+        'driver_id': rng.choice(f['drivers'])['id'],
+        'location': f"{rng.randint(1, 999)} Benchmark Street",
+        'fee': f"{rng.randint(20, 80) * 5 / 100:.2f}",
+    }
+
+
+# name -> (method, build(fixtures, rng) -> (path, form or None)); writes come last
+ROUTES = {
+    'index': ('GET', lambda f, rng: ('/', None)),
+    'orders': ('GET', lambda f, rng: ('/orders', None)),
+    'orders_search': ('GET', lambda f, rng: ('/orders?' + urlencode({'q': rng.choice(f['customer_names'])}), None)),
+    'order_detail': ('GET', lambda f, rng: (f"/order/{rng.choice(f['orders'])['id']}", None)),
+    'view_data': ('GET', lambda f, rng: ('/view_data', None)),
+    'customers': ('GET', lambda f, rng: ('/customers', None)),
+    'restaurants': ('GET', lambda f, rng: ('/restaurants', None)),
+    'drivers': ('GET', lambda f, rng: ('/drivers', None)),
+    'menu': ('GET', lambda f, rng: ('/menu', None)),
+    'reports': ('GET', lambda f, rng: ('/reports', None)),
+    'customer_search': ('GET', lambda f, rng: (
+        '/api/search/customers?' + urlencode({'q': rng.choice(f['customer_names'])}), None)),
+    'lookup_restaurants': ('GET', lambda f, rng: (
+        '/api/lookup/restaurants?' + urlencode({'q': rng.choice(f['restaurants'])['label'][:3]}), None)),
+    'query_nested': ('POST', lambda f, rng: ('/query/nested-query', {'min_orders': rng.randint(0, 3)})),
+    'query_join': ('POST', lambda f, rng: ('/query/join-query', {'restaurant_id': rng.choice(f['restaurants'])['id']})),
+    'query_aggregate': ('POST', lambda f, rng: ('/query/aggregate-query', {'query_type': rng.choice(
+        ('all_restaurants', 'driver_earnings', 'customer_spending', 'daily_totals'))})),
+    'place_order': ('POST', _place_order_form),
+    'assign_delivery': ('POST', _assign_delivery_form),
+}
+
+
+class Client:
+    """One keep-alive HTTP connection per thread."""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80)
+        self.conn_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, form=None):
+        """Send one request and read the whole body; returns (status, body bytes)."""
+        body = urlencode(form, doseq=True) if form is not None else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form is not None else {}
+        for attempt in (1, 2):
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                conn = self._local.conn = self.conn_class(self.host, self.port, timeout=self.timeout)
+            try:
+                conn.request(method, self.prefix + path, body=body, headers=headers)
+                resp = conn.getresponse()
+                return resp.status, resp.read()
+            except (http.client.HTTPException, OSError):
+                # the server closed an idle keep-alive connection; reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt == 2:
+                    raise
+
+    def get_json(self, path: str):
+        status, body = self.request('GET', path)
+        if status != 200:
+            raise click.ClickException(f'GET {path} returned {status}')
+        return json.loads(body)
+
+
+def _lookup_all(client, kind: str, want: int, **params) -> list:
+    """Follow an /api/lookup cursor until `want` results (or the end)."""
+    results, after = [], None
+    while len(results) < want:
+        query = dict(params, limit=50, **({'after': after} if after is not None else {}))
+        page = client.get_json(f'/api/lookup/{kind}?{urlencode(query)}')
+        results += page['results']
+        after = page['next']
+        if after is None:
+            break
+    return results[:want]
+
+
+def discover(client, requests: int, pool: int = 200) -> dict:
+    """Ids for the forms, fetched through the lookup endpoints (newest / first by name)."""
+    f = {
+        'customers': _lookup_all(client, 'customers', pool),
+        'restaurants': _lookup_all(client, 'restaurants', pool),
+        'drivers': _lookup_all(client, 'drivers', pool),
+        'orders': _lookup_all(client, 'orders', pool),
+        'undelivered': _lookup_all(client, 'orders', requests, undelivered=1),
+    }
+    for kind in ('customers', 'restaurants', 'drivers', 'orders'):
+        if not f[kind]:
+            raise click.ClickException(f'No {kind} found; load a data set first (flask --app app bench-data)')
+    f['customer_names'] = sorted({c['label'].split()[0] for c in f['customers']})
+    f['menu'] = {}
+    for restaurant in f['restaurants'][:50]:
+        items = client.get_json(f"/api/lookup/menu?{urlencode({'restaurant_id': restaurant['id'], 'limit': 1})}")
+        if items['results']:
+            f['menu'][restaurant['id']] = items['results'][0]['id']
+    # pop() takes from the end: deliver the oldest of the fetched orders first
+    f['undelivered'].reverse()
+    return f
+
+
+def build(name: str, fixtures: dict, count: int, seed: int) -> list:
+    """The route's request list: `count` (path, form) pairs from its own random stream."""
+    make = ROUTES[name][1]
+    rng = random.Random(f'{seed}:{name}')
+    if name == 'place_order' and not fixtures['menu']:
+        return []
+    if name == 'assign_delivery':
+        count = min(count, len(fixtures['undelivered']))
+    return [make(fixtures, rng) for _ in range(count)]
+
+
+def run_route(client, name: str, batch: list, concurrency: int) -> dict:
+    """Send `batch` from `concurrency` threads; returns the route's summary."""
+    method = ROUTES[name][0]
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+
+    def one(item):
+        path, form = item
+        start = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, form)
+        except (http.client.HTTPException, OSError) as e:
+            status = type(e).__name__
+        ms = (time.perf_counter() - start) * 1000.0
+        with lock:
+            latencies.append(ms)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, batch))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(n for status, n in statuses.items() if not isinstance(status, int) or status >= 400)
+    return {
+        'route': name,
+        'method': method,
+        'path': batch[0][0].split('?')[0] if batch else None,
+        'requests': len(batch),
+        'errors': errors,
+        'statuses': {str(status): n for status, n in sorted(statuses.items(), key=str)},
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(batch) / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 1) if latencies else None,
+            **{f'p{pct}': round(percentile(latencies, pct), 1) if latencies else None for pct in (50, 90, 95, 99)},
+            'max': round(latencies[-1], 1) if latencies else None,
+        },
+    }
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(('git',) + args, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    status = git('status', '--porcelain', '--untracked-files=no')
+    return {'commit': git('rev-parse', 'HEAD'), 'branch': git('rev-parse', '--abbrev-ref', 'HEAD'),
+            'dirty': bool(status) if status is not None else None}
+
+
+def _read_json(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(before: dict, after: dict, echo=print):
+    """Print p95 latency and throughput per route for two result files."""
+    echo(f"before: {before['meta']['git']['commit']}  after: {after['meta']['git']['commit']}")
+    old = {r['route']: r for r in before['routes']}
+    echo(f"{'route':<20} {'p95 before':>11} {'p95 after':>10} {'change':>8} {'rps before':>11} {'rps after':>10}")
+    for r in after['routes']:
+        b = old.get(r['route'])
+        p95_old = b['latency_ms']['p95'] if b else None
+        p95_new = r['latency_ms']['p95']
+        change = f'{(p95_new - p95_old) / p95_old * 100:+.0f}%' if p95_old and p95_new is not None else '-'
+        echo(f"{r['route']:<20} {p95_old if p95_old is not None else '-':>11} "
+             f"{p95_new if p95_new is not None else '-':>10} {change:>8} "
+             f"{b['throughput_rps'] if b else '-':>11} {r['throughput_rps'] or '-':>10}")
+
+
+@click.command()
+@click.option('--url', default='http://127.0.0.1:5000', show_default=True, help='Base URL of the running app.')
+@click.option('--concurrency', default=8, show_default=True, help='Client threads per route.')
+@click.option('--requests', 'count', default=200, show_default=True, help='Timed requests per route.')
+@click.option('--warmup', default=10, show_default=True, help='Untimed requests per route first.')
+@click.option('--seed', default=42, show_default=True, help='Seed for the request sequence.')
+@click.option('--route', 'only', multiple=True, type=click.Choice(list(ROUTES)), help='Run only these routes.')
+@click.option('--no-writes', is_flag=True, help='Skip place_order and assign_delivery.')
+@click.option('--dataset', type=click.Path(exists=True, dir_okay=False),
+              help='Manifest written by `flask bench-data --manifest`, copied into the results.')
+@click.option('--label', default=None, help='Free-form note stored with the results.')
+@click.option('--out', type=click.Path(dir_okay=False), help='Write the results as JSON here.')
+@click.option('--compare', 'compare_files', nargs=2, type=click.Path(exists=True, dir_okay=False),
+              help='Compare two result files instead of running.')
+def main(url, concurrency, count, warmup, seed, only, no_writes, dataset, label, out, compare_files):
+    """Run the load test against URL and report latency percentiles per route."""
+    if compare_files:
+        before, after = (_read_json(path) for path in compare_files)
+        compare(before, after, echo=click.echo)
+        return
+
+    names = [name for name in ROUTES if (not only or name in only)
+             and not (no_writes and name in ('place_order', 'assign_delivery'))]
+    client = Client(url)
+    fixtures = discover(client, warmup + count if 'assign_delivery' in names else 0)
+
+    results = []
+    for name in names:
+        batch = build(name, fixtures, warmup + count, seed)
+        if len(batch) <= warmup:
+            click.echo(f'{name:<20} skipped (no usable ids)')
+            continue
+        run_route(client, name, batch[:warmup], concurrency)
+        result = run_route(client, name, batch[warmup:], concurrency)
+        results.append(result)
+        lat = result['latency_ms']
+        click.echo(f"{name:<20} {result['throughput_rps']:>8} req/s  p50 {lat['p50']:>7} ms  "
+                   f"p95 {lat['p95']:>7} ms  p99 {lat['p99']:>7} ms  errors {result['errors']}")
+
+    report = {
+        'meta': {
+            'git': git_revision(),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'url': url,
+            'concurrency': concurrency,
+            'requests': count,
+            'warmup': warmup,
+            'seed': seed,
+            'label': label,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'dataset': _read_json(dataset) if dataset else None,
+        },
+        'routes': results,
+    }
+    if out:
+        with open(out, 'w') as f:
+            json.dump(report, f, indent=2)
+        click.echo(f'results written to {out}')
+    if any(r['errors'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
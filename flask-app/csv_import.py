@@ -0,0 +1,483 @@
+"""
+Bulk CSV import for customers, restaurants, menu and delivery drivers.
+
+An upload is saved to IMPORT_DIR, its header checked and its rows counted,
+and an import_jobs row queued; the request returns right away. ImportWorker
+then streams the file in chunks of `chunk_size` rows, one transaction each:
+
+    1. parse every row of the chunk (required fields, lengths, numbers)
+    2. check the chunk against the database with one query per constraint:
+       customers.Phone_No is UNIQUE, and a menu row needs an existing
+       restaurant that has no menu item yet (menu is 1:1 with restaurants)
+    3. insert the good rows with one multi-row INSERT (or LOAD DATA LOCAL
+       INFILE), record the bad ones in import_errors by line number, and
+       advance Rows_Done
+
+Progress is committed with the rows it counts, so a job that stops (worker
+restart, lost connection) resumes after its last committed chunk: rows
+before Rows_Done are skipped unread. Should a chunk still hit a constraint
+(a row written by someone else since the check), it is inserted again row by
+row, each under a savepoint, so only the offending rows fail.
+
+Columns are matched to the CSV header by name, ignoring case; a column left
+out of the file is loaded as NULL. Blank lines count as rows but are skipped.
+"""
+import csv
+import os
+import tempfile
+import threading
+from decimal import Decimal, InvalidOperation
+
+from MySQLdb import IntegrityError, OperationalError
+
+# errors meaning LOAD DATA LOCAL is switched off on one side or the other
+_LOCAL_INFILE_DISABLED = {1148, 2068, 3948}
+
+
+class _Conflict(Exception):
+    """LOAD DATA LOCAL skipped rows (duplicate keys are ignored, not raised)."""
+
+
+def _text(max_length: int, required: bool = False):
+    def parse(value):
+        value = value.strip()
+        if not value:
+            if required:
+                raise ValueError('is required')
+            return None
+        if len(value) > max_length:
+            raise ValueError(f'can be at most {max_length} characters')
+        return value
+    return parse
+
+
+def _email(value):
+    value = _text(100)(value)
+    if value is not None and '@' not in value:
+        raise ValueError('is not an email address')
+    return value
+
+
+def _id(value):
+    try:
+        number = int(value.strip())
+    except ValueError:
+        raise ValueError('must be a whole number')
+    if number < 1:
+        raise ValueError('must be a positive id')
+    return number
+
+
+def _price(value):
+    try:
+        amount = Decimal(value.strip())
+    except InvalidOperation:
+        raise ValueError('must be an amount')
+    # Price is DECIMAL(10,2)
+    if not amount.is_finite() or amount < 0 or amount >= Decimal('100000000'):
+        raise ValueError('must be between 0 and 99999999.99')
+    return str(amount.quantize(Decimal('0.01')))
+
+
+# table -> (column, parser) for every column an import may fill
+IMPORTS = {
+    'customers': (
+        ('First_Name', _text(50, required=True)),
+        ('Last_Name', _text(50)),
+        ('Phone_No', _text(15)),
+        ('Email', _email),
+    ),
+    'restaurants': (
+        ('Name', _text(100, required=True)),
+        ('Address', _text(255)),
+        ('Phone_No', _text(15)),
+    ),
+    'menu': (
+        ('Restaurant_ID', _id),
+        ('Name', _text(100, required=True)),
+        ('Description', _text(65535)),
+        ('Price', _price),
+    ),
+    'delivery_drivers': (
+        ('First_Name', _text(50, required=True)),
+        ('Last_Name', _text(50)),
+        ('Pickup', _text(100)),
+        ('Destination', _text(100)),
+    ),
+}
+# columns a file must have: those whose parser rejects an empty value
+REQUIRED = {
+    'customers': ('First_Name',),
+    'restaurants': ('Name',),
+    'menu': ('Restaurant_ID', 'Name', 'Price'),
+    'delivery_drivers': ('First_Name',),
+}
+
+
+def _in(values) -> str:
+    return ', '.join(['%s'] * len(values))
+
+
+def header_map(table: str, header: list) -> dict:
+    """column -> position in the CSV; ValueError for missing required or unknown columns."""
+    known = {column.lower(): column for column, _ in IMPORTS[table]}
+    positions = {}
+    for index, name in enumerate(header):
+        column = known.get(name.strip().lower())
+        if column is None:
+            raise ValueError(f"Unknown column '{name.strip()}' for {table} "
+                             f"(expected {', '.join(c for c, _ in IMPORTS[table])})")
+        positions[column] = index
+    missing = [c for c in REQUIRED[table] if c not in positions]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    return positions
+
+
+def _open(path: str):
+    # utf-8-sig: spreadsheet exports often start with a byte order mark
+    return open(path, newline='', encoding='utf-8-sig')
+
+
+def inspect_file(path: str, table: str, max_rows: int) -> int:
+    """Check the header and count the data rows; ValueError when the file can't be imported."""
+    try:
+        with _open(path) as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                raise ValueError('The file is empty')
+            header_map(table, header)
+            rows = 0
+            for _ in reader:
+                rows += 1
+                if rows > max_rows:
+                    raise ValueError(f'At most {max_rows} rows per import')
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f'Not a UTF-8 CSV file: {e}')
+    if not rows:
+        raise ValueError('The file has a header but no rows')
+    return rows
+
+
+def enqueue(cur, table: str, file_name: str, path: str, rows_total: int) -> int:
+    """Queue an import of the file at `path`; returns the Job_ID. The caller commits."""
+    cur.execute("INSERT INTO import_jobs (Target, File_Name, File_Path, Rows_Total) VALUES (%s, %s, %s, %s)",
+                (table, file_name[:255], path, rows_total))
+    return cur.lastrowid
+
+
+def job_status(cur, job_id: int, errors: int = 0):
+    """The import_jobs row plus Percent_Done and its first `errors` row errors, or None."""
+    cur.execute("SELECT * FROM import_jobs WHERE Job_ID = %s", (job_id,))
+    job = cur.fetchone()
+    if job is None:
+        return None
+    job = dict(job)
+    total = job['Rows_Total'] or 0
+    job['Percent_Done'] = 100.0 if job['Status'] == 'done' else (
+        round(100.0 * min(job['Rows_Done'], total) / total, 1) if total else 0.0)
+    job['Errors'] = []
+    if errors and job['Rows_Failed']:
+        cur.execute("SELECT Line_No, Error FROM import_errors WHERE Job_ID = %s ORDER BY Line_No LIMIT %s",
+                    (job_id, errors))
+        job['Errors'] = list(cur.fetchall())
+    return job
+
+
+def parse_row(table: str, positions: dict, record: list) -> tuple:
+    """Values in IMPORTS[table] column order; ValueError naming the first bad column."""
+    values = []
+    for column, parse in IMPORTS[table]:
+        index = positions.get(column)
+        raw = record[index] if index is not None and index < len(record) else ''
+        try:
+            values.append(parse(raw))
+        except ValueError as e:
+            raise ValueError(f'{column} {e}')
+    if len(record) > len(positions):
+        raise ValueError(f'{len(record)} fields, the header has {len(positions)}')
+    return tuple(values)
+
+
+def check_chunk(cur, table: str, rows: list) -> dict:
+    """Database checks for parsed rows [(line, values)]; returns line -> error for the rows that fail."""
+    errors = {}
+    if table == 'customers':
+        seen = {}
+        for line, values in rows:
+            phone = values[2]
+            if phone is not None:
+                if phone in seen:
+                    errors[line] = f'Phone_No {phone} is repeated from line {seen[phone]}'
+                else:
+                    seen[phone] = line
+        if seen:
+            phones = list(seen)
+            cur.execute(f"SELECT Phone_No, Customer_ID FROM customers WHERE Phone_No IN ({_in(phones)})",
+                        tuple(phones))
+            taken = {r['Phone_No']: r['Customer_ID'] for r in cur.fetchall()}
+            for phone, customer_id in taken.items():
+                errors.setdefault(seen[phone], f'Phone_No {phone} already belongs to customer {customer_id}')
+    elif table == 'menu':
+        seen = {}
+        for line, values in rows:
+            restaurant_id = values[0]
+            if restaurant_id in seen:
+                errors[line] = f'Restaurant_ID {restaurant_id} already has a menu item on line {seen[restaurant_id]}'
+            else:
+                seen[restaurant_id] = line
+        ids = list(seen)
+        cur.execute(f"SELECT r.Restaurant_ID, m.Menu_Item_ID FROM restaurants r "
+                    f"LEFT JOIN menu m ON m.Restaurant_ID = r.Restaurant_ID "
+                    f"WHERE r.Restaurant_ID IN ({_in(ids)})", tuple(ids))
+        found = {r['Restaurant_ID']: r['Menu_Item_ID'] for r in cur.fetchall()}
+        for restaurant_id, line in seen.items():
+            if restaurant_id not in found:
+                errors[line] = f'Unknown Restaurant_ID {restaurant_id}'
+            elif found[restaurant_id] is not None:
+                errors[line] = (f'Restaurant_ID {restaurant_id} already has menu item '
+                                f'{found[restaurant_id]} (menu is one item per restaurant)')
+    return errors
+
+
+def _load_value(value) -> str:
+    # with ESCAPED BY '' an unquoted NULL is NULL and a quoted value is taken as is
+    return 'NULL' if value is None else '"' + str(value).replace('"', '""') + '"'
+
+
+class ImportWorker:
+    """
+    Daemon thread that runs queued import_jobs, like PurgeWorker.
+
+    method 'load' uses LOAD DATA LOCAL INFILE on connections from `connect()`
+    (which must allow local_infile) and falls back to multi-row INSERTs when
+    either side refuses it; 'insert' uses pooled connections.
+    `on_chunk(table, n)` runs after every chunk that imported n > 0 rows (the
+    app uses it to invalidate cached reference data).
+    """
+
+    def __init__(self, pool, chunk_size: int = 5000, method: str = 'insert', connect=None,
+                 poll_interval: float = 30.0, max_errors: int = 10000, on_chunk=None):
+        self.pool = pool
+        self.chunk_size = max(chunk_size, 1)
+        self.method = method if connect is not None else 'insert'
+        self.connect = connect
+        self.poll_interval = poll_interval
+        self.max_errors = max_errors
+        self.on_chunk = on_chunk
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {'jobs_done': 0, 'jobs_failed': 0, 'rows_imported': 0, 'rows_failed': 0,
+                       'method': self.method, 'last_error': None}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='import-worker', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    # -- jobs ------------------------------------------------------------
+    def claim(self, conn):
+        """Atomically move the oldest queued job to 'running'; returns the row or None."""
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT * FROM import_jobs WHERE Status = 'queued' "
+                        "ORDER BY Job_ID LIMIT 1 FOR UPDATE SKIP LOCKED")
+            job = cur.fetchone()
+            if job is None:
+                conn.rollback()
+                return None
+            cur.execute("UPDATE import_jobs SET Status = 'running', Started_At = COALESCE(Started_At, NOW()) "
+                        "WHERE Job_ID = %s", (job['Job_ID'],))
+            conn.commit()
+            return job
+        finally:
+            cur.close()
+
+    def run_job(self, conn, job) -> int:
+        """Import one claimed job from where it stopped; returns the rows imported by this run."""
+        job_id, table = job['Job_ID'], job['Target']
+        imported = 0
+        cur = conn.cursor()
+        try:
+            with _open(job['File_Path']) as f:
+                reader = csv.reader(f)
+                positions = header_map(table, next(reader))
+                done = job['Rows_Done']
+                errors_kept = min(job['Rows_Failed'], self.max_errors)
+                for _ in range(done):
+                    next(reader)
+                while True:
+                    records = []
+                    for record in reader:
+                        records.append((reader.line_num, record))
+                        if len(records) == self.chunk_size:
+                            break
+                    if not records:
+                        break
+                    n, failed = self._import_chunk(conn, cur, job_id, table, positions, records, errors_kept)
+                    errors_kept = min(errors_kept + len(failed), self.max_errors)
+                    done += len(records)
+                    imported += n
+                    with self._lock:
+                        self._stats['rows_imported'] += n
+                        self._stats['rows_failed'] += len(failed)
+                    if n and self.on_chunk:
+                        self.on_chunk(table, n)
+            cur.execute("UPDATE import_jobs SET Status = 'done', Finished_At = NOW(), Error = NULL "
+                        "WHERE Job_ID = %s", (job_id,))
+            conn.commit()
+            try:
+                os.remove(job['File_Path'])
+            except OSError:
+                pass
+            return imported
+        except Exception as e:
+            conn.rollback()
+            cur.execute("UPDATE import_jobs SET Status = 'failed', Error = %s WHERE Job_ID = %s",
+                        (str(e)[:1000], job_id))
+            conn.commit()
+            raise
+        finally:
+            cur.close()
+
+    def _import_chunk(self, conn, cur, job_id, table, positions, records, errors_kept):
+        """Validate and insert one chunk and advance the job, in one transaction; returns (imported, failures)."""
+        rows, failed = [], []
+        for line, record in records:
+            if not any(field.strip() for field in record):
+                continue
+            try:
+                rows.append((line, parse_row(table, positions, record)))
+            except ValueError as e:
+                failed.append((line, str(e)))
+        if rows:
+            bad = check_chunk(cur, table, rows)
+            failed.extend(bad.items())
+            rows = [(line, values) for line, values in rows if line not in bad]
+        columns = [column for column, _ in IMPORTS[table]]
+        imported = len(rows)
+        if rows:
+            cur.execute("SAVEPOINT import_chunk")
+            try:
+                self._insert(cur, table, columns, [values for _, values in rows])
+            except (IntegrityError, _Conflict):
+                # written by someone else since check_chunk: find the rows one at a time
+                cur.execute("ROLLBACK TO SAVEPOINT import_chunk")
+                imported = 0
+                sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({_in(columns)})"
+                for line, values in rows:
+                    cur.execute("SAVEPOINT import_row")
+                    try:
+                        cur.execute(sql, values)
+                        imported += 1
+                    except IntegrityError as e:
+                        cur.execute("ROLLBACK TO SAVEPOINT import_row")
+                        failed.append((line, str(e.args[-1])[:255]))
+        room = max(self.max_errors - errors_kept, 0)
+        if failed and room:
+            failed.sort()
+            cur.executemany("INSERT INTO import_errors (Job_ID, Line_No, Error) VALUES (%s, %s, %s)",
+                            [(job_id, line, error[:255]) for line, error in failed[:room]])
+        cur.execute("UPDATE import_jobs SET Rows_Done = Rows_Done + %s, Rows_Imported = Rows_Imported + %s, "
+                    "Rows_Failed = Rows_Failed + %s WHERE Job_ID = %s",
+                    (len(records), imported, len(failed), job_id))
+        conn.commit()
+        return imported, failed
+
+    def _insert(self, cur, table, columns, rows):
+        if self.method == 'load':
+            try:
+                self._load_data(cur, table, columns, rows)
+                return
+            except OperationalError as e:
+                if e.args[0] not in _LOCAL_INFILE_DISABLED:
+                    raise
+                with self._lock:
+                    self.method = self._stats['method'] = 'insert'
+        # MySQLdb turns executemany(INSERT ... VALUES) into multi-row statements
+        cur.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({_in(columns)})", rows)
+
+    def _load_data(self, cur, table, columns, rows):
+        fd, path = tempfile.mkstemp(prefix=f'import_{table}_', suffix='.csv')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.writelines(','.join(_load_value(v) for v in values) + '\n' for values in rows)
+            cur.execute(f"""
+                LOAD DATA LOCAL INFILE %s INTO TABLE {table}
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY ',' ENCLOSED BY '"' ESCAPED BY ''
+                LINES TERMINATED BY '\\n'
+                ({', '.join(columns)})
+            """, (path,))
+            # LOCAL turns duplicate-key errors into skipped rows
+            if cur.rowcount != len(rows):
+                raise _Conflict()
+        finally:
+            os.remove(path)
+
+    # -- loop ------------------------------------------------------------
+    def _acquire(self):
+        return self.connect() if self.connect is not None else self.pool.acquire()
+
+    def _release(self, conn):
+        if self.connect is not None:
+            conn.close()
+        else:
+            self.pool.release(conn)
+
+    def drain(self) -> int:
+        """Run queued jobs until none are left; returns how many ran."""
+        ran = 0
+        conn = self._acquire()
+        try:
+            while True:
+                job = self.claim(conn)
+                if job is None:
+                    return ran
+                ran += 1
+                try:
+                    self.run_job(conn, job)
+                    with self._lock:
+                        self._stats['jobs_done'] += 1
+                except Exception as e:
+                    with self._lock:
+                        self._stats['jobs_failed'] += 1
+                        self._stats['last_error'] = f"job {job['Job_ID']}: {e}"
+        finally:
+            self._release(conn)
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                self.drain()
+            except Exception as e:
+                # DB unreachable, pool exhausted...; try again on the next tick
+                with self._lock:
+                    self._stats['last_error'] = str(e)
+            self._wake.wait(self.poll_interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        return stats
+
+
+def requeue(conn, statuses=('failed', 'running')) -> int:
+    """Put failed (and interrupted) imports back in the queue; they resume after Rows_Done."""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"UPDATE import_jobs SET Status = 'queued' WHERE Status IN ({_in(statuses)})",
+                    tuple(statuses))
+        conn.commit()
+        return cur.rowcount
+    finally:
+        cur.close()
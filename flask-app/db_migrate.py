@@ -0,0 +1,102 @@
+"""
+Apply the versioned SQL scripts in migrations/ to the configured database.
+
+Each script is named NNN_description.sql and is safe to re-run; applied
+versions are recorded in schema_migrations so `flask --app app migrate`
+only runs what is new. Scripts use the mysql-client DELIMITER convention,
+which split_sql_script() understands.
+
+Procedures several scripts call (AddIndexIfMissing, ...) live once in
+helpers.sql: it runs before the pending scripts and its procedures are
+dropped again after them.
+"""
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+_VERSION_RE = re.compile(r'^(\d+)_.*\.sql$')
+HELPERS = 'helpers.sql'
+_PROCEDURE_RE = re.compile(r'^CREATE PROCEDURE (\w+)', re.MULTILINE)
+
+
+def split_sql_script(text: str):
+    """Split a mysql-client script into statements, honouring DELIMITER lines."""
+    statements = []
+    delimiter = ';'
+    buf = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith('DELIMITER '):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        if not buf and (not stripped or stripped.startswith('--')):
+            continue
+        buf.append(line)
+        if stripped.endswith(delimiter):
+            stmt = '\n'.join(buf).rstrip()[:-len(delimiter)].strip()
+            buf = []
+            # the connection already points at the configured database
+            if stmt and not stmt.upper().startswith('USE '):
+                statements.append(stmt)
+    if buf and '\n'.join(buf).strip():
+        statements.append('\n'.join(buf).strip())
+    return statements
+
+
+def list_migrations(directory: str = MIGRATIONS_DIR):
+    """Return [(version, filename)] sorted by version."""
+    found = []
+    for name in os.listdir(directory):
+        m = _VERSION_RE.match(name)
+        if m:
+            found.append((int(m.group(1)), name))
+    return sorted(found)
+
+
+def _run_script(cur, text: str):
+    for stmt in split_sql_script(text):
+        cur.execute(stmt)
+        while cur.nextset():
+            pass
+
+
+def apply_migrations(conn, directory: str = MIGRATIONS_DIR, rerun: bool = False):
+    """Run pending migrations (all of them when rerun=True); return the filenames applied."""
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            Version INT PRIMARY KEY,
+            Name VARCHAR(255),
+            Applied_At DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("SELECT Version FROM schema_migrations")
+    done = {row['Version'] if isinstance(row, dict) else row[0] for row in cur.fetchall()}
+
+    pending = [(version, name) for version, name in list_migrations(directory) if rerun or version not in done]
+    applied = []
+    if not pending:
+        cur.close()
+        return applied
+    helpers = []
+    helpers_path = os.path.join(directory, HELPERS)
+    if os.path.exists(helpers_path):
+        with open(helpers_path, encoding='utf-8') as fh:
+            text = fh.read()
+        helpers = _PROCEDURE_RE.findall(text)
+        _run_script(cur, text)
+    try:
+        for version, name in pending:
+            with open(os.path.join(directory, name), encoding='utf-8') as fh:
+                _run_script(cur, fh.read())
+            cur.execute(
+                "REPLACE INTO schema_migrations (Version, Name, Applied_At) VALUES (%s, %s, NOW())",
+                (version, name)
+            )
+            conn.commit()
+            applied.append(name)
+    finally:
+        for procedure in helpers:
+            cur.execute(f"DROP PROCEDURE IF EXISTS {procedure}")
+    cur.close()
+    return applied
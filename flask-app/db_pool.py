@@ -0,0 +1,480 @@
+"""
+Pooled MySQL connections for the Flask app.
+
+PooledMySQL is a drop-in for flask_mysqldb.MySQL: `mysql.connection` hands
+out one connection per app context, but connections come from a shared
+ConnectionPool instead of being opened (and authenticated) per request.
+
+Settings (app.config):
+    MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB, MYSQL_PORT, ...
+                                the same keys flask_mysqldb reads
+    MYSQL_POOL_MIN_SIZE         connections opened on first use (default 2)
+    MYSQL_POOL_MAX_SIZE         hard cap on open connections (default 20)
+    MYSQL_POOL_TIMEOUT          seconds to wait for a free connection (default 5)
+    MYSQL_POOL_MAX_WAITERS      callers allowed to queue before failing fast (default 100)
+    MYSQL_POOL_RECYCLE          close connections older than this, seconds (default 3600)
+    MYSQL_POOL_IDLE_TIMEOUT     close idle connections above min size after this, seconds (default 300)
+    MYSQL_POOL_PRE_PING         ping a connection before handing it out (default True)
+
+Read replica (optional; everything goes to the primary while MYSQL_REPLICA_HOST is unset):
+    MYSQL_REPLICA_HOST          replica to serve read-only views from
+    MYSQL_REPLICA_PORT, MYSQL_REPLICA_USER, MYSQL_REPLICA_PASSWORD, MYSQL_REPLICA_DB,
+    MYSQL_REPLICA_UNIX_SOCKET   default to the primary's settings
+    MYSQL_REPLICA_POOL_MAX_SIZE cap on replica connections (default MYSQL_POOL_MAX_SIZE)
+    MYSQL_REPLICA_MAX_LAG       seconds behind the source before reads fall back to the
+                                primary (default 5; None skips the replication check)
+    MYSQL_REPLICA_CHECK_INTERVAL  seconds between health / lag checks (default 5)
+    MYSQL_REPLICA_READS         'declared': only @mysql.read_only views use the replica;
+                                'get': every GET / HEAD except @mysql.primary views (default 'declared')
+    MYSQL_READ_YOUR_WRITES      seconds a client keeps reading from the primary after it
+                                wrote something (default 5)
+"""
+import threading
+import time
+
+import MySQLdb
+import MySQLdb.cursors
+from flask import current_app, g, has_request_context, request, session
+
+
+class PoolError(Exception):
+    """Raised when no connection can be handed out."""
+
+
+class PoolTimeout(PoolError):
+    """No connection became free within MYSQL_POOL_TIMEOUT."""
+
+
+class PoolExhausted(PoolError):
+    """The wait queue is already MYSQL_POOL_MAX_WAITERS long."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections created by `connect()`."""
+
+    def __init__(self, connect, min_size: int = 2, max_size: int = 20, timeout: float = 5.0,
+                 max_waiters: int = 100, recycle: float = 3600.0, idle_timeout: float = 300.0,
+                 pre_ping: bool = True):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.max_waiters = max_waiters
+        self.recycle = recycle
+        self.idle_timeout = idle_timeout
+        self.pre_ping = pre_ping
+
+        self._lock = threading.Condition()
+        self._idle = []      # stack of connections, most recently used last
+        self._meta = {}      # id(conn) -> {'created': ts, 'last_used': ts}
+        self._size = 0       # open connections, idle + checked out
+        self._waiting = 0
+        self._warmed = False
+        self._stats = {
+            'checkouts': 0, 'waits': 0, 'timeouts': 0, 'exhausted': 0,
+            'errors': 0, 'created': 0, 'closed': 0, 'wait_time': 0.0,
+        }
+
+    # -- connection lifecycle -------------------------------------------
+    def _open(self):
+        conn = self._connect()
+        now = time.monotonic()
+        with self._lock:
+            self._meta[id(conn)] = {'created': now, 'last_used': now}
+            self._stats['created'] += 1
+        return conn
+
+    def _close(self, conn):
+        """Close a connection and free its slot. Caller must hold the lock."""
+        self._meta.pop(id(conn), None)
+        self._size -= 1
+        self._stats['closed'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._lock.notify()
+
+    def _expired(self, conn, now: float) -> bool:
+        meta = self._meta.get(id(conn))
+        return meta is None or (self.recycle and now - meta['created'] > self.recycle)
+
+    def _warm(self):
+        with self._lock:
+            if self._warmed:
+                return
+            self._warmed = True
+            missing = max(0, self.min_size - self._size)
+            self._size += missing
+        for _ in range(missing):
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._stats['errors'] += 1
+                continue
+            with self._lock:
+                self._idle.append(conn)
+                self._lock.notify()
+
+    # -- public API ------------------------------------------------------
+    def acquire(self):
+        """Check out a healthy connection, waiting up to `timeout` seconds."""
+        if not self._warmed:
+            self._warm()
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            conn = None
+            with self._lock:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        candidate = self._idle.pop()
+                        if self._expired(candidate, now):
+                            self._close(candidate)
+                            continue
+                        conn = candidate
+                        break
+                    if conn is not None:
+                        break
+                    if self._size < self.max_size:
+                        # reserve a slot; the connection is opened outside the lock
+                        self._size += 1
+                        break
+                    if self._waiting >= self.max_waiters:
+                        self._stats['exhausted'] += 1
+                        raise PoolExhausted(f'{self._waiting} requests already waiting for a DB connection')
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f'No DB connection free after {self.timeout}s')
+                    if not waited:
+                        waited = True
+                        self._stats['waits'] += 1
+                    self._waiting += 1
+                    try:
+                        self._lock.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                        self._stats['wait_time'] += time.monotonic() - now
+
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._stats['errors'] += 1
+                        self._lock.notify()
+                    raise
+            elif self.pre_ping and not self._ping(conn):
+                continue
+
+            with self._lock:
+                self._stats['checkouts'] += 1
+                self._meta[id(conn)]['last_used'] = time.monotonic()
+            return conn
+
+    def _ping(self, conn) -> bool:
+        """Check a connection is alive; close it and count an error if not."""
+        try:
+            conn.ping()
+            return True
+        except Exception:
+            with self._lock:
+                self._stats['errors'] += 1
+                self._close(conn)
+            return False
+
+    def release(self, conn, discard: bool = False):
+        """Return a connection; any open transaction is rolled back first."""
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._lock:
+            if id(conn) not in self._meta:
+                return  # already closed
+            if discard:
+                self._stats['errors'] += 1
+                self._close(conn)
+                return
+            now = time.monotonic()
+            self._meta[id(conn)]['last_used'] = now
+            self._idle.append(conn)
+            self._reap(now)
+            self._lock.notify()
+
+    def _reap(self, now: float):
+        """Close connections idle longer than idle_timeout while above min_size."""
+        if not self.idle_timeout:
+            return
+        # oldest idle connections sit at the bottom of the stack
+        while self._size > self.min_size and self._idle:
+            meta = self._meta.get(id(self._idle[0]))
+            if meta and now - meta['last_used'] <= self.idle_timeout:
+                break
+            self._close(self._idle.pop(0))
+
+    def close_all(self):
+        with self._lock:
+            while self._idle:
+                self._close(self._idle.pop())
+            self._warmed = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+            stats['wait_time'] = round(stats['wait_time'], 3)
+        return stats
+
+
+class ReplicaMonitor:
+    """
+    Health of a read replica: reachable, replicating, and no more than
+    `max_lag` seconds behind its source (max_lag=None only checks it answers).
+
+    healthy() re-checks at most every `check_interval` seconds; while one
+    request runs the check the others go on with the previous verdict.
+    SHOW REPLICA STATUS needs the REPLICATION CLIENT privilege.
+    """
+
+    def __init__(self, pool, max_lag=5.0, check_interval: float = 5.0):
+        self.pool = pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked = None     # monotonic time of the last verdict
+        self._state = {'healthy': False, 'lag': None, 'error': 'not checked yet', 'checks': 0, 'failures': 0}
+
+    def healthy(self) -> bool:
+        if self._checked is None or time.monotonic() - self._checked >= self.check_interval:
+            # the very first check is waited for; later ones are left to whoever gets the lock
+            if self._lock.acquire(blocking=self._checked is None):
+                try:
+                    if self._checked is None or time.monotonic() - self._checked >= self.check_interval:
+                        self.check()
+                finally:
+                    self._lock.release()
+        return self._state['healthy']
+
+    def _replication_row(self, conn):
+        cur = conn.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            try:
+                cur.execute("SHOW REPLICA STATUS")
+            except MySQLdb.ProgrammingError:
+                cur.execute("SHOW SLAVE STATUS")   # MySQL before 8.0.22
+            return cur.fetchone()
+        finally:
+            cur.close()
+
+    def check(self):
+        """Query the replica now and record the verdict."""
+        lag, error = None, None
+        try:
+            conn = self.pool.acquire()
+            try:
+                row = self._replication_row(conn)
+            finally:
+                self.pool.release(conn)
+            if row is not None:
+                lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+            if self.max_lag is not None:
+                if row is None:
+                    error = 'not replicating'
+                elif lag is None:
+                    error = 'replication stopped'
+                elif lag > self.max_lag:
+                    error = f'{lag}s behind the source'
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        self._record(error, lag)
+
+    def mark_down(self, error):
+        """A replica connection just failed: stop using it until the next check."""
+        self._record(f'{type(error).__name__}: {error}', None)
+
+    def _record(self, error, lag):
+        self._state.update(healthy=error is None, lag=lag, error=error, checks=self._state['checks'] + 1,
+                           failures=self._state['failures'] + (error is not None))
+        self._checked = time.monotonic()
+
+    def stats(self) -> dict:
+        stats = dict(self._state)
+        stats['checked_ago'] = round(time.monotonic() - self._checked, 1) if self._checked is not None else None
+        return stats
+
+
+class PooledMySQL:
+    """
+    flask_mysqldb-compatible extension backed by a ConnectionPool.
+
+    With a replica configured, `mysql.connection` comes from the replica pool
+    for views decorated with @mysql.read_only (or, with MYSQL_REPLICA_READS =
+    'get', for any GET not decorated with @mysql.primary) as long as the
+    replica is healthy and the client hasn't written in the last
+    MYSQL_READ_YOUR_WRITES seconds; otherwise from the primary. Replica
+    sessions are READ ONLY, so a mis-declared view fails instead of writing
+    to the replica.
+    """
+
+    def __init__(self, app=None):
+        self.pool = None
+        self.replica_pool = None
+        self.replica = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MYSQL_HOST', 'localhost')
+        app.config.setdefault('MYSQL_USER', None)
+        app.config.setdefault('MYSQL_PASSWORD', None)
+        app.config.setdefault('MYSQL_DB', None)
+        app.config.setdefault('MYSQL_PORT', 3306)
+        app.config.setdefault('MYSQL_UNIX_SOCKET', None)
+        app.config.setdefault('MYSQL_CONNECT_TIMEOUT', 10)
+        app.config.setdefault('MYSQL_CHARSET', 'utf8mb4')
+        app.config.setdefault('MYSQL_SQL_MODE', None)
+        app.config.setdefault('MYSQL_CURSORCLASS', None)
+        app.config.setdefault('MYSQL_POOL_MIN_SIZE', 2)
+        app.config.setdefault('MYSQL_POOL_MAX_SIZE', 20)
+        app.config.setdefault('MYSQL_POOL_TIMEOUT', 5.0)
+        app.config.setdefault('MYSQL_POOL_MAX_WAITERS', 100)
+        app.config.setdefault('MYSQL_POOL_RECYCLE', 3600)
+        app.config.setdefault('MYSQL_POOL_IDLE_TIMEOUT', 300)
+        app.config.setdefault('MYSQL_POOL_PRE_PING', True)
+
+        self.pool = ConnectionPool(
+            lambda: self.connect(app.config),
+            min_size=app.config['MYSQL_POOL_MIN_SIZE'],
+            max_size=app.config['MYSQL_POOL_MAX_SIZE'],
+            timeout=app.config['MYSQL_POOL_TIMEOUT'],
+            max_waiters=app.config['MYSQL_POOL_MAX_WAITERS'],
+            recycle=app.config['MYSQL_POOL_RECYCLE'],
+            idle_timeout=app.config['MYSQL_POOL_IDLE_TIMEOUT'],
+            pre_ping=app.config['MYSQL_POOL_PRE_PING'],
+        )
+        app.config.setdefault('MYSQL_REPLICA_HOST', None)
+        app.config.setdefault('MYSQL_REPLICA_POOL_MAX_SIZE', app.config['MYSQL_POOL_MAX_SIZE'])
+        app.config.setdefault('MYSQL_REPLICA_MAX_LAG', 5)
+        app.config.setdefault('MYSQL_REPLICA_CHECK_INTERVAL', 5)
+        app.config.setdefault('MYSQL_REPLICA_READS', 'declared')
+        app.config.setdefault('MYSQL_READ_YOUR_WRITES', 5)
+        if app.config['MYSQL_REPLICA_HOST']:
+            replica_config = dict(app.config)
+            for key in ('HOST', 'PORT', 'USER', 'PASSWORD', 'DB', 'UNIX_SOCKET'):
+                if app.config.get(f'MYSQL_REPLICA_{key}') is not None:
+                    replica_config[f'MYSQL_{key}'] = app.config[f'MYSQL_REPLICA_{key}']
+            self.replica_pool = ConnectionPool(
+                lambda: self.connect(replica_config, init_command='SET SESSION TRANSACTION READ ONLY'),
+                min_size=app.config['MYSQL_POOL_MIN_SIZE'],
+                max_size=app.config['MYSQL_REPLICA_POOL_MAX_SIZE'],
+                timeout=app.config['MYSQL_POOL_TIMEOUT'],
+                max_waiters=app.config['MYSQL_POOL_MAX_WAITERS'],
+                recycle=app.config['MYSQL_POOL_RECYCLE'],
+                idle_timeout=app.config['MYSQL_POOL_IDLE_TIMEOUT'],
+                pre_ping=app.config['MYSQL_POOL_PRE_PING'],
+            )
+            self.replica = ReplicaMonitor(self.replica_pool, app.config['MYSQL_REPLICA_MAX_LAG'],
+                                          app.config['MYSQL_REPLICA_CHECK_INTERVAL'])
+            app.after_request(self._remember_write)
+
+        app.extensions['mysql_pool'] = self
+        app.teardown_appcontext(self.teardown)
+
+    @staticmethod
+    def connect(config, **extra):
+        """Open a raw MySQLdb connection from flask_mysqldb-style settings (plus `extra` connect args)."""
+        kwargs = {}
+        for key, arg in (('MYSQL_HOST', 'host'), ('MYSQL_USER', 'user'), ('MYSQL_PASSWORD', 'passwd'),
+                         ('MYSQL_DB', 'db'), ('MYSQL_PORT', 'port'), ('MYSQL_UNIX_SOCKET', 'unix_socket'),
+                         ('MYSQL_CONNECT_TIMEOUT', 'connect_timeout'), ('MYSQL_CHARSET', 'charset'),
+                         ('MYSQL_SQL_MODE', 'sql_mode')):
+            if config.get(key) is not None:
+                kwargs[arg] = config[key]
+        if config.get('MYSQL_CURSORCLASS'):
+            kwargs['cursorclass'] = getattr(MySQLdb.cursors, config['MYSQL_CURSORCLASS'])
+        kwargs.update(extra)
+        return MySQLdb.connect(**kwargs)
+
+    # -- view routing ------------------------------------------------------
+    @staticmethod
+    def read_only(view):
+        """Declare a view read-only: it may be served from the replica."""
+        view.db_route = 'replica'
+        return view
+
+    @staticmethod
+    def primary(view):
+        """Pin a view to the primary (writes, or reads that must see the latest commit)."""
+        view.db_route = 'primary'
+        return view
+
+    def _wants_replica(self) -> bool:
+        if self.replica is None or not has_request_context():
+            return False
+        route = getattr(current_app.view_functions.get(request.endpoint), 'db_route', None)
+        if route == 'primary':
+            return False
+        if route != 'replica' and not (current_app.config['MYSQL_REPLICA_READS'] == 'get'
+                                       and request.method in ('GET', 'HEAD')):
+            return False
+        # read-your-writes: this client wrote a moment ago and the replica may not have it yet
+        if session.get('_db_primary_until', 0) > time.time():
+            return False
+        return self.replica.healthy()
+
+    def read_pool(self):
+        """Pool for a read outside the request's own connection (e.g. a streamed export)."""
+        if self.replica is not None and session.get('_db_primary_until', 0) <= time.time() \
+                and self.replica.healthy():
+            return self.replica_pool
+        return self.pool
+
+    def _remember_write(self, response):
+        # a write went to the primary: keep this client there until the replica has caught up
+        route = getattr(current_app.view_functions.get(request.endpoint), 'db_route', None)
+        if g.get('_mysql_pool') is self.pool and route != 'replica' and (
+                request.method not in ('GET', 'HEAD', 'OPTIONS') or route == 'primary'):
+            session['_db_primary_until'] = time.time() + current_app.config['MYSQL_READ_YOUR_WRITES']
+        return response
+
+    @property
+    def connection(self):
+        """The connection checked out for the current app context."""
+        if '_mysql_conn' not in g:
+            pool = self.pool
+            conn = None
+            if self._wants_replica():
+                try:
+                    conn = self.replica_pool.acquire()
+                    pool = self.replica_pool
+                except Exception as e:
+                    self.replica.mark_down(e)
+            g._mysql_conn = conn if conn is not None else self.pool.acquire()
+            g._mysql_pool = pool
+        return g._mysql_conn
+
+    def teardown(self, exception):
+        conn = g.pop('_mysql_conn', None)
+        pool = g.pop('_mysql_pool', self.pool)
+        if conn is not None:
+            pool.release(conn)
+
+    def stats(self) -> dict:
+        stats = self.pool.stats()
+        if self.replica is not None:
+            stats['replica'] = dict(self.replica_pool.stats(), health=self.replica.stats())
+        return stats
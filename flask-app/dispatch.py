@@ -0,0 +1,219 @@
+"""
+Batch auto-dispatch: undelivered orders to free drivers, one round at a time.
+
+A round
+  1. reads the undelivered orders (customer_current_orders, oldest first) with
+     their restaurant, and the free drivers: those without a delivery picked
+     up in the last `busy_minutes`; both are locked (SKIP LOCKED) unless it
+     is a dry run, so overlapping rounds split orders and drivers alike
+  2. indexes the free drivers by zone, the normalised value of their Pickup
+  3. matches orders to drivers in memory (match())
+  4. writes every assignment with one AssignDeliveries call (AssignDelivery
+     for a whole list) in the caller's transaction
+
+Zones: a driver's Pickup names where they wait - a restaurant, an area or a
+city. An order's zones are its restaurant's Name and each comma-separated
+part of its Address, so an order from 'Spice Garden' at 'MG Road, Bengaluru'
+can go to a driver waiting at 'Spice Garden', 'MG Road' or 'Bengaluru'.
+
+match() is a maximum b-matching of orders to zones, where a zone has one slot
+per free driver (times `capacity`). Orders are taken oldest first; when all
+of an order's zones are full, an augmenting path moves earlier orders to
+another of their zones to make room, so the round places as many orders
+in-zone as the drivers allow. Zones a failed search ran through stay full for
+the rest of the round and are skipped afterwards, which keeps a round linear
+in the number of (order, zone) pairs. Orders still unmatched then go to any
+driver left over outside their zone, when `allow_remote` is set.
+
+Customers have no address on file, so a delivery's Location is the
+driver's Destination.
+"""
+import json
+import re
+import time
+from collections import deque
+
+
+def zone(value) -> str:
+    """Normalised zone name: lower case, single spaces."""
+    return ' '.join(str(value or '').lower().split())
+
+
+_HOUSE_NUMBER = re.compile(r'^\d+[\w/-]*\s+')
+
+
+def order_zones(name, address) -> list:
+    """Zones an order can be served from: its restaurant and each part of the address."""
+    zones = [zone(name)] + [zone(_HOUSE_NUMBER.sub('', part.strip())) for part in str(address or '').split(',')]
+    return list(dict.fromkeys(z for z in zones if z))
+
+
+def load_orders(cur, limit: int, lock: bool) -> list:
+    """
+    Undelivered, visible orders, oldest first.
+
+    With `lock` the customer_current_orders rows are locked for the rest of
+    the transaction (SKIP LOCKED: concurrent rounds split the queue), so no
+    other round can dispatch the same orders.
+    """
+    cur.execute(f"""
+        SELECT o.Order_ID, o.Restaurant_ID, r.Name, r.Address
+        FROM customer_current_orders cco
+        JOIN orders o ON o.Order_ID = cco.Order_ID
+        JOIN customers c ON c.Customer_ID = o.Customer_ID
+        JOIN restaurants r ON r.Restaurant_ID = o.Restaurant_ID
+        WHERE o.Deleted_At IS NULL AND c.Deleted_At IS NULL
+        ORDER BY cco.Order_ID
+        LIMIT %s{' FOR UPDATE OF cco SKIP LOCKED' if lock else ''}
+    """, (limit,))
+    return list(cur.fetchall())
+
+
+def load_free_drivers(cur, busy_minutes: int, lock: bool = False) -> list:
+    """
+    Drivers with no pickup in the last busy_minutes (idx_deliveries_driver_pickup).
+
+    With `lock` the driver rows are locked for the rest of the transaction
+    (SKIP LOCKED: a driver another round is assigning is not free here), and
+    their recent deliveries are read as committed now rather than from the
+    transaction's snapshot, so a round that just committed counts as busy.
+    """
+    cur.execute(f"""
+        SELECT dr.Driver_ID, dr.Pickup, dr.Destination
+        FROM delivery_drivers dr
+        WHERE NOT EXISTS (
+            SELECT 1 FROM deliveries d
+            WHERE d.Driver_ID = dr.Driver_ID AND d.Pickup_Time >= NOW() - INTERVAL %s MINUTE{' FOR SHARE' if lock else ''}
+        )
+        ORDER BY dr.Driver_ID{' FOR UPDATE OF dr SKIP LOCKED' if lock else ''}
+    """, (busy_minutes,))
+    return list(cur.fetchall())
+
+
+def driver_index(drivers) -> dict:
+    """zone -> free drivers waiting there, in the order given."""
+    by_zone = {}
+    for driver in drivers:
+        by_zone.setdefault(zone(driver['Pickup']), []).append(driver)
+    return by_zone
+
+
+def _augment(start, zones_of, slots, members, assigned, dead) -> bool:
+    """BFS for a zone with a free slot reachable from order `start`; moves orders along the path."""
+    came_from = {}   # zone -> order that reached it
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        order = queue.popleft()
+        for z in zones_of[order]:
+            if z in came_from or z in dead:
+                continue
+            came_from[z] = order
+            if len(members[z]) < slots[z]:
+                # walk back: every order on the path moves one zone along it
+                while True:
+                    order = came_from[z]
+                    previous = assigned.get(order)
+                    if previous is not None:
+                        members[previous].discard(order)
+                    members[z].add(order)
+                    assigned[order] = z
+                    if order == start:
+                        return True
+                    z = previous
+            for other in members[z]:
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+    # nothing reachable from here has room, now or later in this round
+    dead.update(came_from)
+    return False
+
+
+def match(orders, index: dict, fee, remote_fee=None, capacity: int = 1, allow_remote: bool = True):
+    """
+    Assign drivers to orders; returns (assignments, unassigned order ids).
+
+    `orders` are rows with Order_ID, Restaurant_ID, Name, Address, oldest
+    first; `index` comes from driver_index() and every driver takes up to
+    `capacity` orders. Assignments are dicts ready for AssignDeliveries
+    (order_id, restaurant_id, driver_id, location, fee, in_zone), by order id.
+    """
+    slots = {z: len(drivers) * capacity for z, drivers in index.items()}
+    zones_of = {o['Order_ID']: [z for z in order_zones(o['Name'], o['Address']) if z in slots] for o in orders}
+    members = {z: set() for z in slots}
+    assigned = {}
+    dead = set()
+    free = sum(slots.values())
+    for o in orders:
+        if len(assigned) == free:
+            break
+        if zones_of[o['Order_ID']]:
+            _augment(o['Order_ID'], zones_of, slots, members, assigned, dead)
+
+    by_id = {o['Order_ID']: o for o in orders}
+    assignments = []
+    spare = []   # (round, driver): a driver's second slot comes after every driver's first
+    for z, drivers in index.items():
+        taken = len(members[z])
+        # oldest orders first, to the drivers that have waited longest
+        for n, order_id in enumerate(sorted(members[z])):
+            assignments.append(_assignment(by_id[order_id], drivers[n % len(drivers)], fee, True))
+        spare.extend((n // len(drivers), drivers[n % len(drivers)]) for n in range(taken, slots[z]))
+
+    unassigned = [o['Order_ID'] for o in orders if o['Order_ID'] not in assigned]
+    if allow_remote and spare:
+        spare.sort(key=lambda s: s[0])
+        remote_fee = fee if remote_fee is None else remote_fee
+        remote = list(zip(unassigned, (driver for _, driver in spare)))
+        assignments.extend(_assignment(by_id[order_id], driver, remote_fee, False) for order_id, driver in remote)
+        unassigned = unassigned[len(remote):]
+    assignments.sort(key=lambda a: a['order_id'])
+    return assignments, unassigned
+
+
+def _assignment(order, driver, fee, in_zone: bool) -> dict:
+    return {'order_id': order['Order_ID'], 'restaurant_id': order['Restaurant_ID'],
+            'driver_id': driver['Driver_ID'], 'location': driver['Destination'] or order['Address'] or '',
+            'fee': str(fee), 'in_zone': in_zone}
+
+
+def write(cur, assignments) -> int:
+    """Insert the deliveries with one AssignDeliveries call; returns how many went in. The caller commits."""
+    if not assignments:
+        return 0
+    payload = [{k: a[k] for k in ('order_id', 'restaurant_id', 'driver_id', 'location', 'fee')}
+               for a in assignments]
+    cur.callproc('AssignDeliveries', (json.dumps(payload),))
+    assigned = cur.fetchone()['Assigned']
+    while cur.nextset():
+        pass
+    return assigned
+
+
+def run_round(cur, dry_run: bool = False, busy_minutes: int = 45, capacity: int = 1,
+              max_orders: int = 5000, fee='40.00', remote_fee='60.00', allow_remote: bool = True) -> dict:
+    """
+    One dispatch round. With dry_run nothing is locked or written; otherwise
+    the round's orders and drivers stay locked until the caller commits (or
+    rolls back) the transaction, so overlapping rounds never share either.
+    """
+    started = time.perf_counter()
+    orders = load_orders(cur, max_orders, lock=not dry_run)
+    drivers = load_free_drivers(cur, busy_minutes, lock=not dry_run) if orders else []
+    loaded = time.perf_counter()
+    assignments, unassigned = match(orders, driver_index(drivers), fee, remote_fee, capacity, allow_remote)
+    matched = time.perf_counter()
+    written = 0 if dry_run else write(cur, assignments)
+    finished = time.perf_counter()
+    return {
+        'dry_run': dry_run,
+        'orders': len(orders),
+        'free_drivers': len(drivers),
+        'assigned': len(assignments) if dry_run else written,
+        'in_zone': sum(1 for a in assignments if a['in_zone']),
+        'unassigned': unassigned,
+        'assignments': assignments,
+        'ms': {'load': round((loaded - started) * 1000, 1), 'match': round((matched - loaded) * 1000, 1),
+               'write': round((finished - matched) * 1000, 1)},
+    }
@@ -0,0 +1,61 @@
+"""
+Fragment cache for rendered template blocks.
+
+    {% cache 'restaurant_options', ('restaurants',), selected_restaurant %}
+      ... expensive markup ...
+    {% endcache %}
+
+caches the block's output under its name, any extra key values after the
+table list, and the current version stamps of those tables (the
+table_versions rows every write bumps). A write to any of the tables, from
+any process, changes the stamps, so the next render misses; stale entries are
+never read again and age out of the LRU store. Blocks that depend on no table
+(the sidebar) pass () and stay cached until the process restarts.
+
+Anything the block needs from the database can be passed as a callable and
+called inside it, so a hit skips the query as well as the rendering. When the
+stamps can't be read the block is rendered every time.
+"""
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+
+class FragmentCacheExtension(Extension):
+    """
+    The {% cache name, tables, *key %} tag.
+
+    Set environment.fragment_cache to a ReferenceCache (the store, LRU by
+    max_entries) and environment.fragment_versions to a function returning
+    the stamps for a tuple of table names, or None when they are unknown.
+    """
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None, fragment_versions=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        parser.stream.expect('comma')
+        tables = parser.parse_expression()
+        key = []
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        call = self.call_method('_render', [name, tables, nodes.List(key)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, name, tables, key, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        tables = (tables,) if isinstance(tables, str) else tuple(tables)
+        if tables:
+            versions = self.environment.fragment_versions(tables) if self.environment.fragment_versions else None
+            if versions is None:
+                return caller()
+        else:
+            versions = ()
+        # the stamps are part of the key (not ReferenceCache's own versions): they come from the database
+        return cache.get((name, tuple(key), tables, versions), (), caller)
@@ -0,0 +1,301 @@
+"""
+Group commit for order placement.
+
+Placing an order directly costs one COMMIT, and under a burst the redo log
+flush behind every commit, not CPU, caps how many orders go in per second.
+With ORDER_GROUP_COMMIT on, the order views hand validated orders to an
+OrderWriter instead and block until theirs is committed. The writer thread
+takes up to `batch_size` queued orders (waiting at most `max_wait` seconds
+for the batch to fill) and places them in one transaction:
+
+    SAVEPOINT group_order              -- per order, so one bad order
+    CALL PlaceOrderItems(...)          -- rolls back alone and the rest
+    INSERT INTO order_requests ...     -- of the batch still commits
+    ...
+    COMMIT
+
+so N orders share one flush. Every caller then gets its own Order_ID, or its
+own error. The queue holds at most `queue_size` orders; submit() waits up to
+`queue_timeout` seconds for room and then raises QueueFull, which the views
+answer with 503 + Retry-After.
+
+Idempotency keys: an order submitted with a key is recorded in
+order_requests in the same transaction as the order itself. Submitting the
+key again (a client retrying after a timeout, a double-clicked form) returns
+the original Order_ID instead of placing a second order, and reusing a key
+for a different order raises KeyConflict. Keys still in the queue are shared
+too: a second submit() of the same key waits on the first one. The writer
+deletes keys older than `key_ttl` seconds.
+"""
+import hashlib
+import json
+import queue
+import threading
+import time
+
+from MySQLdb import DataError, IntegrityError, OperationalError
+
+# lock wait timeout, deadlock: the server rolled back the whole transaction
+_RETRYABLE = {1205, 1213}
+_SIGNAL = 1644   # SIGNAL from the procedure (unknown menu item)
+_PRUNE_INTERVAL = 60.0
+
+
+class QueueFull(Exception):
+    """The order queue stayed full for the whole queue timeout."""
+
+
+class KeyConflict(ValueError):
+    """The idempotency key was already used for a different order."""
+
+    def __init__(self):
+        super().__init__('This idempotency key was already used for a different order')
+
+
+def request_hash(order: dict) -> str:
+    """Fingerprint of a validated order, stored with its idempotency key."""
+    return hashlib.sha256(json.dumps(order, sort_keys=True).encode()).hexdigest()
+
+
+def find_keys(cur, keys) -> dict:
+    """key -> (Request_Hash, Order_ID) for those of `keys` already used."""
+    keys = list(keys)
+    if not keys:
+        return {}
+    cur.execute(f"SELECT Idempotency_Key, Request_Hash, Order_ID FROM order_requests "
+                f"WHERE Idempotency_Key IN ({', '.join(['%s'] * len(keys))})", tuple(keys))
+    return {r['Idempotency_Key']: (r['Request_Hash'], r['Order_ID']) for r in cur.fetchall()}
+
+
+def existing_order(cur, key: str, digest: str):
+    """Order_ID already placed under `key`, or None; KeyConflict if it was a different order."""
+    found = find_keys(cur, [key]).get(key)
+    if found is None:
+        return None
+    if found[0] != digest:
+        raise KeyConflict()
+    return found[1]
+
+
+def remember(cur, key: str, digest: str, order_id: int):
+    """Record `key` for a new order; runs in the order's own transaction."""
+    cur.execute("INSERT INTO order_requests (Idempotency_Key, Request_Hash, Order_ID) VALUES (%s, %s, %s)",
+                (key, digest, order_id))
+
+
+class _Pending:
+    """One queued order and, once its batch is done, its Order_ID or error."""
+    __slots__ = ('order', 'key', 'digest', 'done', 'order_id', 'error')
+
+    def __init__(self, order, key, digest):
+        self.order = order
+        self.key = key
+        self.digest = digest
+        self.done = threading.Event()
+        self.order_id = None
+        self.error = None
+
+    def finish(self, order_id=None, error=None):
+        self.order_id = order_id
+        self.error = error
+        self.done.set()
+
+
+class OrderWriter:
+    """
+    Daemon thread placing queued orders in batches, one transaction per batch.
+
+    `place(cur, order)` inserts one validated order and returns its Order_ID
+    (the app passes place_order_items). `on_commit(n)` runs after every batch
+    that placed n > 0 orders (the app uses it to invalidate cached data).
+    """
+
+    def __init__(self, pool, place, batch_size: int = 100, max_wait: float = 0.005,
+                 queue_size: int = 5000, queue_timeout: float = 0.5, key_ttl: int = 86400, on_commit=None):
+        self.pool = pool
+        self.place = place
+        self.batch_size = max(batch_size, 1)
+        self.max_wait = max_wait
+        self.queue_timeout = queue_timeout
+        self.key_ttl = key_ttl
+        self.on_commit = on_commit
+        self._queue = queue.Queue(maxsize=max(queue_size, 1))
+        self._inflight = {}   # idempotency key -> _Pending
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_prune = 0.0
+        self._stats = {'batches': 0, 'orders_placed': 0, 'orders_failed': 0, 'deduplicated': 0,
+                       'rejected_full': 0, 'retries': 0, 'largest_batch': 0, 'last_error': None}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='order-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, order: dict, key=None, timeout: float = 30.0) -> int:
+        """
+        Queue a validated order and wait for its batch; returns the Order_ID.
+
+        Raises QueueFull (no room), TimeoutError (not committed within
+        `timeout`; retrying with the same key is safe), KeyConflict, or the
+        database error that made this order fail.
+        """
+        self.start()
+        digest = request_hash(order)
+        owner = False
+        with self._lock:
+            pending = self._inflight.get(key) if key else None
+            if pending is None:
+                pending, owner = _Pending(order, key, digest), True
+                if key:
+                    self._inflight[key] = pending
+            elif pending.digest != digest:
+                raise KeyConflict()
+            else:
+                self._stats['deduplicated'] += 1
+        if owner:
+            try:
+                self._queue.put(pending, timeout=self.queue_timeout)
+            except queue.Full:
+                with self._lock:
+                    self._stats['rejected_full'] += 1
+                self._resolve(pending, error=QueueFull('Too many orders waiting, try again shortly'))
+        if not pending.done.wait(timeout):
+            raise TimeoutError('The order was not confirmed in time')
+        if pending.error is not None:
+            raise pending.error
+        return pending.order_id
+
+    def _resolve(self, pending, order_id=None, error=None):
+        with self._lock:
+            if pending.key and self._inflight.get(pending.key) is pending:
+                del self._inflight[pending.key]
+        pending.finish(order_id, error)
+
+    def _next_batch(self) -> list:
+        """Block for the first order, then take more until batch_size or max_wait."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _place_batch(self, conn, batch) -> list:
+        """Place the batch in one transaction; returns [(order_id, error)] in batch order."""
+        cur = conn.cursor()
+        try:
+            used = find_keys(cur, [p.key for p in batch if p.key])
+            results = []
+            for pending in batch:
+                if pending.key in used:
+                    digest, order_id = used[pending.key]
+                    results.append((order_id, None) if digest == pending.digest else (None, KeyConflict()))
+                    continue
+                cur.execute("SAVEPOINT group_order")
+                try:
+                    order_id = self.place(cur, pending.order)
+                    if pending.key:
+                        remember(cur, pending.key, pending.digest, order_id)
+                except (IntegrityError, DataError, OperationalError) as e:
+                    # errors about this order only; anything else fails (or retries) the batch
+                    if isinstance(e, OperationalError) and e.args[0] != _SIGNAL:
+                        raise
+                    cur.execute("ROLLBACK TO SAVEPOINT group_order")
+                    results.append((None, e))
+                    continue
+                results.append((order_id, None))
+            conn.commit()
+            return results
+        finally:
+            cur.close()
+
+    def _write(self, batch):
+        placed = failed = 0
+        try:
+            conn = self.pool.acquire()
+            try:
+                try:
+                    results = self._place_batch(conn, batch)
+                except OperationalError as e:
+                    conn.rollback()
+                    if e.args[0] not in _RETRYABLE:
+                        raise
+                    with self._lock:
+                        self._stats['retries'] += 1
+                    results = self._place_batch(conn, batch)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self.pool.release(conn)
+        except Exception as e:
+            results = [(None, e)] * len(batch)
+            with self._lock:
+                self._stats['last_error'] = str(e)
+        for pending, (order_id, error) in zip(batch, results):
+            if error is None:
+                placed += 1
+            else:
+                failed += 1
+            self._resolve(pending, order_id, error)
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['orders_placed'] += placed
+            self._stats['orders_failed'] += failed
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+        if placed and self.on_commit:
+            self.on_commit(placed)
+        self._prune()
+
+    def _prune(self):
+        """
+        Drop expired idempotency keys, at most once a minute and in small batches.
+
+        Runs after the batch is resolved: the orders are committed whatever
+        happens here, so a failure is only recorded.
+        """
+        now = time.monotonic()
+        if now - self._last_prune < _PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        try:
+            conn = self.pool.acquire()
+            try:
+                cur = conn.cursor()
+                try:
+                    cur.execute("DELETE FROM order_requests WHERE Created_At < NOW() - INTERVAL %s SECOND LIMIT 1000",
+                                (self.key_ttl,))
+                    conn.commit()
+                finally:
+                    cur.close()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self.pool.release(conn)
+        except Exception as e:
+            with self._lock:
+                self._stats['last_error'] = str(e)
+
+    def _run(self):
+        while True:
+            self._write(self._next_batch())
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        return stats
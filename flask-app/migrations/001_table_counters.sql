@@ -0,0 +1,98 @@
+-- ============================================================
+-- MIGRATION 001: Trigger-maintained row counters for the dashboard
+-- Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+CREATE TABLE IF NOT EXISTS table_counters (
+    Table_Name VARCHAR(64) PRIMARY KEY,
+    Row_Count BIGINT NOT NULL DEFAULT 0
+);
+
+DROP TRIGGER IF EXISTS after_order_insert;
+DROP TRIGGER IF EXISTS after_delivery_insert;
+DROP TRIGGER IF EXISTS after_order_delete;
+DROP TRIGGER IF EXISTS after_delivery_delete;
+DROP TRIGGER IF EXISTS after_driver_insert;
+DROP TRIGGER IF EXISTS after_driver_delete;
+DROP TRIGGER IF EXISTS after_restaurant_insert;
+DROP TRIGGER IF EXISTS after_restaurant_delete;
+DROP PROCEDURE IF EXISTS RebuildTableCounters;
+
+DELIMITER $$
+
+CREATE TRIGGER after_order_insert
+AFTER INSERT ON orders
+FOR EACH ROW
+BEGIN
+    INSERT INTO customer_current_orders (Customer_ID, Order_ID)
+    VALUES (NEW.Customer_ID, NEW.Order_ID);
+
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'orders';
+END$$
+
+CREATE TRIGGER after_delivery_insert
+AFTER INSERT ON deliveries
+FOR EACH ROW
+BEGIN
+    DELETE FROM customer_current_orders
+    WHERE Order_ID = NEW.Order_ID;
+
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'deliveries';
+END$$
+
+CREATE TRIGGER after_order_delete
+AFTER DELETE ON orders
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'orders';
+END$$
+
+CREATE TRIGGER after_delivery_delete
+AFTER DELETE ON deliveries
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'deliveries';
+END$$
+
+CREATE TRIGGER after_driver_insert
+AFTER INSERT ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'delivery_drivers';
+END$$
+
+CREATE TRIGGER after_driver_delete
+AFTER DELETE ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'delivery_drivers';
+END$$
+
+CREATE TRIGGER after_restaurant_insert
+AFTER INSERT ON restaurants
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'restaurants';
+END$$
+
+CREATE TRIGGER after_restaurant_delete
+AFTER DELETE ON restaurants
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'restaurants';
+END$$
+
+CREATE PROCEDURE RebuildTableCounters()
+BEGIN
+    REPLACE INTO table_counters (Table_Name, Row_Count)
+    SELECT 'orders', COUNT(*) FROM orders
+    UNION ALL SELECT 'deliveries', COUNT(*) FROM deliveries
+    UNION ALL SELECT 'delivery_drivers', COUNT(*) FROM delivery_drivers
+    UNION ALL SELECT 'restaurants', COUNT(*) FROM restaurants;
+END$$
+
+DELIMITER ;
+
+CALL RebuildTableCounters();
@@ -0,0 +1,13 @@
+-- ============================================================
+-- MIGRATION 002: Indexes behind the customer search on /orders
+-- FULLTEXT on names, prefix indexes on names and email
+-- (Phone_No is already covered by its UNIQUE index).
+-- Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+CALL AddIndexIfMissing('customers', 'idx_customers_email', 'INDEX idx_customers_email (Email)');
+CALL AddIndexIfMissing('customers', 'idx_customers_first_name', 'INDEX idx_customers_first_name (First_Name)');
+CALL AddIndexIfMissing('customers', 'idx_customers_last_name', 'INDEX idx_customers_last_name (Last_Name)');
+CALL AddIndexIfMissing('customers', 'ft_customers_name', 'FULLTEXT INDEX ft_customers_name (First_Name, Last_Name)');
@@ -0,0 +1,21 @@
+-- ============================================================
+-- MIGRATION 003: Composite / covering indexes for the hot predicates
+--   orders            (Restaurant_ID, Order_Date, Total_Amount)  join_query filter, restaurant revenue
+--   orders            (Customer_ID, Total_Amount)                customer spending, customer search
+--   orders            (Order_Date)                               ORDER BY o.Order_Date DESC in join_query
+--   order_items       (Order_ID, Menu_Item_ID, Price)            order detail, order total trigger
+--   deliveries        (Order_ID, Driver_ID, Delivery_Fee)        LEFT JOIN deliveries ON Order_ID
+--   deliveries        (Driver_ID, Delivery_Fee)                  driver earnings
+--   customer_current_orders (Order_ID)                           DELETE ... WHERE Order_ID in after_delivery_insert
+-- Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+CALL AddIndexIfMissing('orders', 'idx_orders_restaurant_date', 'INDEX idx_orders_restaurant_date (Restaurant_ID, Order_Date, Total_Amount)');
+CALL AddIndexIfMissing('orders', 'idx_orders_customer', 'INDEX idx_orders_customer (Customer_ID, Total_Amount)');
+CALL AddIndexIfMissing('orders', 'idx_orders_date', 'INDEX idx_orders_date (Order_Date)');
+CALL AddIndexIfMissing('order_items', 'idx_order_items_order', 'INDEX idx_order_items_order (Order_ID, Menu_Item_ID, Price)');
+CALL AddIndexIfMissing('deliveries', 'idx_deliveries_order', 'INDEX idx_deliveries_order (Order_ID, Driver_ID, Delivery_Fee)');
+CALL AddIndexIfMissing('deliveries', 'idx_deliveries_driver', 'INDEX idx_deliveries_driver (Driver_ID, Delivery_Fee)');
+CALL AddIndexIfMissing('customer_current_orders', 'idx_cco_order', 'INDEX idx_cco_order (Order_ID)');
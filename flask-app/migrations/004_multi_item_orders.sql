@@ -0,0 +1,56 @@
+-- ============================================================
+-- MIGRATION 004: Multi-item order placement, incremental order totals
+--   after_order_item_insert now adds NEW.Price instead of re-summing
+--   every line of the order; PlaceOrderItems() takes a JSON item list.
+-- Requires MySQL 8.0.4+ (JSON_TABLE). Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+DROP TRIGGER IF EXISTS after_order_item_insert;
+DROP PROCEDURE IF EXISTS PlaceOrderItems;
+
+DELIMITER $$
+
+CREATE TRIGGER after_order_item_insert
+AFTER INSERT ON order_items
+FOR EACH ROW
+BEGIN
+    UPDATE orders
+    SET Total_Amount = COALESCE(Total_Amount, 0) + NEW.Price
+    WHERE Order_ID = NEW.Order_ID;
+END$$
+
+CREATE PROCEDURE PlaceOrderItems(
+    IN p_customer_id INT,
+    IN p_restaurant_id INT,
+    IN p_order_date DATE,
+    IN p_items JSON
+)
+BEGIN
+    DECLARE v_order_id INT;
+    DECLARE v_matched INT;
+
+    INSERT INTO orders (Customer_ID, Restaurant_ID, Order_Date, Total_Amount)
+    VALUES (p_customer_id, p_restaurant_id, p_order_date, 0.00);
+
+    SET v_order_id = LAST_INSERT_ID();
+
+    -- one multi-row insert; the order_items trigger adds each line to the total
+    INSERT INTO order_items (Order_ID, Menu_Item_ID, Quantity, Price)
+    SELECT v_order_id, m.Menu_Item_ID, j.quantity, m.Price * j.quantity
+    FROM JSON_TABLE(p_items, '$[*]' COLUMNS (
+        menu_item_id INT PATH '$.menu_item_id',
+        quantity INT PATH '$.quantity'
+    )) AS j
+    JOIN menu m ON m.Menu_Item_ID = j.menu_item_id;
+
+    SET v_matched = ROW_COUNT();
+    IF v_matched <> JSON_LENGTH(p_items) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'PlaceOrderItems: unknown menu item in order';
+    END IF;
+
+    SELECT v_order_id AS Order_ID;
+END$$
+
+DELIMITER ;
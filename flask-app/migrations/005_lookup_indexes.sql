@@ -0,0 +1,13 @@
+-- ============================================================
+-- MIGRATION 005: Name indexes for the typeahead lookups (/api/lookup/<kind>)
+--   restaurants       (Name)          restaurant picker, keyset on (Name, Restaurant_ID)
+--   menu              (Name)          menu item picker
+--   delivery_drivers  (First_Name)    driver picker
+-- Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+CALL AddIndexIfMissing('restaurants', 'idx_restaurants_name', 'INDEX idx_restaurants_name (Name)');
+CALL AddIndexIfMissing('menu', 'idx_menu_name', 'INDEX idx_menu_name (Name)');
+CALL AddIndexIfMissing('delivery_drivers', 'idx_drivers_first_name', 'INDEX idx_drivers_first_name (First_Name)');
@@ -0,0 +1,33 @@
+-- ============================================================
+-- MIGRATION 006: Background purge of deleted customers and orders
+--   customers.Deleted_At / orders.Deleted_At   rows hidden until the purge worker removes them
+--   purge_jobs                                 one row per delete request, with progress counters
+--   purge_queue                                the customers / orders each job removes
+-- Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+CALL AddColumnIfMissing('customers', 'Deleted_At', 'DATETIME NULL DEFAULT NULL');
+CALL AddColumnIfMissing('orders', 'Deleted_At', 'DATETIME NULL DEFAULT NULL');
+
+CREATE TABLE IF NOT EXISTS purge_jobs (
+    Job_ID INT AUTO_INCREMENT PRIMARY KEY,
+    Status ENUM('queued', 'running', 'done', 'failed') NOT NULL DEFAULT 'queued',
+    Customers INT NOT NULL DEFAULT 0,
+    Orders_Total INT NOT NULL DEFAULT 0,
+    Orders_Done INT NOT NULL DEFAULT 0,
+    Requested_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    Started_At DATETIME NULL,
+    Finished_At DATETIME NULL,
+    Error TEXT NULL,
+    INDEX idx_purge_jobs_status (Status, Job_ID)
+);
+
+CREATE TABLE IF NOT EXISTS purge_queue (
+    Job_ID INT NOT NULL,
+    Entity ENUM('customer', 'order') NOT NULL,
+    Entity_ID INT NOT NULL,
+    PRIMARY KEY (Job_ID, Entity, Entity_ID),
+    FOREIGN KEY (Job_ID) REFERENCES purge_jobs(Job_ID)
+);
@@ -0,0 +1,278 @@
+-- ============================================================
+-- MIGRATION 007: Trigger-maintained rollups for the aggregate reports
+--   restaurant_rollup   orders / revenue / highest / lowest order per restaurant
+--   customer_rollup     orders / amount spent per customer
+--   driver_rollup       deliveries / earnings per driver (a row for every driver)
+--   daily_rollup        orders, revenue, deliveries and fees per day
+--   orders (Restaurant_ID, Total_Amount)   lets RollupOrder refresh MIN/MAX with index dives
+-- RollupOrder / RollupDelivery apply one row change; RebuildRollups() recomputes
+-- everything and backfills the tables at the end of this script.
+-- Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+CREATE TABLE IF NOT EXISTS restaurant_rollup (
+    Restaurant_ID INT PRIMARY KEY,
+    Order_Count INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    Highest_Order DECIMAL(10,2) NULL,
+    Lowest_Order DECIMAL(10,2) NULL,
+    INDEX idx_restaurant_rollup_revenue (Revenue)
+);
+
+CREATE TABLE IF NOT EXISTS customer_rollup (
+    Customer_ID INT PRIMARY KEY,
+    Order_Count INT NOT NULL DEFAULT 0,
+    Spent DECIMAL(14,2) NOT NULL DEFAULT 0,
+    INDEX idx_customer_rollup_spent (Spent)
+);
+
+CREATE TABLE IF NOT EXISTS driver_rollup (
+    Driver_ID INT PRIMARY KEY,
+    Delivery_Count INT NOT NULL DEFAULT 0,
+    Earnings DECIMAL(14,2) NOT NULL DEFAULT 0,
+    INDEX idx_driver_rollup_earnings (Earnings)
+);
+
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    Day DATE PRIMARY KEY,
+    Order_Count INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    Delivery_Count INT NOT NULL DEFAULT 0,
+    Delivery_Fees DECIMAL(14,2) NOT NULL DEFAULT 0
+);
+
+CALL AddIndexIfMissing('orders', 'idx_orders_restaurant_total', 'INDEX idx_orders_restaurant_total (Restaurant_ID, Total_Amount)');
+
+DROP PROCEDURE IF EXISTS RollupOrder;
+DROP PROCEDURE IF EXISTS RollupDelivery;
+DROP PROCEDURE IF EXISTS RebuildRollups;
+DROP TRIGGER IF EXISTS after_order_insert;
+DROP TRIGGER IF EXISTS after_order_update;
+DROP TRIGGER IF EXISTS after_order_delete;
+DROP TRIGGER IF EXISTS after_delivery_insert;
+DROP TRIGGER IF EXISTS after_delivery_update;
+DROP TRIGGER IF EXISTS after_delivery_delete;
+DROP TRIGGER IF EXISTS after_driver_insert;
+DROP TRIGGER IF EXISTS after_driver_delete;
+DROP FUNCTION IF EXISTS GetRestaurantRevenue;
+DROP FUNCTION IF EXISTS GetDriverEarnings;
+
+DELIMITER $$
+
+-- Apply one order's change to the rollups; p_count is +1 (insert), -1 (delete) or 0 (total changed)
+CREATE PROCEDURE RollupOrder(
+    IN p_restaurant_id INT,
+    IN p_customer_id INT,
+    IN p_order_date DATE,
+    IN p_count INT,
+    IN p_amount DECIMAL(14,2)
+)
+BEGIN
+    SET p_amount = COALESCE(p_amount, 0);
+
+    IF p_restaurant_id IS NOT NULL THEN
+        INSERT INTO restaurant_rollup (Restaurant_ID, Order_Count, Revenue)
+        VALUES (p_restaurant_id, p_count, p_amount)
+        ON DUPLICATE KEY UPDATE Order_Count = Order_Count + p_count, Revenue = Revenue + p_amount;
+
+        -- MIN/MAX can't be kept by deltas; both are single dives into idx_orders_restaurant_total
+        UPDATE restaurant_rollup
+        SET Highest_Order = (SELECT MAX(Total_Amount) FROM orders WHERE Restaurant_ID = p_restaurant_id),
+            Lowest_Order = (SELECT MIN(Total_Amount) FROM orders WHERE Restaurant_ID = p_restaurant_id)
+        WHERE Restaurant_ID = p_restaurant_id;
+    END IF;
+
+    IF p_customer_id IS NOT NULL THEN
+        INSERT INTO customer_rollup (Customer_ID, Order_Count, Spent)
+        VALUES (p_customer_id, p_count, p_amount)
+        ON DUPLICATE KEY UPDATE Order_Count = Order_Count + p_count, Spent = Spent + p_amount;
+    END IF;
+
+    IF p_order_date IS NOT NULL THEN
+        INSERT INTO daily_rollup (Day, Order_Count, Revenue)
+        VALUES (p_order_date, p_count, p_amount)
+        ON DUPLICATE KEY UPDATE Order_Count = Order_Count + p_count, Revenue = Revenue + p_amount;
+    END IF;
+END$$
+
+-- Apply one delivery's change to the rollups; p_count is +1 or -1
+CREATE PROCEDURE RollupDelivery(
+    IN p_driver_id INT,
+    IN p_day DATE,
+    IN p_count INT,
+    IN p_fee DECIMAL(14,2)
+)
+BEGIN
+    SET p_fee = COALESCE(p_fee, 0);
+
+    IF p_driver_id IS NOT NULL THEN
+        INSERT INTO driver_rollup (Driver_ID, Delivery_Count, Earnings)
+        VALUES (p_driver_id, p_count, p_fee)
+        ON DUPLICATE KEY UPDATE Delivery_Count = Delivery_Count + p_count, Earnings = Earnings + p_fee;
+    END IF;
+
+    IF p_day IS NOT NULL THEN
+        INSERT INTO daily_rollup (Day, Delivery_Count, Delivery_Fees)
+        VALUES (p_day, p_count, p_fee)
+        ON DUPLICATE KEY UPDATE Delivery_Count = Delivery_Count + p_count, Delivery_Fees = Delivery_Fees + p_fee;
+    END IF;
+END$$
+
+-- Recompute every rollup from the base tables
+CREATE PROCEDURE RebuildRollups()
+BEGIN
+    DELETE FROM restaurant_rollup;
+    INSERT INTO restaurant_rollup (Restaurant_ID, Order_Count, Revenue, Highest_Order, Lowest_Order)
+    SELECT Restaurant_ID, COUNT(*), COALESCE(SUM(Total_Amount), 0), MAX(Total_Amount), MIN(Total_Amount)
+    FROM orders
+    WHERE Restaurant_ID IS NOT NULL
+    GROUP BY Restaurant_ID;
+
+    DELETE FROM customer_rollup;
+    INSERT INTO customer_rollup (Customer_ID, Order_Count, Spent)
+    SELECT Customer_ID, COUNT(*), COALESCE(SUM(Total_Amount), 0)
+    FROM orders
+    WHERE Customer_ID IS NOT NULL
+    GROUP BY Customer_ID;
+
+    DELETE FROM driver_rollup;
+    INSERT INTO driver_rollup (Driver_ID, Delivery_Count, Earnings)
+    SELECT dr.Driver_ID, COUNT(d.Delivery_ID), COALESCE(SUM(d.Delivery_Fee), 0)
+    FROM delivery_drivers dr
+    LEFT JOIN deliveries d ON d.Driver_ID = dr.Driver_ID
+    GROUP BY dr.Driver_ID;
+
+    DELETE FROM daily_rollup;
+    INSERT INTO daily_rollup (Day, Order_Count, Revenue)
+    SELECT Order_Date, COUNT(*), COALESCE(SUM(Total_Amount), 0)
+    FROM orders
+    WHERE Order_Date IS NOT NULL
+    GROUP BY Order_Date;
+
+    INSERT INTO daily_rollup (Day, Delivery_Count, Delivery_Fees)
+    SELECT s.Day, s.Deliveries, s.Fees
+    FROM (
+        SELECT DATE(Pickup_Time) AS Day, COUNT(*) AS Deliveries, COALESCE(SUM(Delivery_Fee), 0) AS Fees
+        FROM deliveries
+        WHERE Pickup_Time IS NOT NULL
+        GROUP BY DATE(Pickup_Time)
+    ) AS s
+    ON DUPLICATE KEY UPDATE Delivery_Count = s.Deliveries, Delivery_Fees = s.Fees;
+END$$
+
+CREATE TRIGGER after_order_insert
+AFTER INSERT ON orders
+FOR EACH ROW
+BEGIN
+    INSERT INTO customer_current_orders (Customer_ID, Order_ID)
+    VALUES (NEW.Customer_ID, NEW.Order_ID);
+
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'orders';
+
+    CALL RollupOrder(NEW.Restaurant_ID, NEW.Customer_ID, NEW.Order_Date, 1, NEW.Total_Amount);
+END$$
+
+CREATE TRIGGER after_order_update
+AFTER UPDATE ON orders
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Restaurant_ID <=> OLD.Restaurant_ID) OR NOT (NEW.Customer_ID <=> OLD.Customer_ID)
+       OR NOT (NEW.Order_Date <=> OLD.Order_Date) THEN
+        CALL RollupOrder(OLD.Restaurant_ID, OLD.Customer_ID, OLD.Order_Date, -1, -OLD.Total_Amount);
+        CALL RollupOrder(NEW.Restaurant_ID, NEW.Customer_ID, NEW.Order_Date, 1, NEW.Total_Amount);
+    ELSEIF NOT (NEW.Total_Amount <=> OLD.Total_Amount) THEN
+        -- the usual case: the order_items trigger adding a line to the total
+        CALL RollupOrder(NEW.Restaurant_ID, NEW.Customer_ID, NEW.Order_Date, 0,
+                         COALESCE(NEW.Total_Amount, 0) - COALESCE(OLD.Total_Amount, 0));
+    END IF;
+END$$
+
+CREATE TRIGGER after_order_delete
+AFTER DELETE ON orders
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'orders';
+
+    CALL RollupOrder(OLD.Restaurant_ID, OLD.Customer_ID, OLD.Order_Date, -1, -OLD.Total_Amount);
+END$$
+
+CREATE TRIGGER after_delivery_insert
+AFTER INSERT ON deliveries
+FOR EACH ROW
+BEGIN
+    DELETE FROM customer_current_orders
+    WHERE Order_ID = NEW.Order_ID;
+
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'deliveries';
+
+    CALL RollupDelivery(NEW.Driver_ID, DATE(NEW.Pickup_Time), 1, NEW.Delivery_Fee);
+END$$
+
+CREATE TRIGGER after_delivery_update
+AFTER UPDATE ON deliveries
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Driver_ID <=> OLD.Driver_ID) OR NOT (DATE(NEW.Pickup_Time) <=> DATE(OLD.Pickup_Time))
+       OR NOT (NEW.Delivery_Fee <=> OLD.Delivery_Fee) THEN
+        CALL RollupDelivery(OLD.Driver_ID, DATE(OLD.Pickup_Time), -1, -OLD.Delivery_Fee);
+        CALL RollupDelivery(NEW.Driver_ID, DATE(NEW.Pickup_Time), 1, NEW.Delivery_Fee);
+    END IF;
+END$$
+
+CREATE TRIGGER after_delivery_delete
+AFTER DELETE ON deliveries
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'deliveries';
+
+    CALL RollupDelivery(OLD.Driver_ID, DATE(OLD.Pickup_Time), -1, -OLD.Delivery_Fee);
+END$$
+
+CREATE TRIGGER after_driver_insert
+AFTER INSERT ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'delivery_drivers';
+
+    -- the earnings report lists drivers with no deliveries too
+    INSERT IGNORE INTO driver_rollup (Driver_ID) VALUES (NEW.Driver_ID);
+END$$
+
+CREATE TRIGGER after_driver_delete
+AFTER DELETE ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'delivery_drivers';
+
+    DELETE FROM driver_rollup WHERE Driver_ID = OLD.Driver_ID;
+END$$
+
+CREATE FUNCTION GetRestaurantRevenue(p_restaurant_id INT)
+RETURNS DECIMAL(10,2)
+DETERMINISTIC
+BEGIN
+    DECLARE total DECIMAL(10,2);
+    SELECT COALESCE(SUM(Revenue), 0)
+    INTO total
+    FROM restaurant_rollup
+    WHERE Restaurant_ID = p_restaurant_id;
+    RETURN total;
+END$$
+
+CREATE FUNCTION GetDriverEarnings(p_driver_id INT)
+RETURNS DECIMAL(10,2)
+DETERMINISTIC
+BEGIN
+    DECLARE total DECIMAL(10,2);
+    SELECT COALESCE(SUM(Earnings), 0)
+    INTO total
+    FROM driver_rollup
+    WHERE Driver_ID = p_driver_id;
+    RETURN total;
+END$$
+
+DELIMITER ;
+
+CALL RebuildRollups();
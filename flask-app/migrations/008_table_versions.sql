@@ -0,0 +1,251 @@
+-- ============================================================
+-- MIGRATION 008: Per-table version stamps for conditional GETs
+--   table_versions   one row per table, bumped by a trigger on every insert,
+--                    update and delete; the app hashes the versions a page
+--                    reads from into its ETag and answers If-None-Match with 304
+-- Every trigger is recreated: the existing ones gain the bump, and customers,
+-- menu, order_items (update / delete), restaurants (update) and
+-- delivery_drivers (update) get new ones.
+-- Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    Table_Name VARCHAR(64) PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 0
+);
+
+-- versions start from the clock, so a rebuilt database never hands out an old ETag again
+INSERT IGNORE INTO table_versions (Table_Name, Version)
+VALUES ('customers', UNIX_TIMESTAMP()), ('restaurants', UNIX_TIMESTAMP()), ('menu', UNIX_TIMESTAMP()),
+       ('orders', UNIX_TIMESTAMP()), ('order_items', UNIX_TIMESTAMP()), ('deliveries', UNIX_TIMESTAMP()),
+       ('delivery_drivers', UNIX_TIMESTAMP());
+
+DROP TRIGGER IF EXISTS after_order_insert;
+DROP TRIGGER IF EXISTS after_order_update;
+DROP TRIGGER IF EXISTS after_order_delete;
+DROP TRIGGER IF EXISTS after_order_item_insert;
+DROP TRIGGER IF EXISTS after_order_item_update;
+DROP TRIGGER IF EXISTS after_order_item_delete;
+DROP TRIGGER IF EXISTS after_delivery_insert;
+DROP TRIGGER IF EXISTS after_delivery_update;
+DROP TRIGGER IF EXISTS after_delivery_delete;
+DROP TRIGGER IF EXISTS after_driver_insert;
+DROP TRIGGER IF EXISTS after_driver_update;
+DROP TRIGGER IF EXISTS after_driver_delete;
+DROP TRIGGER IF EXISTS after_restaurant_insert;
+DROP TRIGGER IF EXISTS after_restaurant_update;
+DROP TRIGGER IF EXISTS after_restaurant_delete;
+DROP TRIGGER IF EXISTS after_customer_insert;
+DROP TRIGGER IF EXISTS after_customer_update;
+DROP TRIGGER IF EXISTS after_customer_delete;
+DROP TRIGGER IF EXISTS after_menu_insert;
+DROP TRIGGER IF EXISTS after_menu_update;
+DROP TRIGGER IF EXISTS after_menu_delete;
+
+DELIMITER $$
+
+CREATE TRIGGER after_order_insert
+AFTER INSERT ON orders
+FOR EACH ROW
+BEGIN
+    INSERT INTO customer_current_orders (Customer_ID, Order_ID)
+    VALUES (NEW.Customer_ID, NEW.Order_ID);
+
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'orders';
+
+    CALL RollupOrder(NEW.Restaurant_ID, NEW.Customer_ID, NEW.Order_Date, 1, NEW.Total_Amount);
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'orders';
+END$$
+
+CREATE TRIGGER after_order_update
+AFTER UPDATE ON orders
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Restaurant_ID <=> OLD.Restaurant_ID) OR NOT (NEW.Customer_ID <=> OLD.Customer_ID)
+       OR NOT (NEW.Order_Date <=> OLD.Order_Date) THEN
+        CALL RollupOrder(OLD.Restaurant_ID, OLD.Customer_ID, OLD.Order_Date, -1, -OLD.Total_Amount);
+        CALL RollupOrder(NEW.Restaurant_ID, NEW.Customer_ID, NEW.Order_Date, 1, NEW.Total_Amount);
+    ELSEIF NOT (NEW.Total_Amount <=> OLD.Total_Amount) THEN
+        -- the usual case: the order_items trigger adding a line to the total
+        CALL RollupOrder(NEW.Restaurant_ID, NEW.Customer_ID, NEW.Order_Date, 0,
+                         COALESCE(NEW.Total_Amount, 0) - COALESCE(OLD.Total_Amount, 0));
+    END IF;
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'orders';
+END$$
+
+CREATE TRIGGER after_order_delete
+AFTER DELETE ON orders
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'orders';
+
+    CALL RollupOrder(OLD.Restaurant_ID, OLD.Customer_ID, OLD.Order_Date, -1, -OLD.Total_Amount);
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'orders';
+END$$
+
+CREATE TRIGGER after_order_item_insert
+AFTER INSERT ON order_items
+FOR EACH ROW
+BEGIN
+    UPDATE orders
+    SET Total_Amount = COALESCE(Total_Amount, 0) + NEW.Price
+    WHERE Order_ID = NEW.Order_ID;
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'order_items';
+END$$
+
+CREATE TRIGGER after_order_item_update
+AFTER UPDATE ON order_items
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'order_items';
+END$$
+
+CREATE TRIGGER after_order_item_delete
+AFTER DELETE ON order_items
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'order_items';
+END$$
+
+CREATE TRIGGER after_delivery_insert
+AFTER INSERT ON deliveries
+FOR EACH ROW
+BEGIN
+    DELETE FROM customer_current_orders
+    WHERE Order_ID = NEW.Order_ID;
+
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'deliveries';
+
+    CALL RollupDelivery(NEW.Driver_ID, DATE(NEW.Pickup_Time), 1, NEW.Delivery_Fee);
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'deliveries';
+END$$
+
+CREATE TRIGGER after_delivery_update
+AFTER UPDATE ON deliveries
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Driver_ID <=> OLD.Driver_ID) OR NOT (DATE(NEW.Pickup_Time) <=> DATE(OLD.Pickup_Time))
+       OR NOT (NEW.Delivery_Fee <=> OLD.Delivery_Fee) THEN
+        CALL RollupDelivery(OLD.Driver_ID, DATE(OLD.Pickup_Time), -1, -OLD.Delivery_Fee);
+        CALL RollupDelivery(NEW.Driver_ID, DATE(NEW.Pickup_Time), 1, NEW.Delivery_Fee);
+    END IF;
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'deliveries';
+END$$
+
+CREATE TRIGGER after_delivery_delete
+AFTER DELETE ON deliveries
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'deliveries';
+
+    CALL RollupDelivery(OLD.Driver_ID, DATE(OLD.Pickup_Time), -1, -OLD.Delivery_Fee);
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'deliveries';
+END$$
+
+CREATE TRIGGER after_driver_insert
+AFTER INSERT ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'delivery_drivers';
+
+    -- the earnings report lists drivers with no deliveries too
+    INSERT IGNORE INTO driver_rollup (Driver_ID) VALUES (NEW.Driver_ID);
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'delivery_drivers';
+END$$
+
+CREATE TRIGGER after_driver_update
+AFTER UPDATE ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'delivery_drivers';
+END$$
+
+CREATE TRIGGER after_driver_delete
+AFTER DELETE ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'delivery_drivers';
+
+    DELETE FROM driver_rollup WHERE Driver_ID = OLD.Driver_ID;
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'delivery_drivers';
+END$$
+
+CREATE TRIGGER after_restaurant_insert
+AFTER INSERT ON restaurants
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count + 1 WHERE Table_Name = 'restaurants';
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'restaurants';
+END$$
+
+CREATE TRIGGER after_restaurant_update
+AFTER UPDATE ON restaurants
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'restaurants';
+END$$
+
+CREATE TRIGGER after_restaurant_delete
+AFTER DELETE ON restaurants
+FOR EACH ROW
+BEGIN
+    UPDATE table_counters SET Row_Count = Row_Count - 1 WHERE Table_Name = 'restaurants';
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'restaurants';
+END$$
+
+CREATE TRIGGER after_customer_insert
+AFTER INSERT ON customers
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'customers';
+END$$
+
+CREATE TRIGGER after_customer_update
+AFTER UPDATE ON customers
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'customers';
+END$$
+
+CREATE TRIGGER after_customer_delete
+AFTER DELETE ON customers
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'customers';
+END$$
+
+CREATE TRIGGER after_menu_insert
+AFTER INSERT ON menu
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'menu';
+END$$
+
+CREATE TRIGGER after_menu_update
+AFTER UPDATE ON menu
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'menu';
+END$$
+
+CREATE TRIGGER after_menu_delete
+AFTER DELETE ON menu
+FOR EACH ROW
+BEGIN
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'menu';
+END$$
+
+DELIMITER ;
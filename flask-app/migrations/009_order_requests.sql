@@ -0,0 +1,18 @@
+-- ============================================================
+-- MIGRATION 009: Idempotency keys for order placement
+--   order_requests   one row per order placed with an Idempotency-Key; a
+--                    retry with the same key returns the recorded Order_ID
+--                    instead of placing the order again. The group-commit
+--                    writer prunes rows older than ORDER_KEY_TTL.
+-- Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+CREATE TABLE IF NOT EXISTS order_requests (
+    Idempotency_Key VARCHAR(64) PRIMARY KEY,
+    Request_Hash CHAR(64) NOT NULL,
+    Order_ID INT NOT NULL,
+    Created_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_order_requests_created (Created_At)
+);
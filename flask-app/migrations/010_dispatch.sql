@@ -0,0 +1,34 @@
+-- ============================================================
+-- MIGRATION 010: Batch auto-dispatch
+--   deliveries (Driver_ID, Pickup_Time)   "is this driver free?" lookups
+--   AssignDeliveries(JSON)                inserts a whole dispatch round in one statement
+-- Requires MySQL 8.0.4+ (JSON_TABLE). Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+DROP PROCEDURE IF EXISTS AssignDeliveries;
+
+DELIMITER $$
+
+CREATE PROCEDURE AssignDeliveries(
+    IN p_deliveries JSON
+)
+BEGIN
+    -- AssignDelivery for a whole dispatch round: one multi-row insert
+    INSERT INTO deliveries (Order_ID, Restaurant_ID, Driver_ID, Pickup_Time, Location, Delivery_Fee)
+    SELECT j.order_id, j.restaurant_id, j.driver_id, NOW(), j.location, j.fee
+    FROM JSON_TABLE(p_deliveries, '$[*]' COLUMNS (
+        order_id INT PATH '$.order_id',
+        restaurant_id INT PATH '$.restaurant_id',
+        driver_id INT PATH '$.driver_id',
+        location VARCHAR(255) PATH '$.location',
+        fee DECIMAL(10,2) PATH '$.fee'
+    )) AS j;
+
+    SELECT ROW_COUNT() AS Assigned;
+END$$
+
+DELIMITER ;
+
+CALL AddIndexIfMissing('deliveries', 'idx_deliveries_driver_pickup', 'INDEX idx_deliveries_driver_pickup (Driver_ID, Pickup_Time)');
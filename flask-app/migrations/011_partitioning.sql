@@ -0,0 +1,668 @@
+-- ============================================================
+-- MIGRATION 011: Monthly partitions for orders, order_items and deliveries,
+--                and the cold-data archive
+--   orders, order_items    RANGE COLUMNS (Order_Date) partitions, one per month
+--   deliveries             RANGE COLUMNS (Pickup_Time) partitions, one per month
+--   order_items.Order_Date copy of the order's date, so order lines prune with their order
+--   *_archive              compressed tables the archive job (`flask --app app archive`)
+--                          moves closed months into
+--   orders_all, deliveries_all   live + archived rows, for the rollup rebuild / check
+--   EnsureMonthPartitions  adds the partitions for the coming months
+-- InnoDB refuses foreign keys on partitioned tables, so the foreign keys of
+-- these three tables are dropped and checked by BEFORE INSERT / UPDATE / DELETE
+-- triggers instead (same errors: 1452 on insert or update, 1451 on delete;
+-- skipped with foreign_key_checks = 0, as the foreign keys were). The checks
+-- are locking reads (FOR SHARE), so a parent delete and a child insert racing
+-- each other wait for one another instead of committing an orphan.
+-- The first run rebuilds the three tables; run it while writes are quiet.
+-- Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+DROP PROCEDURE IF EXISTS DropForeignKeys;
+DROP PROCEDURE IF EXISTS MakeColumnNotNull;
+DROP PROCEDURE IF EXISTS DropIndexIfExists;
+DROP PROCEDURE IF EXISTS ExtendPrimaryKey;
+DROP PROCEDURE IF EXISTS EnsureMonthPartitions;
+
+DELIMITER $$
+
+CREATE PROCEDURE DropForeignKeys(
+    IN p_table VARCHAR(64)
+)
+BEGIN
+    DECLARE v_name VARCHAR(64);
+    DECLARE v_done INT DEFAULT 0;
+    DECLARE c CURSOR FOR
+        SELECT CONSTRAINT_NAME FROM information_schema.referential_constraints
+        WHERE constraint_schema = DATABASE() AND table_name = p_table;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = 1;
+
+    OPEN c;
+    drop_loop: LOOP
+        FETCH c INTO v_name;
+        IF v_done THEN
+            LEAVE drop_loop;
+        END IF;
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' DROP FOREIGN KEY ', v_name);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END LOOP;
+    CLOSE c;
+END$$
+
+CREATE PROCEDURE MakeColumnNotNull(
+    IN p_table VARCHAR(64),
+    IN p_column VARCHAR(64),
+    IN p_type VARCHAR(64)
+)
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = p_table AND column_name = p_column
+          AND is_nullable = 'YES'
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' MODIFY ', p_column, ' ', p_type, ' NOT NULL');
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
+CREATE PROCEDURE DropIndexIfExists(
+    IN p_table VARCHAR(64),
+    IN p_index VARCHAR(64)
+)
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = p_table AND index_name = p_index
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' DROP INDEX ', p_index);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
+-- every unique key of a partitioned table must contain the partitioning column
+CREATE PROCEDURE ExtendPrimaryKey(
+    IN p_table VARCHAR(64),
+    IN p_key VARCHAR(64),
+    IN p_column VARCHAR(64)
+)
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = p_table AND index_name = 'PRIMARY'
+          AND column_name = p_column
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' DROP PRIMARY KEY, ADD PRIMARY KEY (',
+                          p_key, ', ', p_column, ')');
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
+-- Monthly RANGE COLUMNS partitions on p_column up to the month of p_until.
+-- The first call partitions the table: p_old below the oldest row's month,
+-- one pYYYYMM per month from there, and p_future (MAXVALUE). Later calls split
+-- the months still missing out of p_future, which holds no rows normally.
+CREATE PROCEDURE EnsureMonthPartitions(
+    IN p_table VARCHAR(64),
+    IN p_column VARCHAR(64),
+    IN p_until DATE
+)
+BEGIN
+    DECLARE v_partitioned INT;
+    DECLARE v_first DATE;
+    DECLARE v_month DATE;
+    DECLARE v_parts TEXT DEFAULT '';
+
+    SELECT COUNT(*) INTO v_partitioned
+    FROM information_schema.partitions
+    WHERE table_schema = DATABASE() AND table_name = p_table AND partition_name IS NOT NULL;
+
+    IF v_partitioned = 0 THEN
+        SET @oldest = NULL;
+        SET @sql = CONCAT('SELECT MIN(', p_column, ') INTO @oldest FROM ', p_table);
+        PREPARE stmt FROM @sql;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+        SET v_first = DATE_FORMAT(LEAST(DATE(COALESCE(@oldest, CURDATE())), p_until), '%Y-%m-01');
+        SET v_month = v_first;
+    ELSE
+        -- bounds read back as quoted literals: '2026-11-01' or '2026-11-01 00:00:00'
+        SELECT MAX(DATE(TRIM(BOTH '''' FROM partition_description))) INTO v_month
+        FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = p_table AND partition_name <> 'p_future';
+        SET v_month = COALESCE(v_month, DATE_FORMAT(CURDATE(), '%Y-%m-01'));
+    END IF;
+
+    WHILE v_month <= p_until DO
+        SET v_parts = CONCAT(v_parts, 'PARTITION p', DATE_FORMAT(v_month, '%Y%m'),
+                             ' VALUES LESS THAN (''', v_month + INTERVAL 1 MONTH, '''), ');
+        SET v_month = v_month + INTERVAL 1 MONTH;
+    END WHILE;
+
+    SET @ddl = NULL;
+    IF v_partitioned = 0 THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' PARTITION BY RANGE COLUMNS (', p_column, ') (',
+                          'PARTITION p_old VALUES LESS THAN (''', v_first, '''), ', v_parts,
+                          'PARTITION p_future VALUES LESS THAN (MAXVALUE))');
+    ELSEIF v_parts <> '' THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' REORGANIZE PARTITION p_future INTO (', v_parts,
+                          'PARTITION p_future VALUES LESS THAN (MAXVALUE))');
+    END IF;
+
+    IF @ddl IS NOT NULL THEN
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
+DELIMITER ;
+
+-- 1. foreign keys out (InnoDB partitioning does not support them); triggers below take over
+CALL DropForeignKeys('order_items');
+CALL DropForeignKeys('deliveries');
+CALL DropForeignKeys('orders');
+
+-- 2. the partitioning columns become NOT NULL
+UPDATE orders o
+SET o.Order_Date = COALESCE((SELECT DATE(MIN(d.Pickup_Time)) FROM deliveries d WHERE d.Order_ID = o.Order_ID),
+                            CURDATE())
+WHERE o.Order_Date IS NULL;
+
+UPDATE deliveries d
+LEFT JOIN orders o ON o.Order_ID = d.Order_ID
+SET d.Pickup_Time = COALESCE(o.Order_Date, NOW())
+WHERE d.Pickup_Time IS NULL;
+
+CALL MakeColumnNotNull('orders', 'Order_Date', 'DATE');
+CALL MakeColumnNotNull('deliveries', 'Pickup_Time', 'DATETIME');
+
+CALL AddColumnIfMissing('order_items', 'Order_Date', 'DATE NULL');
+
+UPDATE order_items oi
+JOIN orders o ON o.Order_ID = oi.Order_ID
+SET oi.Order_Date = o.Order_Date
+WHERE oi.Order_Date IS NULL;
+
+CALL MakeColumnNotNull('order_items', 'Order_Date', 'DATE');
+
+-- 3. indexes the foreign keys used to provide, under their own names
+CALL AddIndexIfMissing('order_items', 'idx_order_items_menu', 'INDEX idx_order_items_menu (Menu_Item_ID)');
+CALL AddIndexIfMissing('deliveries', 'idx_deliveries_restaurant', 'INDEX idx_deliveries_restaurant (Restaurant_ID)');
+CALL DropIndexIfExists('order_items', 'Menu_Item_ID');
+CALL DropIndexIfExists('deliveries', 'Restaurant_ID');
+
+-- 4. primary keys take in the partitioning column, then the partitions
+CALL ExtendPrimaryKey('orders', 'Order_ID', 'Order_Date');
+CALL ExtendPrimaryKey('order_items', 'Order_Item_ID', 'Order_Date');
+CALL ExtendPrimaryKey('deliveries', 'Delivery_ID', 'Pickup_Time');
+
+CALL EnsureMonthPartitions('orders', 'Order_Date', CURDATE() + INTERVAL 3 MONTH);
+CALL EnsureMonthPartitions('order_items', 'Order_Date', CURDATE() + INTERVAL 3 MONTH);
+CALL EnsureMonthPartitions('deliveries', 'Pickup_Time', CURDATE() + INTERVAL 3 MONTH);
+
+DROP PROCEDURE DropForeignKeys;
+DROP PROCEDURE MakeColumnNotNull;
+DROP PROCEDURE DropIndexIfExists;
+DROP PROCEDURE ExtendPrimaryKey;
+
+-- 5. archive tables and the live + archive views
+CREATE TABLE IF NOT EXISTS orders_archive (
+    Order_ID INT PRIMARY KEY,
+    Customer_ID INT,
+    Restaurant_ID INT,
+    Order_Date DATE NOT NULL,
+    Total_Amount DECIMAL(10,2),
+    Deleted_At DATETIME NULL DEFAULT NULL,
+    INDEX idx_orders_archive_customer (Customer_ID),
+    INDEX idx_orders_archive_restaurant_total (Restaurant_ID, Total_Amount),
+    INDEX idx_orders_archive_date (Order_Date)
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE IF NOT EXISTS order_items_archive (
+    Order_Item_ID INT PRIMARY KEY,
+    Order_ID INT,
+    Menu_Item_ID INT,
+    Quantity INT,
+    Price DECIMAL(10,2),
+    Order_Date DATE NOT NULL,
+    INDEX idx_order_items_archive_order (Order_ID),
+    INDEX idx_order_items_archive_menu (Menu_Item_ID)
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE IF NOT EXISTS deliveries_archive (
+    Delivery_ID INT PRIMARY KEY,
+    Order_ID INT,
+    Restaurant_ID INT,
+    Driver_ID INT,
+    Pickup_Time DATETIME NOT NULL,
+    Location VARCHAR(255),
+    Delivery_Fee DECIMAL(10,2),
+    INDEX idx_deliveries_archive_order (Order_ID),
+    INDEX idx_deliveries_archive_restaurant (Restaurant_ID),
+    INDEX idx_deliveries_archive_driver (Driver_ID)
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE OR REPLACE VIEW orders_all AS
+SELECT Order_ID, Customer_ID, Restaurant_ID, Order_Date, Total_Amount, Deleted_At FROM orders
+UNION ALL
+SELECT Order_ID, Customer_ID, Restaurant_ID, Order_Date, Total_Amount, Deleted_At FROM orders_archive;
+
+CREATE OR REPLACE VIEW deliveries_all AS
+SELECT Delivery_ID, Order_ID, Restaurant_ID, Driver_ID, Pickup_Time, Location, Delivery_Fee FROM deliveries
+UNION ALL
+SELECT Delivery_ID, Order_ID, Restaurant_ID, Driver_ID, Pickup_Time, Location, Delivery_Fee FROM deliveries_archive;
+
+-- 6. procedures and triggers
+DROP PROCEDURE IF EXISTS PlaceOrder;
+DROP PROCEDURE IF EXISTS PlaceOrderItems;
+DROP PROCEDURE IF EXISTS RollupOrder;
+DROP PROCEDURE IF EXISTS RebuildRollups;
+DROP TRIGGER IF EXISTS after_order_item_insert;
+DROP TRIGGER IF EXISTS after_order_update;
+DROP TRIGGER IF EXISTS before_order_insert;
+DROP TRIGGER IF EXISTS before_order_delete;
+DROP TRIGGER IF EXISTS before_order_update;
+DROP TRIGGER IF EXISTS before_order_item_insert;
+DROP TRIGGER IF EXISTS before_order_item_update;
+DROP TRIGGER IF EXISTS before_delivery_insert;
+DROP TRIGGER IF EXISTS before_delivery_update;
+DROP TRIGGER IF EXISTS before_customer_delete;
+DROP TRIGGER IF EXISTS before_restaurant_delete;
+DROP TRIGGER IF EXISTS before_menu_delete;
+DROP TRIGGER IF EXISTS before_driver_delete;
+DROP TRIGGER IF EXISTS after_order_archive_delete;
+DROP TRIGGER IF EXISTS after_delivery_archive_delete;
+
+DELIMITER $$
+
+CREATE PROCEDURE PlaceOrder(
+    IN p_customer_id INT,
+    IN p_restaurant_id INT,
+    IN p_order_date DATE,
+    IN p_menu_item_id INT,
+    IN p_quantity INT
+)
+BEGIN
+    DECLARE v_order_id INT;
+    DECLARE v_price DECIMAL(10,2);
+
+    SELECT Price INTO v_price
+    FROM menu
+    WHERE Menu_Item_ID = p_menu_item_id;
+
+    INSERT INTO orders (Customer_ID, Restaurant_ID, Order_Date, Total_Amount)
+    VALUES (p_customer_id, p_restaurant_id, p_order_date, 0.00);
+
+    SET v_order_id = LAST_INSERT_ID();
+
+    INSERT INTO order_items (Order_ID, Menu_Item_ID, Quantity, Price, Order_Date)
+    VALUES (v_order_id, p_menu_item_id, p_quantity, v_price * p_quantity, p_order_date);
+END$$
+
+CREATE PROCEDURE PlaceOrderItems(
+    IN p_customer_id INT,
+    IN p_restaurant_id INT,
+    IN p_order_date DATE,
+    IN p_items JSON
+)
+BEGIN
+    DECLARE v_order_id INT;
+    DECLARE v_matched INT;
+
+    INSERT INTO orders (Customer_ID, Restaurant_ID, Order_Date, Total_Amount)
+    VALUES (p_customer_id, p_restaurant_id, p_order_date, 0.00);
+
+    SET v_order_id = LAST_INSERT_ID();
+
+    -- one multi-row insert; the order_items trigger adds each line to the total
+    INSERT INTO order_items (Order_ID, Menu_Item_ID, Quantity, Price, Order_Date)
+    SELECT v_order_id, m.Menu_Item_ID, j.quantity, m.Price * j.quantity, p_order_date
+    FROM JSON_TABLE(p_items, '$[*]' COLUMNS (
+        menu_item_id INT PATH '$.menu_item_id',
+        quantity INT PATH '$.quantity'
+    )) AS j
+    JOIN menu m ON m.Menu_Item_ID = j.menu_item_id;
+
+    SET v_matched = ROW_COUNT();
+    IF v_matched <> JSON_LENGTH(p_items) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'PlaceOrderItems: unknown menu item in order';
+    END IF;
+
+    SELECT v_order_id AS Order_ID;
+END$$
+
+CREATE PROCEDURE RollupOrder(
+    IN p_restaurant_id INT,
+    IN p_customer_id INT,
+    IN p_order_date DATE,
+    IN p_count INT,
+    IN p_amount DECIMAL(14,2)
+)
+BEGIN
+    SET p_amount = COALESCE(p_amount, 0);
+
+    IF p_restaurant_id IS NOT NULL THEN
+        INSERT INTO restaurant_rollup (Restaurant_ID, Order_Count, Revenue)
+        VALUES (p_restaurant_id, p_count, p_amount)
+        ON DUPLICATE KEY UPDATE Order_Count = Order_Count + p_count, Revenue = Revenue + p_amount;
+
+        -- MIN/MAX can't be kept by deltas; one index dive per partition and one into the archive
+        UPDATE restaurant_rollup
+        SET Highest_Order = (SELECT MAX(m.Amount) FROM (
+                SELECT MAX(Total_Amount) AS Amount FROM orders WHERE Restaurant_ID = p_restaurant_id
+                UNION ALL
+                SELECT MAX(Total_Amount) FROM orders_archive WHERE Restaurant_ID = p_restaurant_id) AS m),
+            Lowest_Order = (SELECT MIN(m.Amount) FROM (
+                SELECT MIN(Total_Amount) AS Amount FROM orders WHERE Restaurant_ID = p_restaurant_id
+                UNION ALL
+                SELECT MIN(Total_Amount) FROM orders_archive WHERE Restaurant_ID = p_restaurant_id) AS m)
+        WHERE Restaurant_ID = p_restaurant_id;
+    END IF;
+
+    IF p_customer_id IS NOT NULL THEN
+        INSERT INTO customer_rollup (Customer_ID, Order_Count, Spent)
+        VALUES (p_customer_id, p_count, p_amount)
+        ON DUPLICATE KEY UPDATE Order_Count = Order_Count + p_count, Spent = Spent + p_amount;
+    END IF;
+
+    IF p_order_date IS NOT NULL THEN
+        INSERT INTO daily_rollup (Day, Order_Count, Revenue)
+        VALUES (p_order_date, p_count, p_amount)
+        ON DUPLICATE KEY UPDATE Order_Count = Order_Count + p_count, Revenue = Revenue + p_amount;
+    END IF;
+END$$
+
+-- archived rows still count in the rollups, so the rebuild reads live + archive
+CREATE PROCEDURE RebuildRollups()
+BEGIN
+    DELETE FROM restaurant_rollup;
+    INSERT INTO restaurant_rollup (Restaurant_ID, Order_Count, Revenue, Highest_Order, Lowest_Order)
+    SELECT Restaurant_ID, COUNT(*), COALESCE(SUM(Total_Amount), 0), MAX(Total_Amount), MIN(Total_Amount)
+    FROM orders_all
+    WHERE Restaurant_ID IS NOT NULL
+    GROUP BY Restaurant_ID;
+
+    DELETE FROM customer_rollup;
+    INSERT INTO customer_rollup (Customer_ID, Order_Count, Spent)
+    SELECT Customer_ID, COUNT(*), COALESCE(SUM(Total_Amount), 0)
+    FROM orders_all
+    WHERE Customer_ID IS NOT NULL
+    GROUP BY Customer_ID;
+
+    DELETE FROM driver_rollup;
+    INSERT INTO driver_rollup (Driver_ID, Delivery_Count, Earnings)
+    SELECT dr.Driver_ID, COUNT(d.Delivery_ID), COALESCE(SUM(d.Delivery_Fee), 0)
+    FROM delivery_drivers dr
+    LEFT JOIN deliveries_all d ON d.Driver_ID = dr.Driver_ID
+    GROUP BY dr.Driver_ID;
+
+    DELETE FROM daily_rollup;
+    INSERT INTO daily_rollup (Day, Order_Count, Revenue)
+    SELECT Order_Date, COUNT(*), COALESCE(SUM(Total_Amount), 0)
+    FROM orders_all
+    GROUP BY Order_Date;
+
+    INSERT INTO daily_rollup (Day, Delivery_Count, Delivery_Fees)
+    SELECT s.Day, s.Deliveries, s.Fees
+    FROM (
+        SELECT DATE(Pickup_Time) AS Day, COUNT(*) AS Deliveries, COALESCE(SUM(Delivery_Fee), 0) AS Fees
+        FROM deliveries_all
+        GROUP BY DATE(Pickup_Time)
+    ) AS s
+    ON DUPLICATE KEY UPDATE Delivery_Count = s.Deliveries, Delivery_Fees = s.Fees;
+END$$
+
+-- the partition key makes this a single-partition update
+CREATE TRIGGER after_order_item_insert
+AFTER INSERT ON order_items
+FOR EACH ROW
+BEGIN
+    UPDATE orders
+    SET Total_Amount = COALESCE(Total_Amount, 0) + NEW.Price
+    WHERE Order_ID = NEW.Order_ID AND Order_Date = NEW.Order_Date;
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'order_items';
+END$$
+
+CREATE TRIGGER after_order_update
+AFTER UPDATE ON orders
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Restaurant_ID <=> OLD.Restaurant_ID) OR NOT (NEW.Customer_ID <=> OLD.Customer_ID)
+       OR NOT (NEW.Order_Date <=> OLD.Order_Date) THEN
+        CALL RollupOrder(OLD.Restaurant_ID, OLD.Customer_ID, OLD.Order_Date, -1, -OLD.Total_Amount);
+        CALL RollupOrder(NEW.Restaurant_ID, NEW.Customer_ID, NEW.Order_Date, 1, NEW.Total_Amount);
+    ELSEIF NOT (NEW.Total_Amount <=> OLD.Total_Amount) THEN
+        -- the usual case: the order_items trigger adding a line to the total
+        CALL RollupOrder(NEW.Restaurant_ID, NEW.Customer_ID, NEW.Order_Date, 0,
+                         COALESCE(NEW.Total_Amount, 0) - COALESCE(OLD.Total_Amount, 0));
+    END IF;
+
+    -- order lines are partitioned by their order's date and move with it
+    IF NOT (NEW.Order_Date <=> OLD.Order_Date) THEN
+        UPDATE order_items SET Order_Date = NEW.Order_Date
+        WHERE Order_ID = NEW.Order_ID AND Order_Date = OLD.Order_Date;
+    END IF;
+
+    UPDATE table_versions SET Version = Version + 1 WHERE Table_Name = 'orders';
+END$$
+
+CREATE TRIGGER before_order_insert
+BEFORE INSERT ON orders
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF NEW.Customer_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM customers WHERE Customer_ID = NEW.Customer_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (orders.Customer_ID)';
+        END IF;
+        IF NEW.Restaurant_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM restaurants WHERE Restaurant_ID = NEW.Restaurant_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (orders.Restaurant_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_order_update
+BEFORE UPDATE ON orders
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF NEW.Customer_ID IS NOT NULL AND NOT (NEW.Customer_ID <=> OLD.Customer_ID)
+           AND NOT EXISTS (SELECT 1 FROM customers WHERE Customer_ID = NEW.Customer_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (orders.Customer_ID)';
+        END IF;
+        IF NEW.Restaurant_ID IS NOT NULL AND NOT (NEW.Restaurant_ID <=> OLD.Restaurant_ID)
+           AND NOT EXISTS (SELECT 1 FROM restaurants WHERE Restaurant_ID = NEW.Restaurant_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (orders.Restaurant_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_order_delete
+BEFORE DELETE ON orders
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF EXISTS (SELECT 1 FROM order_items WHERE Order_ID = OLD.Order_ID AND Order_Date = OLD.Order_Date FOR SHARE)
+           OR EXISTS (SELECT 1 FROM deliveries WHERE Order_ID = OLD.Order_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1451,
+                MESSAGE_TEXT = 'Cannot delete or update a parent row: a foreign key constraint fails (order_items / deliveries.Order_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_order_item_insert
+BEFORE INSERT ON order_items
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF NEW.Order_ID IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM orders WHERE Order_ID = NEW.Order_ID AND Order_Date = NEW.Order_Date FOR SHARE
+        ) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (order_items.Order_ID, Order_Date)';
+        END IF;
+        IF NEW.Menu_Item_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM menu WHERE Menu_Item_ID = NEW.Menu_Item_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (order_items.Menu_Item_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_order_item_update
+BEFORE UPDATE ON order_items
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        -- moving with their order (after_order_update) passes: the order already has the new date
+        IF NEW.Order_ID IS NOT NULL
+           AND NOT (NEW.Order_ID <=> OLD.Order_ID AND NEW.Order_Date <=> OLD.Order_Date)
+           AND NOT EXISTS (
+            SELECT 1 FROM orders WHERE Order_ID = NEW.Order_ID AND Order_Date = NEW.Order_Date FOR SHARE
+        ) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (order_items.Order_ID, Order_Date)';
+        END IF;
+        IF NEW.Menu_Item_ID IS NOT NULL AND NOT (NEW.Menu_Item_ID <=> OLD.Menu_Item_ID)
+           AND NOT EXISTS (SELECT 1 FROM menu WHERE Menu_Item_ID = NEW.Menu_Item_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (order_items.Menu_Item_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_delivery_insert
+BEFORE INSERT ON deliveries
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF NEW.Order_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM orders WHERE Order_ID = NEW.Order_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Order_ID)';
+        END IF;
+        IF NEW.Restaurant_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM restaurants WHERE Restaurant_ID = NEW.Restaurant_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Restaurant_ID)';
+        END IF;
+        IF NEW.Driver_ID IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM delivery_drivers WHERE Driver_ID = NEW.Driver_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Driver_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_delivery_update
+BEFORE UPDATE ON deliveries
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF NEW.Order_ID IS NOT NULL AND NOT (NEW.Order_ID <=> OLD.Order_ID)
+           AND NOT EXISTS (SELECT 1 FROM orders WHERE Order_ID = NEW.Order_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Order_ID)';
+        END IF;
+        IF NEW.Restaurant_ID IS NOT NULL AND NOT (NEW.Restaurant_ID <=> OLD.Restaurant_ID)
+           AND NOT EXISTS (SELECT 1 FROM restaurants WHERE Restaurant_ID = NEW.Restaurant_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Restaurant_ID)';
+        END IF;
+        IF NEW.Driver_ID IS NOT NULL AND NOT (NEW.Driver_ID <=> OLD.Driver_ID)
+           AND NOT EXISTS (SELECT 1 FROM delivery_drivers WHERE Driver_ID = NEW.Driver_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452,
+                MESSAGE_TEXT = 'Cannot add or update a child row: a foreign key constraint fails (deliveries.Driver_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_customer_delete
+BEFORE DELETE ON customers
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF EXISTS (SELECT 1 FROM orders WHERE Customer_ID = OLD.Customer_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM orders_archive WHERE Customer_ID = OLD.Customer_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1451,
+                MESSAGE_TEXT = 'Cannot delete or update a parent row: a foreign key constraint fails (orders.Customer_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_restaurant_delete
+BEFORE DELETE ON restaurants
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF EXISTS (SELECT 1 FROM orders WHERE Restaurant_ID = OLD.Restaurant_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM orders_archive WHERE Restaurant_ID = OLD.Restaurant_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM deliveries WHERE Restaurant_ID = OLD.Restaurant_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM deliveries_archive WHERE Restaurant_ID = OLD.Restaurant_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1451,
+                MESSAGE_TEXT = 'Cannot delete or update a parent row: a foreign key constraint fails (orders / deliveries.Restaurant_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_menu_delete
+BEFORE DELETE ON menu
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF EXISTS (SELECT 1 FROM order_items WHERE Menu_Item_ID = OLD.Menu_Item_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM order_items_archive WHERE Menu_Item_ID = OLD.Menu_Item_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1451,
+                MESSAGE_TEXT = 'Cannot delete or update a parent row: a foreign key constraint fails (order_items.Menu_Item_ID)';
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER before_driver_delete
+BEFORE DELETE ON delivery_drivers
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        IF EXISTS (SELECT 1 FROM deliveries WHERE Driver_ID = OLD.Driver_ID FOR SHARE)
+           OR EXISTS (SELECT 1 FROM deliveries_archive WHERE Driver_ID = OLD.Driver_ID FOR SHARE) THEN
+            SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1451,
+                MESSAGE_TEXT = 'Cannot delete or update a parent row: a foreign key constraint fails (deliveries.Driver_ID)';
+        END IF;
+    END IF;
+END$$
+
+-- archiving moves rows without touching the rollups; purging archived rows takes them out
+CREATE TRIGGER after_order_archive_delete
+AFTER DELETE ON orders_archive
+FOR EACH ROW
+BEGIN
+    CALL RollupOrder(OLD.Restaurant_ID, OLD.Customer_ID, OLD.Order_Date, -1, -OLD.Total_Amount);
+END$$
+
+CREATE TRIGGER after_delivery_archive_delete
+AFTER DELETE ON deliveries_archive
+FOR EACH ROW
+BEGIN
+    CALL RollupDelivery(OLD.Driver_ID, DATE(OLD.Pickup_Time), -1, -OLD.Delivery_Fee);
+END$$
+
+DELIMITER ;
+
+-- order dates filled in above may have moved orders between days
+CALL RebuildRollups();
@@ -0,0 +1,33 @@
+-- ============================================================
+-- MIGRATION 012: Bulk CSV import
+--   import_jobs     one row per uploaded file, with progress counters (Rows_Done is the resume point)
+--   import_errors   rows that were not imported, by line number
+-- Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+CREATE TABLE IF NOT EXISTS import_jobs (
+    Job_ID INT AUTO_INCREMENT PRIMARY KEY,
+    Target ENUM('customers', 'restaurants', 'menu', 'delivery_drivers') NOT NULL,
+    File_Name VARCHAR(255) NOT NULL,
+    File_Path VARCHAR(500) NOT NULL,
+    Status ENUM('queued', 'running', 'done', 'failed') NOT NULL DEFAULT 'queued',
+    Rows_Total INT NOT NULL DEFAULT 0,
+    Rows_Done INT NOT NULL DEFAULT 0,
+    Rows_Imported INT NOT NULL DEFAULT 0,
+    Rows_Failed INT NOT NULL DEFAULT 0,
+    Requested_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    Started_At DATETIME NULL,
+    Finished_At DATETIME NULL,
+    Error TEXT NULL,
+    INDEX idx_import_jobs_status (Status, Job_ID)
+);
+
+CREATE TABLE IF NOT EXISTS import_errors (
+    Job_ID INT NOT NULL,
+    Line_No INT NOT NULL,
+    Error VARCHAR(255) NOT NULL,
+    PRIMARY KEY (Job_ID, Line_No),
+    FOREIGN KEY (Job_ID) REFERENCES import_jobs(Job_ID)
+);
@@ -0,0 +1,20 @@
+-- ============================================================
+-- MIGRATION 013: Roles for the app's database accounts
+--   app_admin      all privileges on the schema
+--   app_manager    SELECT, INSERT, UPDATE on the schema
+--   app_operator   SELECT, INSERT, UPDATE, DELETE on orders, order_items and deliveries
+--   app_viewer     SELECT on the schema
+-- Accounts get one role (GRANT app_<level> TO ...) instead of their own grants.
+-- Needs MySQL 8.0. Safe to re-run.
+-- ============================================================
+
+USE dbms_project;
+
+CREATE ROLE IF NOT EXISTS app_admin, app_manager, app_operator, app_viewer;
+
+GRANT ALL PRIVILEGES ON dbms_project.* TO app_admin;
+GRANT SELECT, INSERT, UPDATE ON dbms_project.* TO app_manager;
+GRANT SELECT, INSERT, UPDATE, DELETE ON dbms_project.orders TO app_operator;
+GRANT SELECT, INSERT, UPDATE, DELETE ON dbms_project.order_items TO app_operator;
+GRANT SELECT, INSERT, UPDATE, DELETE ON dbms_project.deliveries TO app_operator;
+GRANT SELECT ON dbms_project.* TO app_viewer;
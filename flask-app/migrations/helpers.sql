@@ -0,0 +1,48 @@
+-- ============================================================
+-- Helper procedures shared by the migrations.
+-- db_migrate creates these before it runs pending migrations and drops
+-- them afterwards; to run a migration by hand, source this file first.
+--   AddIndexIfMissing(table, index, definition)    ALTER TABLE ... ADD <definition> unless the index exists
+--   AddColumnIfMissing(table, column, definition)  ALTER TABLE ... ADD COLUMN unless the column exists
+-- ============================================================
+
+DROP PROCEDURE IF EXISTS AddIndexIfMissing;
+DROP PROCEDURE IF EXISTS AddColumnIfMissing;
+
+DELIMITER $$
+
+CREATE PROCEDURE AddIndexIfMissing(
+    IN p_table VARCHAR(64),
+    IN p_index VARCHAR(64),
+    IN p_definition VARCHAR(255)
+)
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = p_table AND index_name = p_index
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' ADD ', p_definition);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
+CREATE PROCEDURE AddColumnIfMissing(
+    IN p_table VARCHAR(64),
+    IN p_column VARCHAR(64),
+    IN p_definition VARCHAR(255)
+)
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = p_table AND column_name = p_column
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' ADD COLUMN ', p_column, ' ', p_definition);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
+DELIMITER ;
@@ -0,0 +1,276 @@
+"""
+Background purge of deleted customers and orders.
+
+Deleting a customer used to cascade through all of its orders inside the web
+request, holding locks on orders/deliveries for as long as that took. Now the
+request only stamps Deleted_At (which hides the rows from the app) and queues
+a purge job. PurgeWorker then removes the rows in bounded, set-based batches,
+one short transaction per batch:
+
+    DELETE FROM deliveries              WHERE Order_ID IN (<batch>)
+    DELETE FROM order_items             WHERE Order_ID IN (<batch>)
+    DELETE FROM customer_current_orders WHERE Order_ID IN (<batch>)
+    DELETE FROM orders                  WHERE Order_ID IN (<batch>)
+
+then the same for their rows in the archive tables (archive.py), batch by
+batch as well, and finally the customers themselves.
+Progress is kept on the purge_jobs row
+(Orders_Total / Orders_Done), so it can be polled while the job runs.
+"""
+import threading
+import time
+
+
+def _in(ids) -> str:
+    return ', '.join(['%s'] * len(ids))
+
+
+def enqueue(cur, customer_ids=(), order_ids=()) -> int:
+    """
+    Mark customers/orders deleted and queue a purge job for them; returns the Job_ID.
+
+    Only a handful of single-statement writes run here, so the caller's
+    transaction stays short. The caller commits.
+    """
+    customer_ids = sorted(set(customer_ids))
+    order_ids = sorted(set(order_ids))
+    orders_total = len(order_ids)
+    if customer_ids:
+        cur.execute(f"UPDATE customers SET Deleted_At = NOW() "
+                    f"WHERE Customer_ID IN ({_in(customer_ids)}) AND Deleted_At IS NULL", tuple(customer_ids))
+        cur.execute(f"SELECT COUNT(*) AS n FROM orders WHERE Customer_ID IN ({_in(customer_ids)})",
+                    tuple(customer_ids))
+        orders_total += cur.fetchone()['n']
+    if order_ids:
+        cur.execute(f"UPDATE orders SET Deleted_At = NOW() "
+                    f"WHERE Order_ID IN ({_in(order_ids)}) AND Deleted_At IS NULL", tuple(order_ids))
+
+    cur.execute("INSERT INTO purge_jobs (Status, Customers, Orders_Total) VALUES ('queued', %s, %s)",
+                (len(customer_ids), orders_total))
+    job_id = cur.lastrowid
+    cur.executemany("INSERT INTO purge_queue (Job_ID, Entity, Entity_ID) VALUES (%s, %s, %s)",
+                    [(job_id, 'customer', i) for i in customer_ids] + [(job_id, 'order', i) for i in order_ids])
+    return job_id
+
+
+def job_status(cur, job_id: int):
+    """The purge_jobs row for job_id plus Percent_Done, or None."""
+    cur.execute("SELECT * FROM purge_jobs WHERE Job_ID = %s", (job_id,))
+    job = cur.fetchone()
+    if job is None:
+        return None
+    job = dict(job)
+    total = job['Orders_Total'] or 0
+    job['Percent_Done'] = 100.0 if job['Status'] == 'done' else (
+        round(100.0 * min(job['Orders_Done'], total) / total, 1) if total else 0.0)
+    return job
+
+
+def _queued_ids(cur, job_id: int, entity: str) -> list:
+    cur.execute("SELECT Entity_ID FROM purge_queue WHERE Job_ID = %s AND Entity = %s", (job_id, entity))
+    return [r['Entity_ID'] for r in cur.fetchall()]
+
+
+def purge_batch(cur, job_id: int, customer_ids: list, order_ids: list, batch_size: int) -> int:
+    """Delete up to batch_size orders of the job (and their dependants); returns how many went."""
+    batch = []
+    if customer_ids:
+        # no ORDER BY: any batch will do, and this stays a plain idx_orders_customer range read
+        cur.execute(f"SELECT Order_ID FROM orders WHERE Customer_ID IN ({_in(customer_ids)}) LIMIT %s",
+                    tuple(customer_ids) + (batch_size,))
+        batch = [r['Order_ID'] for r in cur.fetchall()]
+    if order_ids and len(batch) < batch_size:
+        cur.execute(f"SELECT Order_ID FROM orders WHERE Order_ID IN ({_in(order_ids)}) "
+                    f"ORDER BY Order_ID LIMIT %s", tuple(order_ids) + (batch_size - len(batch),))
+        batch += [r['Order_ID'] for r in cur.fetchall() if r['Order_ID'] not in batch]
+    if not batch:
+        return 0
+
+    args = tuple(batch)
+    cur.execute(f"DELETE FROM deliveries WHERE Order_ID IN ({_in(batch)})", args)
+    cur.execute(f"DELETE FROM order_items WHERE Order_ID IN ({_in(batch)})", args)
+    cur.execute(f"DELETE FROM customer_current_orders WHERE Order_ID IN ({_in(batch)})", args)
+    cur.execute(f"DELETE FROM orders WHERE Order_ID IN ({_in(batch)})", args)
+    cur.execute("UPDATE purge_jobs SET Orders_Done = Orders_Done + %s WHERE Job_ID = %s", (len(batch), job_id))
+    return len(batch)
+
+
+def purge_archived_batch(cur, customer_ids: list, order_ids: list, batch_size: int) -> int:
+    """Delete up to batch_size of the job's archived orders (with their lines and deliveries); returns how many went."""
+    batch = []
+    if customer_ids:
+        cur.execute(f"SELECT Order_ID FROM orders_archive WHERE Customer_ID IN ({_in(customer_ids)}) LIMIT %s",
+                    tuple(customer_ids) + (batch_size,))
+        batch = [r['Order_ID'] for r in cur.fetchall()]
+    if order_ids and len(batch) < batch_size:
+        cur.execute(f"SELECT Order_ID FROM orders_archive WHERE Order_ID IN ({_in(order_ids)}) "
+                    f"ORDER BY Order_ID LIMIT %s", tuple(order_ids) + (batch_size - len(batch),))
+        batch += [r['Order_ID'] for r in cur.fetchall() if r['Order_ID'] not in batch]
+    if not batch:
+        return 0
+
+    args = tuple(batch)
+    # the archive delete triggers take these rows out of the rollups
+    cur.execute(f"DELETE FROM deliveries_archive WHERE Order_ID IN ({_in(batch)})", args)
+    cur.execute(f"DELETE FROM order_items_archive WHERE Order_ID IN ({_in(batch)})", args)
+    cur.execute(f"DELETE FROM orders_archive WHERE Order_ID IN ({_in(batch)})", args)
+    return len(batch)
+
+
+def finish_job(cur, job_id: int, customer_ids: list):
+    """Delete the job's customers once their live and archived orders are gone; mark the job done."""
+    if customer_ids:
+        args = tuple(customer_ids)
+        cur.execute(f"DELETE FROM customer_current_orders WHERE Customer_ID IN ({_in(customer_ids)})", args)
+        cur.execute(f"DELETE FROM customers WHERE Customer_ID IN ({_in(customer_ids)})", args)
+    cur.execute("DELETE FROM purge_queue WHERE Job_ID = %s", (job_id,))
+    cur.execute("UPDATE purge_jobs SET Status = 'done', Finished_At = NOW(), Error = NULL "
+                "WHERE Job_ID = %s", (job_id,))
+
+
+def claim_job(conn):
+    """Atomically move the oldest queued job to 'running'; returns its Job_ID or None."""
+    cur = conn.cursor()
+    try:
+        # SKIP LOCKED lets several workers (one per app process) share the queue
+        cur.execute("SELECT Job_ID FROM purge_jobs WHERE Status = 'queued' "
+                    "ORDER BY Job_ID LIMIT 1 FOR UPDATE SKIP LOCKED")
+        row = cur.fetchone()
+        if row is None:
+            conn.rollback()
+            return None
+        cur.execute("UPDATE purge_jobs SET Status = 'running', Started_At = COALESCE(Started_At, NOW()) "
+                    "WHERE Job_ID = %s", (row['Job_ID'],))
+        conn.commit()
+        return row['Job_ID']
+    finally:
+        cur.close()
+
+
+def run_job(conn, job_id: int, batch_size: int = 500, pause: float = 0.0, on_batch=None) -> int:
+    """
+    Purge one claimed job to completion; returns the number of orders removed.
+
+    Every batch commits on its own so locks are held for one batch only;
+    `pause` seconds between batches leaves room for foreground traffic.
+    On error the job is marked 'failed' and the exception re-raised.
+    """
+    cur = conn.cursor()
+    removed = 0
+    try:
+        customer_ids = _queued_ids(cur, job_id, 'customer')
+        order_ids = _queued_ids(cur, job_id, 'order')
+        # live orders first (counted in Orders_Done), then the archived ones, same batch size
+        for step in (lambda: purge_batch(cur, job_id, customer_ids, order_ids, batch_size),
+                     lambda: purge_archived_batch(cur, customer_ids, order_ids, batch_size)):
+            while True:
+                n = step()
+                conn.commit()
+                if not n:
+                    break
+                removed += n
+                if on_batch:
+                    on_batch(n)
+                if pause:
+                    time.sleep(pause)
+        finish_job(cur, job_id, customer_ids)
+        conn.commit()
+        if on_batch:
+            on_batch(0)
+        return removed
+    except Exception as e:
+        conn.rollback()
+        cur.execute("UPDATE purge_jobs SET Status = 'failed', Error = %s WHERE Job_ID = %s",
+                    (str(e)[:1000], job_id))
+        conn.commit()
+        raise
+    finally:
+        cur.close()
+
+
+def requeue(conn, statuses=('failed', 'running')) -> int:
+    """Put failed (and interrupted) jobs back in the queue; returns how many."""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"UPDATE purge_jobs SET Status = 'queued' WHERE Status IN ({_in(statuses)})",
+                    tuple(statuses))
+        conn.commit()
+        return cur.rowcount
+    finally:
+        cur.close()
+
+
+class PurgeWorker:
+    """
+    Daemon thread that drains purge_jobs using connections from a ConnectionPool.
+
+    wake() is called after a job is queued so it starts right away; otherwise
+    the queue is polled every `poll_interval` seconds. `on_batch(n)` runs after
+    every committed batch (the app uses it to invalidate cached reference data).
+    """
+
+    def __init__(self, pool, batch_size: int = 500, pause: float = 0.05,
+                 poll_interval: float = 30.0, on_batch=None):
+        self.pool = pool
+        self.batch_size = max(batch_size, 1)
+        self.pause = pause
+        self.poll_interval = poll_interval
+        self.on_batch = on_batch
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {'jobs_done': 0, 'jobs_failed': 0, 'orders_purged': 0, 'last_error': None}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='purge-worker', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def _count(self, n):
+        with self._lock:
+            self._stats['orders_purged'] += n
+        if self.on_batch:
+            self.on_batch(n)
+
+    def drain(self) -> int:
+        """Run queued jobs until none are left; returns how many ran."""
+        ran = 0
+        conn = self.pool.acquire()
+        try:
+            while True:
+                job_id = claim_job(conn)
+                if job_id is None:
+                    return ran
+                ran += 1
+                try:
+                    run_job(conn, job_id, self.batch_size, self.pause, on_batch=self._count)
+                    with self._lock:
+                        self._stats['jobs_done'] += 1
+                except Exception as e:
+                    with self._lock:
+                        self._stats['jobs_failed'] += 1
+                        self._stats['last_error'] = f'job {job_id}: {e}'
+        finally:
+            self.pool.release(conn)
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                self.drain()
+            except Exception as e:
+                # DB unreachable, pool exhausted...; try again on the next tick
+                with self._lock:
+                    self._stats['last_error'] = str(e)
+            self._wake.wait(self.poll_interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        return stats
@@ -0,0 +1,216 @@
+"""
+EXPLAIN every SQL statement app.py issues and flag full scans and filesorts.
+
+Statements are gathered two ways:
+  * static   - string literals handed to cursor.execute() in app.py (AST scan)
+  * captured - SQL the views build at runtime (keyset pages, search, reports),
+               recorded by calling each route in PROBES with a cursor that
+               returns placeholder rows instead of touching the database
+
+Each distinct statement is then EXPLAINed on the real connection. Run it
+against a database with realistic row counts: on a near-empty table MySQL
+happily picks a full scan even when a usable index exists.
+"""
+import ast
+import re
+
+from flask import request
+
+# (method, path, form data) for every read path we want plans for
+PROBES = [
+    ('GET', '/', None),
+    ('GET', '/orders', None),
+    ('GET', '/orders?after=1000', None),
+    ('GET', '/orders?before=1000', None),
+    ('GET', '/orders?q=42', None),
+    ('GET', '/orders?q=arjun', None),
+    ('GET', '/orders?q=ra', None),
+    ('GET', '/orders?q=98765', None),
+    ('GET', '/orders?q=arjun@', None),
+    ('GET', '/api/search/customers?q=arjun', None),
+    ('GET', '/api/lookup/customers', None),
+    ('GET', '/api/lookup/orders?undelivered=1', None),
+    ('GET', '/api/lookup/orders?undelivered=1&q=arjun', None),
+    ('GET', '/api/lookup/restaurants?q=pi&after=1', None),
+    ('GET', '/api/lookup/drivers?q=ka', None),
+    ('GET', '/api/lookup/menu?restaurant_id=1&q=pa', None),
+    ('GET', '/order/1', None),
+    ('GET', '/view_data', None),
+    ('GET', '/customers', None),
+    ('GET', '/restaurants', None),
+    ('GET', '/drivers', None),
+    ('GET', '/menu', None),
+    ('GET', '/reports?sort=active', None),
+    ('GET', '/reports?sort=name', None),
+    ('GET', '/api/purge/1', None),
+    ('GET', '/place_order', None),
+    ('GET', '/assign_delivery', None),
+    ('GET', '/dispatch', None),
+    ('GET', '/menu/add', None),
+    ('POST', '/query/nested-query', {'min_orders': '1'}),
+    ('POST', '/query/join-query', {'restaurant_id': '1'}),
+    ('POST', '/query/join-query', {'restaurant_id': ''}),
+    ('POST', '/query/aggregate-query', {'query_type': 'all_restaurants'}),
+    ('POST', '/query/aggregate-query', {'query_type': 'driver_earnings'}),
+    ('POST', '/query/aggregate-query', {'query_type': 'customer_spending'}),
+    ('POST', '/query/aggregate-query', {'query_type': 'daily_totals'}),
+]
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+
+
+class _AnyRow(dict):
+    """Placeholder result row: every column reads as 1."""
+
+    def __missing__(self, key):
+        return 1
+
+
+class RecordingCursor:
+    """Cursor stand-in that records statements and returns one placeholder row."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, args=None):
+        self.statements.append((sql, tuple(args) if args else ()))
+
+    def callproc(self, name, args=()):
+        pass
+
+    def fetchone(self):
+        return _AnyRow()
+
+    def fetchall(self):
+        return [_AnyRow()]
+
+    def nextset(self):
+        return None
+
+    def close(self):
+        pass
+
+
+def normalize(sql: str) -> str:
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def _is_explainable(sql: str) -> bool:
+    head = normalize(sql).split(' ', 1)[0].upper()
+    return head in EXPLAINABLE and 'mysql.' not in sql and 'information_schema' not in sql
+
+
+def static_statements(source: str):
+    """String literals passed to .execute(), directly or through a local variable."""
+    found = []
+    tree = ast.parse(source)
+    for func in ast.walk(tree):
+        if not isinstance(func, ast.FunctionDef):
+            continue
+        assigned = {}
+        for node in ast.walk(func):
+            if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name)
+                    and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)):
+                assigned.setdefault(node.targets[0].id, []).append(node.value.value)
+        for node in ast.walk(func):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr == 'execute' and node.args):
+                continue
+            arg = node.args[0]
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                found.append(arg.value)
+            elif isinstance(arg, ast.Name):
+                found.extend(assigned.get(arg.id, []))
+    return found
+
+
+def _fill_placeholders(sql: str) -> str:
+    """Substitute sample values for %s so a static statement can be EXPLAINed."""
+    sql = re.sub(r'(?i)\b(LIMIT|OFFSET)\s+%s', r'\1 1', sql)
+    return sql.replace('%s', "'1'")
+
+
+def captured_statements(app_module):
+    """Run every probe against a RecordingCursor and return what the views executed."""
+    recorder = RecordingCursor()
+    original = app_module.get_cursor
+    app_module.get_cursor = lambda: recorder
+    flask_app = app_module.app
+    # cached reference data would hide its queries, and placeholder rows must not linger
+    app_module.ref_cache.clear()
+    try:
+        for method, path, data in PROBES:
+            with flask_app.test_request_context(path, method=method, data=data):
+                try:
+                    flask_app.view_functions[request.url_rule.endpoint](**request.view_args)
+                except Exception:
+                    # placeholder rows can trip rendering; the SQL is already recorded
+                    pass
+    finally:
+        app_module.get_cursor = original
+        app_module.ref_cache.clear()
+    return recorder.statements
+
+
+def collect_statements(app_module):
+    """Distinct explainable statements as [(sql, args)], captured ones first."""
+    seen = set()
+    statements = []
+    for sql, args in captured_statements(app_module):
+        key = normalize(sql)
+        if _is_explainable(sql) and key not in seen:
+            seen.add(key)
+            statements.append((sql, args))
+    with open(app_module.__file__, encoding='utf-8') as fh:
+        source = fh.read()
+    for sql in static_statements(source):
+        key = normalize(sql)
+        if _is_explainable(sql) and key not in seen:
+            seen.add(key)
+            statements.append((_fill_placeholders(sql), ()))
+    return statements
+
+
+def problems_in_plan(plan):
+    """Return human-readable warnings for one EXPLAIN result."""
+    problems = []
+    for row in plan:
+        table = row.get('table') or ''
+        extra = row.get('Extra') or ''
+        if row.get('type') == 'ALL' and not table.startswith('<'):
+            problems.append(f"full scan on {table} (~{row.get('rows')} rows)")
+        if 'Using filesort' in extra:
+            problems.append(f"filesort on {table}")
+        if 'Using temporary' in extra:
+            problems.append(f"temporary table on {table}")
+    return problems
+
+
+def run_audit(app_module, cur, echo=print, verbose: bool = False) -> int:
+    """EXPLAIN every collected statement; return the number of statements flagged."""
+    flagged = 0
+    statements = collect_statements(app_module)
+    for sql, args in statements:
+        short = normalize(sql)
+        try:
+            cur.execute('EXPLAIN ' + sql, args or None)
+            plan = cur.fetchall()
+        except Exception as e:
+            flagged += 1
+            echo(f"ERROR {short[:120]}\n      {e}")
+            continue
+        problems = problems_in_plan(plan)
+        if problems:
+            flagged += 1
+            echo(f"WARN  {short[:120]}")
+            for p in problems:
+                echo(f"      - {p}")
+        else:
+            echo(f"OK    {short[:120]}")
+        if verbose:
+            for row in plan:
+                echo(f"      {row.get('table')}: type={row.get('type')} key={row.get('key')} "
+                     f"rows={row.get('rows')} extra={row.get('Extra')}")
+    echo(f"\n{len(statements)} statements audited, {flagged} flagged")
+    return flagged
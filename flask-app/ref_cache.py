@@ -0,0 +1,70 @@
+"""
+In-process cache for reference data (customers, restaurants, menu, drivers...).
+
+Every entry records the version of each table it was built from. Writes call
+invalidate(table), which bumps that table's version, so the next get() of any
+dependent entry misses and reloads. Entries are also dropped after `ttl`
+seconds (other worker processes keep their own cache and only see each other's
+writes through that expiry) and the least recently used entry is evicted once
+`max_entries` is reached.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReferenceCache:
+
+    def __init__(self, max_entries: int = 64, ttl: float = 300.0):
+        self.max_entries = max(max_entries, 1)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (versions, loaded_at, value)
+        self._versions = {}             # table -> int
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def _snapshot(self, tables):
+        return tuple(self._versions.get(t, 0) for t in tables)
+
+    def get(self, key, tables, loader, refresh: bool = False):
+        """Return the cached value for key, calling loader() when it is missing or stale."""
+        with self._lock:
+            versions = self._snapshot(tables)
+            entry = self._entries.get(key)
+            if (not refresh and entry is not None and entry[0] == versions
+                    and (not self.ttl or time.monotonic() - entry[1] < self.ttl)):
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[2]
+            self._stats['misses'] += 1
+
+        # load outside the lock; `versions` was taken first, so a write that
+        # lands while we load leaves this entry stale rather than wrong
+        value = loader()
+        with self._lock:
+            self._entries[key] = (versions, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return value
+
+    def invalidate(self, *tables):
+        """Mark every entry built from any of these tables as stale."""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else None
+        return stats
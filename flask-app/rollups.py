@@ -0,0 +1,66 @@
+"""
+Consistency check for the report rollup tables.
+
+restaurant_rollup, customer_rollup, driver_rollup and daily_rollup are kept
+current row by row by the order / delivery triggers (RollupOrder and
+RollupDelivery). verify() recomputes every figure from the base tables with
+one GROUP BY each and reports the keys that disagree; archived rows count,
+so the base tables are the orders_all / deliveries_all views. The RebuildRollups()
+procedure (`flask --app app rebuild-rollups`) recomputes them outright.
+"""
+
+# check -> (query over the rollup, same figures from the base tables);
+# both return a Row_Key column plus the columns being compared
+CHECKS = {
+    'restaurant_rollup': (
+        """SELECT Restaurant_ID AS Row_Key, Order_Count, Revenue, Highest_Order, Lowest_Order
+           FROM restaurant_rollup WHERE Order_Count <> 0 OR Revenue <> 0""",
+        """SELECT Restaurant_ID AS Row_Key, COUNT(*) AS Order_Count, COALESCE(SUM(Total_Amount), 0) AS Revenue,
+                  MAX(Total_Amount) AS Highest_Order, MIN(Total_Amount) AS Lowest_Order
+           FROM orders_all WHERE Restaurant_ID IS NOT NULL GROUP BY Restaurant_ID""",
+    ),
+    'customer_rollup': (
+        """SELECT Customer_ID AS Row_Key, Order_Count, Spent
+           FROM customer_rollup WHERE Order_Count <> 0 OR Spent <> 0""",
+        """SELECT Customer_ID AS Row_Key, COUNT(*) AS Order_Count, COALESCE(SUM(Total_Amount), 0) AS Spent
+           FROM orders_all WHERE Customer_ID IS NOT NULL GROUP BY Customer_ID""",
+    ),
+    'driver_rollup': (
+        """SELECT Driver_ID AS Row_Key, Delivery_Count, Earnings
+           FROM driver_rollup WHERE Delivery_Count <> 0 OR Earnings <> 0""",
+        """SELECT Driver_ID AS Row_Key, COUNT(*) AS Delivery_Count, COALESCE(SUM(Delivery_Fee), 0) AS Earnings
+           FROM deliveries_all WHERE Driver_ID IS NOT NULL GROUP BY Driver_ID""",
+    ),
+    'daily_rollup (orders)': (
+        """SELECT Day AS Row_Key, Order_Count, Revenue
+           FROM daily_rollup WHERE Order_Count <> 0 OR Revenue <> 0""",
+        """SELECT Order_Date AS Row_Key, COUNT(*) AS Order_Count, COALESCE(SUM(Total_Amount), 0) AS Revenue
+           FROM orders_all WHERE Order_Date IS NOT NULL GROUP BY Order_Date""",
+    ),
+    'daily_rollup (deliveries)': (
+        """SELECT Day AS Row_Key, Delivery_Count, Delivery_Fees
+           FROM daily_rollup WHERE Delivery_Count <> 0 OR Delivery_Fees <> 0""",
+        """SELECT DATE(Pickup_Time) AS Row_Key, COUNT(*) AS Delivery_Count,
+                  COALESCE(SUM(Delivery_Fee), 0) AS Delivery_Fees
+           FROM deliveries_all WHERE Pickup_Time IS NOT NULL GROUP BY DATE(Pickup_Time)""",
+    ),
+}
+
+
+def _by_key(cur, sql: str) -> dict:
+    cur.execute(sql)
+    return {row['Row_Key']: {k: v for k, v in row.items() if k != 'Row_Key'} for row in cur.fetchall()}
+
+
+def verify(cur) -> dict:
+    """Return {check: [(key, rollup figures or None, live figures or None)]} for every mismatch."""
+    mismatches = {}
+    for name, (rollup_sql, live_sql) in CHECKS.items():
+        stored = _by_key(cur, rollup_sql)
+        live = _by_key(cur, live_sql)
+        bad = [(key, stored.get(key), live.get(key))
+               for key in sorted(set(stored) | set(live), key=str)
+               if stored.get(key) != live.get(key)]
+        if bad:
+            mismatches[name] = bad
+    return mismatches
@@ -0,0 +1,206 @@
+"""
+Per-request SQL instrumentation.
+
+While a request is being served, get_cursor() hands out an InstrumentedCursor
+that times every execute() / executemany() / callproc() and records
+(sql, milliseconds, rows, failed) on flask.g. When the request ends SQLPerf:
+
+  * adds a Server-Timing header (time in the database, query count, total time)
+  * logs statements slower than SLOW_QUERY_MS to the `sql.slow` logger, and to
+    the SLOW_QUERY_LOG file when one is configured
+  * flags statement shapes run N_PLUS_ONE_THRESHOLD or more times in the same
+    request (the `sql.n_plus_one` logger)
+  * folds latency and query counts into a rolling window per endpoint, which
+    /debug/perf summarizes as p50 / p95 / p99
+
+Statements are grouped by shape: literals and placeholders become `?` and
+IN (...) lists of any length collapse to one form.
+
+Settings (app.config):
+    SQL_PERF_ENABLED        instrument cursors at all (default True)
+    SLOW_QUERY_MS           slow statement threshold in ms (default 200)
+    SLOW_QUERY_LOG          file to append slow statements to (default None: logger only)
+    N_PLUS_ONE_THRESHOLD    same-shape statements per request before flagging (default 5)
+    PERF_WINDOW             requests kept per endpoint for the percentiles (default 1000)
+"""
+import functools
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from flask import g, has_request_context, request
+
+slow_log = logging.getLogger('sql.slow')
+n_plus_one_log = logging.getLogger('sql.n_plus_one')
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize(sql: str) -> str:
+    """Statement shape: literals and placeholders as ?, IN lists collapsed, whitespace squeezed."""
+    shape = _STRING.sub('?', sql.replace('%s', '?'))
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('IN (?...)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+def percentile(sorted_values, pct: float):
+    """Nearest-rank percentile of an already sorted list (None when empty)."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100.0 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class InstrumentedCursor:
+    """Wraps a DB-API cursor and appends (sql, ms, rows, failed) to `log` for every statement."""
+
+    def __init__(self, cursor, log: list):
+        self._cursor = cursor
+        self._log = log
+
+    def _timed(self, sql, call):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = call()
+            failed = False
+            return result
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000.0
+            self._log.append((sql, elapsed, getattr(self._cursor, 'rowcount', -1), failed))
+
+    def execute(self, query, args=None):
+        return self._timed(query, lambda: self._cursor.execute(query, args))
+
+    def executemany(self, query, args):
+        return self._timed(query, lambda: self._cursor.executemany(query, args))
+
+    def callproc(self, procname, args=()):
+        return self._timed(f'CALL {procname}', lambda: self._cursor.callproc(procname, args))
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class SQLPerf:
+    """Flask extension tying InstrumentedCursor to the request lifecycle."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._routes = {}   # endpoint -> rolling stats
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_PERF_ENABLED', True)
+        app.config.setdefault('SLOW_QUERY_MS', 200)
+        app.config.setdefault('SLOW_QUERY_LOG', None)
+        app.config.setdefault('N_PLUS_ONE_THRESHOLD', 5)
+        app.config.setdefault('PERF_WINDOW', 1000)
+        self.config = app.config
+
+        if app.config['SLOW_QUERY_LOG']:
+            handler = logging.FileHandler(app.config['SLOW_QUERY_LOG'])
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            slow_log.addHandler(handler)
+            slow_log.setLevel(logging.WARNING)
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.extensions['sql_perf'] = self
+
+    def cursor(self, raw):
+        """Instrument `raw` when called inside a request that is being recorded."""
+        if has_request_context() and '_sql_log' in g:
+            return InstrumentedCursor(raw, g._sql_log)
+        return raw
+
+    # -- request hooks ----------------------------------------------------
+    def _start(self):
+        if self.config['SQL_PERF_ENABLED']:
+            g._sql_log = []
+            g._perf_start = time.perf_counter()
+
+    def _finish(self, response):
+        log = g.pop('_sql_log', None)
+        if log is None:
+            return response
+        total_ms = (time.perf_counter() - g.pop('_perf_start')) * 1000.0
+        db_ms = sum(entry[1] for entry in log)
+        response.headers.add(
+            'Server-Timing', f'db;dur={db_ms:.1f};desc="{len(log)} queries", app;dur={total_ms:.1f}')
+
+        route = f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+        slow_ms = self.config['SLOW_QUERY_MS']
+        slow = 0
+        for sql, ms, rows, failed in log:
+            if ms >= slow_ms:
+                slow += 1
+                slow_log.warning('%.1fms rows=%s%s %s :: %s', ms, rows, ' FAILED' if failed else '',
+                                 route, _SPACE.sub(' ', sql).strip()[:2000])
+
+        shapes = Counter(normalize(entry[0]) for entry in log)
+        repeated = {shape: n for shape, n in shapes.items() if n >= self.config['N_PLUS_ONE_THRESHOLD']}
+        for shape, n in repeated.items():
+            n_plus_one_log.warning('%s ran %d times in %s (%s)', shape[:500], n, route, request.path)
+
+        if request.endpoint != 'static':
+            self._record(route, total_ms, db_ms, len(log), slow, repeated)
+        return response
+
+    def _record(self, route, total_ms, db_ms, queries, slow, repeated):
+        window = self.config['PERF_WINDOW']
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {
+                    'requests': 0, 'slow_queries': 0,
+                    'latency': deque(maxlen=window), 'db_time': deque(maxlen=window),
+                    'queries': deque(maxlen=window), 'n_plus_one': Counter(),
+                }
+            stats['requests'] += 1
+            stats['slow_queries'] += slow
+            stats['latency'].append(total_ms)
+            stats['db_time'].append(db_ms)
+            stats['queries'].append(queries)
+            for shape, n in repeated.items():
+                stats['n_plus_one'][shape] = max(stats['n_plus_one'][shape], n)
+
+    # -- reporting ----------------------------------------------------------
+    def snapshot(self) -> list:
+        """One summary dict per route, slowest p95 first."""
+        with self._lock:
+            routes = {route: (s['requests'], s['slow_queries'], sorted(s['latency']), list(s['db_time']),
+                              list(s['queries']), s['n_plus_one'].most_common(5))
+                      for route, s in self._routes.items()}
+        summary = []
+        for route, (requests, slow, latency, db_time, queries, repeated) in routes.items():
+            summary.append({
+                'route': route,
+                'requests': requests,
+                'p50_ms': round(percentile(latency, 50), 1),
+                'p95_ms': round(percentile(latency, 95), 1),
+                'p99_ms': round(percentile(latency, 99), 1),
+                'avg_db_ms': round(sum(db_time) / len(db_time), 1),
+                'avg_queries': round(sum(queries) / len(queries), 1),
+                'max_queries': max(queries),
+                'slow_queries': slow,
+                'n_plus_one': [{'shape': shape, 'max_per_request': n} for shape, n in repeated],
+            })
+        summary.sort(key=lambda r: r['p95_ms'], reverse=True)
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
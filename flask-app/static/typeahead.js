@@ -0,0 +1,118 @@
+// Async typeahead for the order / delivery forms.
+//
+// Markup:
+//   <div class="typeahead" data-lookup="/api/lookup/customers" data-params="undelivered=1" data-depends="restaurant_id">
+//     <input type="text" class="form-control typeahead-text" placeholder="Search...">
+//     <input type="hidden" name="customer_id">
+//     <div class="dropdown-menu w-100"></div>
+//   </div>
+//
+// Typing queries data-lookup?q=... (debounced); "More results" follows the
+// keyset cursor returned as `next`. data-depends names another field in the
+// same form whose value is sent along (e.g. menu items for one restaurant).
+// A result may carry `fill: {field: {id, label}}` to set other typeaheads.
+(function () {
+  const DEBOUNCE_MS = 200;
+
+  function findTypeahead(form, name) {
+    const hidden = form.querySelector('.typeahead input[type="hidden"][name="' + name + '"]');
+    return hidden ? hidden.closest('.typeahead') : null;
+  }
+
+  function setValue(box, id, label) {
+    box.querySelector('input[type="hidden"]').value = id;
+    box.querySelector('.typeahead-text').value = label;
+  }
+
+  function initTypeahead(box) {
+    const text = box.querySelector('.typeahead-text');
+    const hidden = box.querySelector('input[type="hidden"]');
+    const menu = box.querySelector('.dropdown-menu');
+    let timer = null;
+    let seq = 0;
+
+    function buildUrl(after) {
+      const params = new URLSearchParams(box.dataset.params || '');
+      params.set('q', text.value.trim());
+      if (after) params.set('after', after);
+      if (box.dataset.depends) {
+        const form = box.closest('form');
+        const dep = form && form.querySelector('[name="' + box.dataset.depends + '"]');
+        if (dep && dep.value) params.set(box.dataset.depends, dep.value);
+      }
+      return box.dataset.lookup + '?' + params.toString();
+    }
+
+    function render(data, append) {
+      if (!append) menu.innerHTML = '';
+      const more = menu.querySelector('.typeahead-more');
+      if (more) more.remove();
+      data.results.forEach(function (item) {
+        const btn = document.createElement('button');
+        btn.type = 'button';
+        btn.className = 'dropdown-item';
+        btn.textContent = item.label;
+        btn.addEventListener('mousedown', function (e) {
+          e.preventDefault();
+          setValue(box, item.id, item.label);
+          const form = box.closest('form');
+          Object.entries(item.fill || {}).forEach(function ([name, value]) {
+            const other = form && findTypeahead(form, name);
+            if (other) setValue(other, value.id, value.label);
+          });
+          menu.classList.remove('show');
+        });
+        menu.appendChild(btn);
+      });
+      if (!menu.children.length) {
+        menu.innerHTML = '<span class="dropdown-item-text text-muted">No matches</span>';
+      }
+      if (data.next) {
+        const btn = document.createElement('button');
+        btn.type = 'button';
+        btn.className = 'dropdown-item text-primary typeahead-more';
+        btn.textContent = 'More results...';
+        btn.addEventListener('mousedown', function (e) {
+          e.preventDefault();
+          load(data.next);
+        });
+        menu.appendChild(btn);
+      }
+      menu.classList.add('show');
+    }
+
+    function load(after) {
+      const mine = ++seq;
+      fetch(buildUrl(after))
+        .then(function (resp) { return resp.json(); })
+        .then(function (data) {
+          if (mine === seq) render(data, Boolean(after));
+        });
+    }
+
+    text.addEventListener('input', function () {
+      hidden.value = '';
+      clearTimeout(timer);
+      timer = setTimeout(function () { load(null); }, DEBOUNCE_MS);
+    });
+    text.addEventListener('focus', function () { load(null); });
+    text.addEventListener('blur', function () { menu.classList.remove('show'); });
+  }
+
+  window.initTypeahead = initTypeahead;
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('.typeahead').forEach(initTypeahead);
+    // hidden inputs skip browser validation, so check picks before submitting
+    document.querySelectorAll('form').forEach(function (form) {
+      form.addEventListener('submit', function (e) {
+        const missing = Array.from(form.querySelectorAll('.typeahead input[type="hidden"]'))
+          .filter(function (input) { return !input.value; });
+        if (missing.length) {
+          e.preventDefault();
+          missing[0].closest('.typeahead').querySelector('.typeahead-text').focus();
+        }
+      });
+    });
+  });
+})();
@@ -0,0 +1,84 @@
+"""POST /api/orders on the async API answers a bad order with 400, as the Flask route does."""
+import asyncio
+import os
+import sys
+import types
+
+import pytest
+
+pytest.importorskip('quart')
+aiomysql = pytest.importorskip('aiomysql')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if 'db_config' not in sys.modules:
+    try:
+        import db_config  # noqa: F401
+    except ImportError:
+        # local connection settings are not in the repository
+        sys.modules['db_config'] = types.SimpleNamespace(init_mysql=lambda app: None)
+
+import async_api  # noqa: E402
+
+
+class _Cursor:
+    def __init__(self, error):
+        self.error = error
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def callproc(self, name, args):
+        raise self.error
+
+
+class _Connection:
+    def __init__(self, error):
+        self.error = error
+
+    def cursor(self):
+        return _Cursor(self.error)
+
+    async def rollback(self):
+        pass
+
+
+class _Pool:
+    def __init__(self, error):
+        self.error = error
+
+    async def acquire(self):
+        return _Connection(self.error)
+
+    def release(self, conn):
+        pass
+
+
+ORDER = {'customer_id': 1, 'restaurant_id': 1, 'items': [{'menu_item_id': 999999, 'quantity': 1}]}
+
+
+def _post(error):
+    async def run():
+        async_api.app.pool = _Pool(error)
+        response = await async_api.app.test_client().post('/api/orders', json=ORDER)
+        return response.status_code, await response.get_json()
+    return asyncio.run(run())
+
+
+def test_unknown_menu_item_is_400():
+    error = aiomysql.OperationalError(1644, 'PlaceOrderItems: unknown menu item in order')
+    status, body = _post(error)
+    assert status == 400
+    assert body == {'error': 'Unknown customer, restaurant or menu item'}
+
+
+def test_unknown_customer_is_400():
+    status, _ = _post(aiomysql.IntegrityError(1452, 'Cannot add or update a child row'))
+    assert status == 400
+
+
+def test_other_operational_errors_are_not_hidden():
+    status, _ = _post(aiomysql.OperationalError(2013, 'Lost connection to MySQL server during query'))
+    assert status == 500
@@ -0,0 +1,209 @@
+"""
+Database accounts for the app's operators, managed through MySQL roles.
+
+Migration 013 creates one role per privilege level (app_admin, app_manager,
+app_operator, app_viewer) holding that level's grants. An account then needs
+a single GRANT of its role, and provisioning many accounts is a handful of
+statements per batch whatever its size:
+
+    CREATE USER 'a'@'localhost' IDENTIFIED BY '...', 'b'@'localhost' ...
+    GRANT app_operator TO 'a'@'localhost', 'b'@'localhost', ...
+    SET DEFAULT ROLE app_operator TO 'a'@'localhost', 'b'@'localhost', ...
+
+Account statements change the in-memory grant tables directly, so there is
+no FLUSH PRIVILEGES. Account names and passwords go in as escaped string
+literals ('name'@'host'), never pasted into the SQL.
+
+privilege_matrix() reads every account's global, schema and table privileges
+and its roles in one query.
+"""
+import re
+import secrets
+
+# privilege level -> role holding its grants (migration 013)
+ROLES = {
+    'admin': 'app_admin',
+    'manager': 'app_manager',
+    'operator': 'app_operator',
+    'viewer': 'app_viewer',
+}
+PROTECTED_USERS = ('root', 'admin', 'mysql.sys', 'mysql.session', 'mysql.infoschema')
+# MySQL account names are at most 32 characters
+_USERNAME = re.compile(r'^[A-Za-z0-9_.-]{1,32}$')
+# matrix columns, in this order; anything else is counted under Other
+MATRIX_PRIVILEGES = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'CREATE', 'ALTER', 'DROP', 'INDEX', 'EXECUTE',
+                     'TRIGGER')
+
+
+def check_username(username: str) -> str:
+    """The username if it is a valid, unprotected account name; ValueError otherwise."""
+    if not isinstance(username, str) or not _USERNAME.match(username):
+        raise ValueError('Usernames are 1-32 letters, digits, dots, dashes or underscores')
+    if username.lower() in PROTECTED_USERS or username in ROLES.values():
+        raise ValueError(f'{username} is a protected account')
+    return username
+
+
+def _accounts(names, host: str) -> tuple:
+    """SQL for a list of accounts ('%s@%s, ...') and its parameters."""
+    return ', '.join(['%s@%s'] * len(names)), tuple(v for name in names for v in (name, host))
+
+
+def existing_users(cur, names, host: str) -> set:
+    """Those of `names` that already have an account at `host`."""
+    names = list(names)
+    if not names:
+        return set()
+    cur.execute(f"SELECT User FROM mysql.user WHERE Host = %s AND User IN ({', '.join(['%s'] * len(names))})",
+                (host,) + tuple(names))
+    return {r['User'] for r in cur.fetchall()}
+
+
+def _create_batch(cur, batch, host: str):
+    """CREATE USER, GRANT <role> and SET DEFAULT ROLE for [(username, password, level)]."""
+    cur.execute("CREATE USER " + ', '.join(['%s@%s IDENTIFIED BY %s'] * len(batch)),
+                tuple(v for name, password, _ in batch for v in (name, host, password)))
+    try:
+        by_role = {}
+        for name, _, level in batch:
+            by_role.setdefault(ROLES[level], []).append(name)
+        for role, names in by_role.items():
+            accounts, args = _accounts(names, host)
+            cur.execute(f"GRANT {role} TO {accounts}", args)
+            cur.execute(f"SET DEFAULT ROLE {role} TO {accounts}", args)
+    except Exception:
+        # each statement is atomic, the batch is not: take the new accounts away again
+        accounts, args = _accounts([name for name, _, _ in batch], host)
+        cur.execute(f"DROP USER IF EXISTS {accounts}", args)
+        raise
+
+
+def provision(cur, requests, host: str = 'localhost', batch_size: int = 100) -> list:
+    """
+    Create accounts for [{'username', 'password'?, 'role'}] in batches of
+    `batch_size`; returns one result per request, in order.
+
+    A result is {'username', 'status': 'created' | 'error', 'role'} plus
+    'password' when one was generated, or 'error'. Existing accounts and
+    invalid requests fail alone; a failed statement fails its batch.
+    """
+    results, valid = [], []
+    seen = set()
+    for index, req in enumerate(requests):
+        req = req if isinstance(req, dict) else {}
+        username = req.get('username')
+        result = {'username': username, 'role': req.get('role')}
+        results.append(result)
+        try:
+            check_username(username)
+            if req.get('role') not in ROLES:
+                raise ValueError(f"role must be one of {', '.join(ROLES)}")
+            if username in seen:
+                raise ValueError('Listed twice')
+            password = req.get('password')
+            if password is None:
+                password = result['password'] = secrets.token_urlsafe(18)
+            elif not isinstance(password, str) or not password:
+                raise ValueError('password must be a non-empty string')
+        except ValueError as e:
+            result.update(status='error', error=str(e))
+            continue
+        seen.add(username)
+        valid.append((index, (username, password, req['role'])))
+
+    taken = existing_users(cur, [account[0] for _, account in valid], host)
+    pending = []
+    for index, account in valid:
+        if account[0] in taken:
+            results[index].update(status='error', error=f'{account[0]}@{host} already exists')
+            results[index].pop('password', None)
+        else:
+            pending.append((index, account))
+
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        try:
+            _create_batch(cur, [account for _, account in batch], host)
+        except Exception as e:
+            for index, _ in batch:
+                results[index].update(status='error', error=f'Batch failed: {e}')
+                results[index].pop('password', None)
+            continue
+        for index, _ in batch:
+            results[index]['status'] = 'created'
+    return results
+
+
+def set_level(cur, username: str, level: str, database: str, host: str = 'localhost'):
+    """
+    Give an existing account exactly one privilege level: its other roles go,
+    and so do its direct grants on `database` (schema or table level).
+    Privileges on other schemas and global ones are left alone.
+    """
+    role = ROLES[level]
+    cur.execute("SELECT FROM_USER FROM mysql.role_edges WHERE TO_USER = %s AND TO_HOST = %s", (username, host))
+    others = [r['FROM_USER'] for r in cur.fetchall() if r['FROM_USER'] in ROLES.values() and r['FROM_USER'] != role]
+    if others:
+        cur.execute(f"REVOKE {', '.join(others)} FROM %s@%s", (username, host))
+    # accounts from before the roles hold their privileges directly (operators per table);
+    # REVOKE fails on a level the account has no grant at, so only the levels found are revoked
+    grantee = f"'{username}'@'{host}'"
+    cur.execute("""
+        SELECT '*' AS Object FROM information_schema.schema_privileges WHERE GRANTEE = %s AND TABLE_SCHEMA = %s
+        UNION
+        SELECT TABLE_NAME FROM information_schema.table_privileges WHERE GRANTEE = %s AND TABLE_SCHEMA = %s
+    """, (grantee, database, grantee, database))
+    for obj in [r['Object'] for r in cur.fetchall()]:
+        target = '*' if obj == '*' else f"`{obj}`"
+        cur.execute(f"REVOKE ALL PRIVILEGES ON `{database}`.{target} FROM %s@%s", (username, host))
+    cur.execute(f"GRANT {role} TO %s@%s", (username, host))
+    cur.execute(f"SET DEFAULT ROLE {role} TO %s@%s", (username, host))
+
+
+def _split_grantee(grantee: str) -> tuple:
+    """("'user'@'host'") -> (user, host)."""
+    user, _, host = grantee.partition('@')
+    return user.strip("'"), host.strip("'")
+
+
+def privilege_matrix(cur, database: str) -> list:
+    """
+    One row per account with privileges or roles: {'user', 'host', 'is_role',
+    'roles', 'privileges': {privilege: [scopes]}, 'other', 'grant_option'}.
+
+    A scope is 'global', the database name or a table name.
+    """
+    cur.execute("""
+        SELECT GRANTEE, 'global' AS Scope, PRIVILEGE_TYPE, IS_GRANTABLE
+        FROM information_schema.user_privileges WHERE PRIVILEGE_TYPE <> 'USAGE'
+        UNION ALL
+        SELECT GRANTEE, TABLE_SCHEMA, PRIVILEGE_TYPE, IS_GRANTABLE
+        FROM information_schema.schema_privileges WHERE TABLE_SCHEMA = %s
+        UNION ALL
+        SELECT GRANTEE, TABLE_NAME, PRIVILEGE_TYPE, IS_GRANTABLE
+        FROM information_schema.table_privileges WHERE TABLE_SCHEMA = %s
+        UNION ALL
+        SELECT CONCAT('''', TO_USER, '''@''', TO_HOST, ''''), FROM_USER, 'ROLE', 'NO'
+        FROM mysql.role_edges
+        ORDER BY 1
+    """, (database, database))
+    accounts = {}
+    for r in cur.fetchall():
+        user, host = _split_grantee(r['GRANTEE'])
+        row = accounts.setdefault(r['GRANTEE'], {
+            'user': user, 'host': host, 'is_role': user in ROLES.values(), 'roles': [],
+            'privileges': {p: [] for p in MATRIX_PRIVILEGES}, 'other': set(), 'grant_option': False,
+        })
+        privilege = r['PRIVILEGE_TYPE']
+        if privilege == 'ROLE':
+            row['roles'].append(r['Scope'])
+        elif privilege in row['privileges']:
+            row['privileges'][privilege].append(r['Scope'])
+        else:
+            row['other'].add(privilege)
+        if r['IS_GRANTABLE'] == 'YES':
+            row['grant_option'] = True
+    rows = sorted(accounts.values(), key=lambda a: (not a['is_role'], a['user'].lower(), a['host']))
+    for row in rows:
+        row['other'] = sorted(row['other'])
+    return rows
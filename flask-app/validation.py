@@ -0,0 +1,55 @@
+"""
+Input validation shared by the Flask views and the async JSON API.
+
+Each parser takes a form or JSON payload and returns it normalised, or
+raises ValueError with a message that can be shown to the user as is.
+"""
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+
+def parse_order(data, max_items: int = 500) -> dict:
+    """
+    Validate an order payload (form or JSON) and return it normalised.
+
+    items is a list of {'menu_item_id', 'quantity'}.
+    """
+    try:
+        customer_id = int(data['customer_id'])
+        restaurant_id = int(data['restaurant_id'])
+        items = [
+            {'menu_item_id': int(item['menu_item_id']), 'quantity': int(item['quantity'])}
+            for item in data['items']
+        ]
+        order_date = date.fromisoformat(data.get('order_date') or date.today().isoformat())
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('customer_id, restaurant_id and items (menu_item_id, quantity) are required')
+    if not items:
+        raise ValueError('An order needs at least one item')
+    if len(items) > max_items:
+        raise ValueError(f"An order can have at most {max_items} items")
+    if any(item['quantity'] < 1 for item in items):
+        raise ValueError('Quantity must be at least 1')
+    return {'customer_id': customer_id, 'restaurant_id': restaurant_id,
+            'order_date': order_date.isoformat(), 'items': items}
+
+
+def parse_delivery(data) -> dict:
+    """Validate a delivery assignment (order, restaurant, driver, location, fee)."""
+    try:
+        order_id = int(data['order_id'])
+        restaurant_id = int(data['restaurant_id'])
+        driver_id = int(data['driver_id'])
+        location = str(data['location']).strip()
+        fee = Decimal(str(data['fee']).strip())
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        raise ValueError('order_id, restaurant_id, driver_id, location and fee are required')
+    if not location:
+        raise ValueError('A delivery location is required')
+    if len(location) > 255:
+        raise ValueError('The delivery location can be at most 255 characters')
+    # Delivery_Fee is DECIMAL(10,2)
+    if not fee.is_finite() or fee < 0 or fee >= Decimal('100000000'):
+        raise ValueError('The delivery fee must be an amount between 0 and 99999999.99')
+    return {'order_id': order_id, 'restaurant_id': restaurant_id, 'driver_id': driver_id,
+            'location': location, 'fee': str(fee.quantize(Decimal('0.01')))}